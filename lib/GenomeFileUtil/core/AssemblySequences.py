@@ -0,0 +1,140 @@
+"""
+Fills in the dna_sequence of genome features saved without one, from the genome's assembly.
+
+The assembly is fetched as FASTA once per process and kept in scratch with its FastaIndex, so
+every feature's bases are read straight from a memory map of the file. The features of all four
+feature lists are cut in chunks, on a thread pool when more than one worker is configured.
+Features with a segment outside its contig are left without a sequence and given a warning.
+Genomes that only reference a legacy ContigSet have no assembly to fetch; their sequences are
+still asked of the AssemblySequenceAPI service, one chunk of features per request.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from GenomeFileUtil.core.FastaIndex import FastaIndex
+from GenomeFileUtil.core.GenomeUtils import MAX_MISC_FEATURE_SIZE, warnings
+from GenomeFileUtil.core.SequenceUtils import extract_sequence
+from installed_clients.AssemblySequenceAPIServiceClient import AssemblySequenceAPI
+from installed_clients.AssemblyUtilClient import AssemblyUtil
+
+FEATURE_LISTS = ('features', 'cdss', 'mrnas', 'non_coding_features')
+BACKFILL_CHUNK_SIZE = 5000
+
+# assembly ref -> FastaIndex of its downloaded FASTA, kept for the life of the process
+_assemblies = {}
+_assemblies_lock = threading.Lock()
+
+
+def features_missing_sequence(genome):
+    """The features of every feature list that have a location but no dna_sequence, leaving
+    out the misc features the importers keep without one for being too long"""
+    return [feature for name in FEATURE_LISTS for feature in genome.get(name, [])
+            if not feature.get('dna_sequence') and feature.get('location')
+            and feature.get('dna_sequence_length', 0) <= MAX_MISC_FEATURE_SIZE]
+
+
+def location_sequence(contigs, location):
+    """The bases of a KBase location, joined in order, from a mapping of contig id to contig
+    bases. None if one of its contigs is missing. Raises a ValueError if a segment is outside
+    its contig"""
+    parts = []
+    for contig_id, start, strand, length in location:
+        contig = contigs.get(contig_id)
+        if contig is None:
+            return None
+        if strand == '-':
+            # start is the last base of the segment on the forward strand
+            begin, end = start - length, start
+        else:
+            begin, end = start - 1, start - 1 + length
+        if begin < 0 or end > len(contig):
+            raise ValueError(warnings['location_outside_contig'].format(
+                [contig_id, start, strand, length], contig_id))
+        parts.append(extract_sequence(contig, begin, end, reverse_complement=strand == '-'))
+    return b''.join(parts).decode('ascii')
+
+
+def _set_sequence(feature, sequence):
+    feature['dna_sequence'] = sequence
+    feature['dna_sequence_length'] = len(sequence)
+
+
+def _fill_chunk(contigs, features):
+    filled = 0
+    for feature in features:
+        try:
+            sequence = location_sequence(contigs, feature['location'])
+        except ValueError as err:
+            feature['warnings'] = feature.get('warnings', []) + [str(err)]
+            continue
+        if sequence is not None:
+            _set_sequence(feature, sequence)
+            filled += 1
+    return filled
+
+
+class AssemblySequences:
+    def __init__(self, callback_url, sw_url, token, workers=1,
+                 chunk_size=BACKFILL_CHUNK_SIZE):
+        self.callback_url = callback_url
+        self.sw_url = sw_url
+        self.token = token
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    def fill(self, genome):
+        """Set dna_sequence and dna_sequence_length on the genome's features that lack them.
+        Returns the number of features filled"""
+        features = features_missing_sequence(genome)
+        if not features:
+            return 0
+        start = time.time()
+        chunks = [features[i:i + self.chunk_size]
+                  for i in range(0, len(features), self.chunk_size)]
+        if 'assembly_ref' in genome:
+            filled = self._fill_from_assembly(genome['assembly_ref'], chunks)
+        elif 'contigset_ref' in genome:
+            filled = self._fill_from_service(genome['contigset_ref'], chunks)
+        else:
+            # Nothing to do (it may be test genome without contigs)...
+            return 0
+        logging.info(f"Filled in the DNA sequence of {filled} of {len(features)} features in "
+                     f"{time.time() - start:.2f}s")
+        return filled
+
+    def assembly_index(self, assembly_ref):
+        """The FastaIndex of an assembly, downloading the FASTA the first time it is needed"""
+        with _assemblies_lock:
+            index = _assemblies.get(assembly_ref)
+            if index is None or not os.path.exists(index.path):
+                logging.info(f"Downloading assembly {assembly_ref} as FASTA")
+                path = AssemblyUtil(self.callback_url).get_assembly_as_fasta(
+                    {'ref': assembly_ref})['path']
+                index = _assemblies[assembly_ref] = FastaIndex.build(path)
+        return index
+
+    def _fill_from_assembly(self, assembly_ref, chunks):
+        contigs = {contig.record.name: contig for contig in self.assembly_index(assembly_ref)}
+        fill_chunk = functools.partial(_fill_chunk, contigs)
+        if self.workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                return sum(executor.map(fill_chunk, chunks))
+        return sum(map(fill_chunk, chunks))
+
+    def _fill_from_service(self, contigset_ref, chunks):
+        aseq = AssemblySequenceAPI(self.sw_url, token=self.token)
+        filled = 0
+        for chunk in chunks:
+            # keyed by position as feature ids may repeat across the feature lists
+            requested = {str(i): feature['location'] for i, feature in enumerate(chunk)}
+            dna_sequences = aseq.get_dna_sequences({'contigset_ref': contigset_ref,
+                                                    'requested_features': requested}
+                                                   )['dna_sequences']
+            for key, sequence in dna_sequences.items():
+                _set_sequence(chunk[int(key)], sequence)
+                filled += 1
+        return filled
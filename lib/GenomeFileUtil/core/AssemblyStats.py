@@ -0,0 +1,56 @@
+"""
+Running statistics of the contigs written to an assembly FASTA.
+
+The values follow the ones AssemblyUtil computes for the Assembly object it saves (see
+FastaToAssembly._parse_fasta there): sequences are uppercased, a contig's md5 is of its
+uppercased sequence, the assembly md5 is of the sorted contig md5s joined by commas and GC
+content is the fraction of G and C bases rounded to five places. Collecting them while the
+FASTA is read or written saves fetching the whole Assembly back after saving it.
+"""
+from GenomeFileUtil.core.SequenceUtils import sequence_md5
+
+
+class AssemblyStats:
+    def __init__(self):
+        self.contigs = {}
+        self.dna_size = 0
+        self._gc_count = 0
+
+    def add(self, contig_id, seq):
+        """Add a contig's sequence (str, bytes or Bio.Seq)"""
+        if contig_id in self.contigs:
+            raise ValueError(f"The FASTA header key {contig_id} appears more than once in the file")
+        if isinstance(seq, bytes):
+            data = seq.upper()
+        else:
+            data = str(seq).upper().encode('ascii')
+        gc_count = data.count(b'G') + data.count(b'C')
+        self.contigs[contig_id] = {
+            'contig_id': contig_id,
+            'length': len(data),
+            'md5': sequence_md5(data),
+            'gc_content': round(gc_count / len(data), 5) if data else None,
+        }
+        self.dna_size += len(data)
+        self._gc_count += gc_count
+
+    @property
+    def gc_content(self):
+        if not self.dna_size:
+            return None
+        return round(self._gc_count / self.dna_size, 5)
+
+    @property
+    def md5(self):
+        return sequence_md5(",".join(sorted(c['md5'] for c in self.contigs.values())))
+
+    def assembly_data(self):
+        """The statistics as they appear in the saved Assembly object, whose contigs map the
+        workspace returns sorted by id"""
+        return {
+            'gc_content': self.gc_content,
+            'dna_size': self.dna_size,
+            'md5': self.md5,
+            'contigs': {k: self.contigs[k] for k in sorted(self.contigs)},
+            'num_contigs': len(self.contigs),
+        }
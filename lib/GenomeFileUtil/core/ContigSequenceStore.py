@@ -0,0 +1,91 @@
+"""
+A disk backed store for contig sequences.
+
+Sequences are uppercased and appended to a single scratch file as plain bytes with an in memory
+offset index. Reads go through a read-only memory map so only the pages holding the requested
+bases are touched and memory use does not grow with the size of the assembly. Once every contig
+is added, reads and md5s may be run from several threads.
+"""
+import mmap
+import os
+import threading
+
+from GenomeFileUtil.core.SequenceUtils import extract_sequence, sequence_md5
+
+
+class ContigSequenceStore:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._index = {}  # contig_id -> (offset, length)
+        self._size = 0
+        self._mmap = None
+        self._remap_lock = threading.Lock()
+
+    def __contains__(self, contig_id):
+        return contig_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def keys(self):
+        return self._index.keys()
+
+    def add(self, contig_id, seq):
+        """Append a contig's sequence (str, bytes or Bio.Seq) to the store"""
+        if isinstance(seq, bytes):
+            data = seq.upper()
+        else:
+            data = str(seq).upper().encode('ascii')
+        self._file.write(data)
+        self._index[contig_id] = (self._size, len(data))
+        self._size += len(data)
+
+    def contig_length(self, contig_id):
+        return self._index[contig_id][1]
+
+    def _buffer(self):
+        """Map the file, remapping if contigs were added since the last read"""
+        if self._mmap is None or len(self._mmap) < self._size:
+            with self._remap_lock:
+                if self._mmap is None or len(self._mmap) < self._size:
+                    self._file.flush()
+                    if self._mmap is not None:
+                        self._mmap.close()
+                    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def get_bytes(self, contig_id, start=0, end=None, reverse_complement=False):
+        """Return the bases in [start, end) of a contig using python slice bounds"""
+        offset, length = self._index[contig_id]
+        start, end, _ = slice(start, end).indices(length)
+        if end <= start:
+            return b''
+        return extract_sequence(self._buffer(), offset + start, offset + end, reverse_complement)
+
+    def get_sequence(self, contig_id, start=0, end=None, reverse_complement=False):
+        return self.get_bytes(contig_id, start, end, reverse_complement).decode('ascii')
+
+    def md5(self, contig_id):
+        """md5 of the full (uppercased) contig sequence"""
+        offset, length = self._index[contig_id]
+        if not length:
+            return sequence_md5(b'')
+        # hash straight from the map rather than copying the contig
+        with memoryview(self._buffer()) as view, view[offset:offset + length] as contig:
+            return sequence_md5(contig)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,7 +1,8 @@
 import collections
 import copy
 import datetime
-import hashlib
+import io
+import itertools
 import json
 import logging
 import os
@@ -9,32 +10,65 @@ import re
 import shutil
 import sys
 import time
-import urllib.parse as parse
 import uuid
+from collections import deque
 
 import Bio.SeqIO
 from Bio.Data import CodonTable
 from Bio.Data.CodonTable import TranslationError
-from Bio.Seq import Seq
 
 from GenomeFileUtil.core import GenomeUtils
-from GenomeFileUtil.core.GenomeInterface import GenomeInterface
-from GenomeFileUtil.core.GenomeUtils import is_parent, warnings, \
+from GenomeFileUtil.core.AssemblyStats import AssemblyStats
+from GenomeFileUtil.core.FastaIndex import FastaIndex
+from GenomeFileUtil.core.FeatureJsonWriter import FEATURE_LISTS, FeatureJsonWriter
+from GenomeFileUtil.core.GenomeInterface import MAX_GENOME_SIZE, GenomeInterface
+from GenomeFileUtil.core.GenomeSize import GenomeSize
+from GenomeFileUtil.core.GenomeUtils import MAX_MISC_FEATURE_SIZE, is_parent, warnings, \
     check_full_contig_length_or_multi_strand_feature
-from GenomeFileUtil.core.GenomeUtils import propagate_cds_props_to_gene, load_ontology_mappings
+from GenomeFileUtil.core.GenomeUtils import propagate_cds_props_to_gene
+from GenomeFileUtil.core.GffParser import (
+    feature_links, gtf_hierarchy, is_gtf_file, iter_gff_lines, parents_first, read_gff
+)
+from GenomeFileUtil.core.InputStaging import (
+    decompress_to, is_archive, log_scratch_usage
+)
+from GenomeFileUtil.core.Md5Stage import Md5Stage, placeholder_json
 from GenomeFileUtil.core.MiscUtils import validate_lists_have_same_elements
+from GenomeFileUtil.core.OntologyClassifier import OntologyClassifier
+from GenomeFileUtil.core.ProteinFastaWriter import ProteinFastaWriter
+from GenomeFileUtil.core.SequenceUtils import (
+    extract_sequence, fork_pool, iter_translate_cdss, translation_pool
+)
+from GenomeFileUtil.core.StageScheduler import StageScheduler
 from installed_clients.AssemblyUtilClient import AssemblyUtil
 from installed_clients.DataFileUtilClient import DataFileUtil
 
 codon_table = CodonTable.ambiguous_generic_by_name["Standard"]
 strand_table = str.maketrans("1?.", "+++")
-snake_re = re.compile('((?<=[a-z0-9])[A-Z]|(?!^)[A-Z](?=[a-z]))')
-MAX_MISC_FEATURE_SIZE = 10000
+# features of a streamed metagenome held at once; CDSs are translated a batch at a time
+STREAM_BATCH_FEATURES = 20000
+# the importer, inherited by forked transform workers
+_pool_state = None
 
 
-def make_snake_case(string):
-    """Simple function to convert CamelCase to snake_case"""
-    return snake_re.sub(r'_\1', string).lower()
+def _contig_local(features_by_contig):
+    """Check that no feature id is used on more than one contig and that every parent a
+    feature names is on the same contig (or nowhere), so contigs can be transformed apart"""
+    contig_of = {}
+    for contig_id, features in features_by_contig.items():
+        for ftr in features:
+            if contig_of.setdefault(ftr.get('ID'), contig_id) != contig_id:
+                return False
+    for contig_id, features in features_by_contig.items():
+        for ftr in features:
+            if ftr.get('Parent') and contig_of.get(ftr['Parent'], contig_id) != contig_id:
+                return False
+    return True
+
+
+def _transform_contig(features, contig_seq):
+    """Transform the features of one contig. Runs in a forked worker process"""
+    return _pool_state._transform_contig_features(contig_seq, features)
 
 
 class FastaGFFToGenome:
@@ -52,23 +86,35 @@ class FastaGFFToGenome:
             self.version = mod_match.group(1)
         else:
             self.version = None
-        self.ont_mappings = load_ontology_mappings('/kb/module/data')
+        self.ontology = OntologyClassifier('/kb/module/data', self.version, self.time_string)
         self.code_table = 11
         self.skip_types = ('exon', 'five_prime_UTR', 'three_prime_UTR',
                            'start_codon', 'stop_codon', 'region', 'chromosome', 'scaffold')
         self.spoof_gene_count = 0
         self.is_phytozome = False
+        self.is_gtf = False
         self.is_metagenome = False
         self.strict = True
         self.generate_genes = False
         self.warnings = []  # type: list
         self.feature_dict = collections.OrderedDict()  # type: dict
         self.cdss = set()  # type: set
-        self.ontologies_present = collections.defaultdict(dict)  # type: dict
-        self.ontology_events = list()  # type: list
+        # metagenome proteins are written here as CDSs are translated
+        self.protein_fasta = None
         self.skiped_features = collections.Counter()  # type: collections.Counter
         self.feature_counts = collections.Counter()  # type: collections.Counter
+        # numbers the identifiers made up for features without one
+        self.missing_id_counts = collections.Counter()  # type: collections.Counter
         self.re_api_url = config.re_api_url
+        self.md5_stage = Md5Stage(int(config.raw.get('md5-workers', 1)))
+        # serialized size of a genome's features, counted as they are finished
+        self.genome_size = None
+        self.gff_chunk_size = int(config.raw.get('gff-read-chunk-size', 0))
+        self.transform_workers = int(config.raw.get('gff-transform-workers', 1))
+        self.translation_workers = int(config.raw.get('translation-workers', 1))
+        # forked by _start_pools before the assembly and upload threads are started
+        self.transform_pool = None
+        self.translation_pool = None
 
     def warn(self, message):
         self.warnings.append(message)
@@ -107,7 +153,7 @@ class FastaGFFToGenome:
             'data': genome,
             "meta": params.get('metadata', {}),
             'workspace_datatype': ws_datatype,
-        })
+        }, genome_size=self.genome_size)
         feature_types = "\n".join([f"{k}: {v}" for k, v in genome['feature_counts'].items()])
         report_string = (
             f"A genome with {len(genome['contig_ids'])} contigs and the following feature "
@@ -132,27 +178,53 @@ class FastaGFFToGenome:
         return details
 
     def _gen_genome_json(self, params, input_gff_file, input_fasta_file):
-        # reading in GFF file
-        features_by_contig = self._retrieve_gff_file(input_gff_file)
+        """Build the genome from the staged files. The assembly is saved and the GFF and
+        protein files are uploaded while the features are transformed, see StageScheduler"""
         contig_ids = set()
-
-        # parse feature information
-        fasta_contigs = Bio.SeqIO.parse(input_fasta_file, "fasta")
-        for contig in fasta_contigs:
-            molecule_type = str(contig.seq.alphabet).replace(
-                'IUPACAmbiguous', '').strip('()')
-            contig_ids.add(contig.id)
-            for feature in features_by_contig.get(contig.id, []):
-                self._transform_feature(contig, feature)
-
-        for cid in set(features_by_contig.keys()) - contig_ids:
-            self.warn(f"Sequence name {cid} does not match a sequence id in the FASTA file."
-                      f"{len(features_by_contig[cid])} features will not be imported.")
-            if self.strict:
-                raise ValueError("Every feature sequence id must match a fasta sequence id")
+        # the assembly statistics are collected here so the saved Assembly need not be fetched
+        assembly_stats = AssemblyStats()
         prot_fasta_path = f"{self.cfg.sharedFolder}/{params['genome_name']}_protein.fasta"
-        # if is a metagenome, the following function writes a protein fasta
-        self._process_cdss(prot_fasta_path)
+
+        # contig bases are read from the FASTA as features need them
+        fasta_index = FastaIndex.build(input_fasta_file)
+        molecule_type = self._sample_molecule_type(fasta_index)
+        if self.is_metagenome:
+            self.protein_fasta = ProteinFastaWriter(prot_fasta_path)
+
+        def fasta_contigs():
+            for contig in fasta_index:
+                contig_id = contig.record.name
+                contig_ids.add(contig_id)
+                if not params.get('existing_assembly_ref'):
+                    assembly_stats.add(contig_id, contig.get_bytes())
+                yield contig_id, contig
+
+        def features():
+            """Transform the features, returning the feature file of a streamed metagenome"""
+            feature_file = None
+            try:
+                if self.is_metagenome and self._gff_grouped_by_contig(input_gff_file):
+                    # only one contig's features are held at a time
+                    feature_file = self._stream_metagenome_features(
+                        params, input_gff_file, dict(fasta_contigs()))
+                else:
+                    # reading in GFF file
+                    features_by_contig = self._retrieve_gff_file(input_gff_file)
+                    # parse feature information
+                    self._transform_contigs(
+                        ((contig_id, contig) for contig_id, contig in fasta_contigs()
+                         if contig_id in features_by_contig),
+                        features_by_contig)
+                    for cid in set(features_by_contig.keys()) - contig_ids:
+                        self._missing_contig(cid, len(features_by_contig[cid]))
+                    self._process_cdss()
+            finally:
+                fasta_index.close()
+
+            if self.is_metagenome:
+                self.protein_fasta.close()
+                logging.info(f"Wrote {len(self.protein_fasta)} proteins to {prot_fasta_path}")
+            return feature_file
 
         # save assembly file
         '''
@@ -164,7 +236,18 @@ class FastaGFFToGenome:
             genome_type = "metagenome"
         else:
             genome_type = params.get('genome_type', 'isolate')
-        if params.get('existing_assembly_ref'):
+
+        def assembly():
+            """Save the assembly, or fetch the existing one. Returns its ref and, for an
+            existing assembly, its data"""
+            if not params.get('existing_assembly_ref'):
+                return self.au.save_assembly_from_fasta(
+                    {'file': {'path': input_fasta_file},
+                     'workspace_name': params['workspace_name'],
+                     'assembly_name': params['genome_name'] + ".assembly",
+                     'type': genome_type,
+                     }), None
+
             assembly_ref = params['existing_assembly_ref']
 
             ret = self.dfu.get_objects(
@@ -178,33 +261,60 @@ class FastaGFFToGenome:
             ]
             if assembly_obj_type not in valid_assembly_types:
                 raise ValueError(f"{assembly_ref} is not a reference to an assembly")
+            return assembly_ref, ret['data']
+
+        def gff_upload(*_):
+            # Phytozome gff files are not compatible with the RNASeq Pipeline
+            # so it's better to build from the object than cache the file
+            if self.is_phytozome or self.is_metagenome:
+                gff_file_to_shock = self.dfu.file_to_shock(
+                    {'file_path': input_gff_file, 'make_handle': 1, 'pack': "gzip"})
+                return gff_file_to_shock['handle']['hid']
+            return None
+
+        def protein_upload(_):
+            # save protein fasta to shock
+            prot_to_shock = self.dfu.file_to_shock(
+                {'file_path': prot_fasta_path, 'make_handle': 1, 'pack': 'gzip'}
+            )
+            return prot_to_shock['handle']['hid']
 
-            assembly_data = ret['data']
-            # should do more thorough check of sequences.
-            if not validate_lists_have_same_elements(
-                assembly_data['contigs'].keys(),
-                contig_ids
-            ):
-                raise ValueError(f"provided assembly with ref {assembly_ref} does not "
-                                  "have matching contig ids to provided input fasta.")
-
-            logging.info(f"Using supplied assembly: {assembly_ref}")
-
-        else:
-            assembly_ref = self.au.save_assembly_from_fasta(
-                {'file': {'path': input_fasta_file},
-                 'workspace_name': params['workspace_name'],
-                 'assembly_name': params['genome_name'] + ".assembly",
-                 'type': genome_type,
-                 })
-            assembly_data = self.dfu.get_objects(
-                {'object_refs': [assembly_ref],
-                 'ignore_errors': 0})['data'][0]['data']
-
-        # generate genome info
-        genome = self._gen_genome_info(assembly_ref, assembly_data,
-                                       input_gff_file, molecule_type,
-                                       prot_fasta_path, params)
+        def genome_info(feature_file, saved_assembly, gff_handle_ref, protein_handle_ref=None):
+            assembly_ref, assembly_data = saved_assembly
+            if assembly_data is None:
+                assembly_data = assembly_stats.assembly_data()
+            else:
+                # should do more thorough check of sequences.
+                if not validate_lists_have_same_elements(
+                    assembly_data['contigs'].keys(),
+                    contig_ids
+                ):
+                    raise ValueError(f"provided assembly with ref {assembly_ref} does not "
+                                      "have matching contig ids to provided input fasta.")
+
+                logging.info(f"Using supplied assembly: {assembly_ref}")
+
+            # generate genome info
+            return self._gen_genome_info(assembly_ref, assembly_data, molecule_type, params,
+                                         gff_handle_ref, protein_handle_ref, feature_file)
+
+        stages = StageScheduler()
+        stages.add('features', features, local=True)
+        stages.add('assembly', assembly, side_effects=True)
+        # whether the GFF is from Phytozome is only known once it has been read
+        stages.add('gff_upload', gff_upload, () if self.is_metagenome else ('features',),
+                   side_effects=True)
+        genome_depends = ['features', 'assembly', 'gff_upload']
+        if self.is_metagenome:
+            stages.add('protein_upload', protein_upload, ('features',), side_effects=True)
+            genome_depends.append('protein_upload')
+        stages.add('genome', genome_info, genome_depends, local=True)
+        # forking while the stage threads run could copy a lock one of them holds
+        self._start_pools()
+        try:
+            genome = stages.run()['genome']
+        finally:
+            self._shutdown_pools()
 
         if self.spoof_gene_count > 0:
             self.warn(warnings['spoofed_genome'].format(self.spoof_gene_count))
@@ -215,6 +325,70 @@ class FastaGFFToGenome:
 
         return genome
 
+    def _start_pools(self):
+        """Fork the configured transform and translation workers. The transform workers keep
+        the importer as it is now, before any GFF has been read"""
+        global _pool_state
+        if self.transform_workers > 1:
+            _pool_state = self
+            try:
+                # workers are forked so they share the ontology mappings
+                self.transform_pool = fork_pool(self.transform_workers)
+            finally:
+                _pool_state = None
+        self.translation_pool = translation_pool(self.translation_workers)
+
+    def _shutdown_pools(self):
+        for pool in (self.transform_pool, self.translation_pool):
+            if pool is not None:
+                pool.shutdown()
+        self.transform_pool = self.translation_pool = None
+
+    def _missing_contig(self, contig_id, num_features):
+        self.warn(f"Sequence name {contig_id} does not match a sequence id in the FASTA file."
+                  f"{num_features} features will not be imported.")
+        if self.strict:
+            raise ValueError("Every feature sequence id must match a fasta sequence id")
+
+    def _stream_metagenome_features(self, params, input_gff_file, contigs):
+        """
+        Import the features of a metagenome GFF whose lines are grouped by contig a few contigs
+        at a time: the features of each contig are read and transformed and, once a batch of
+        them has built up, their CDSs are translated and they are finished and written to a
+        gzipped JSON file, so only counts and ontology summaries are kept. Returns the closed
+        FeatureJsonWriter.
+
+        """
+        logging.info("Reading GFF file one contig at a time")
+        # digests are needed as soon as each contig is finished
+        self.md5_stage = Md5Stage()
+        contig_lengths = {contig_id: len(contig) for contig_id, contig in contigs.items()}
+        feature_file = FeatureJsonWriter(
+            f'{self.cfg.sharedFolder}/{params["genome_name"]}_features.json.gz')
+        # every batch is translated by the same translation_pool
+        for contig_id, features in itertools.groupby(
+                self._read_gff_features(input_gff_file), key=lambda ftr: ftr['contig']):
+            features = self._fix_identifiers({contig_id: list(features)})[contig_id]
+            if contig_id not in contigs:
+                self._missing_contig(contig_id, len(features))
+                continue
+            for feature in features:
+                self._transform_feature(contigs[contig_id], feature)
+            if len(self.feature_dict) >= STREAM_BATCH_FEATURES:
+                self._write_feature_batch(feature_file, contig_lengths)
+        self._write_feature_batch(feature_file, contig_lengths)
+        feature_file.close()
+        logging.info(f"Wrote {feature_file.num_features} features to {feature_file.path}")
+        return feature_file
+
+    def _write_feature_batch(self, feature_file, contig_lengths):
+        """Translate, finish and write out the features transformed so far"""
+        self._process_cdss()
+        for feature in self.feature_dict.values():
+            feature_file.add(*self._finish_feature(feature, contig_lengths))
+        self.feature_dict = collections.OrderedDict()
+        self.cdss = set()
+
     @staticmethod
     def _location(in_feature):
         in_feature['strand'] = in_feature['strand'].replace(
@@ -281,10 +455,13 @@ class FastaGFFToGenome:
 
     def _stage_input(self, params, input_directory):
         """
-        stage_input: Setup the input_directory by fetching the files and uncompressing if needed
+        stage_input: Setup the input_directory by fetching the files and uncompressing if needed.
+        Local files are linked rather than copied and gzip or bzip2 files are decompressed
+        straight into the staging directory; only archives go through DataFileUtil
 
         """
 
+        log_scratch_usage(input_directory, "before staging")
         file_paths = dict()
         for key in ('fasta_file', 'gff_file'):
             file = params[key]
@@ -295,14 +472,17 @@ class FastaGFFToGenome:
             if file.get('path') is not None:
                 local_file_path = file['path']
                 file_path = os.path.join(input_directory, os.path.basename(local_file_path))
-                logging.info(f'Moving file from {local_file_path} to {file_path}')
+                logging.info(f'Staging file from {local_file_path} to {input_directory}')
                 # Metagenome Updates
                 # not sure if we have to be careful about moving the objects
                 # around
-                if os.path.isfile(local_file_path):
+                if not os.path.isfile(local_file_path):
+                    raise FileNotFoundError(f"Input {key} file {local_file_path} not found")
+                if is_archive(local_file_path):
+                    # unpacking may alter the file in place, so don't link it
                     shutil.copy2(local_file_path, file_path)
                 else:
-                    raise FileNotFoundError(f"Input {key} file {local_file_path} not found")
+                    file_path = local_file_path
                 err_msg  = "Shutil copy unsucessful"
 
             elif file.get('shock_id') is not None:
@@ -326,16 +506,25 @@ class FastaGFFToGenome:
                 sys.stdout.flush()
                 if not os.path.isfile(file_path):
                     raise FileNotFoundError(f"{file_path} not a file")
-                dfUtil_result = self.dfu.unpack_file({'file_path': file_path})
-                file_paths[key] = dfUtil_result['file_path']
-                err_msg = "DataFielUtil 'unpack_file' function call"
+                if is_archive(file_path):
+                    dfUtil_result = self.dfu.unpack_file({'file_path': file_path})
+                    file_paths[key] = dfUtil_result['file_path']
+                    err_msg = "DataFielUtil 'unpack_file' function call"
+                else:
+                    staged_path = decompress_to(file_path, input_directory)
+                    if staged_path != file_path and file_path.startswith(input_directory):
+                        # the downloaded compressed file is no longer needed
+                        os.remove(file_path)
+                    file_path = file_paths[key] = staged_path
+                    logging.info("staged input file =" + file_path)
+                    err_msg = "Decompression"
             else:
                 raise ValueError('No valid files could be extracted based on the input')
 
             if not os.path.isfile(file_path):
                 raise ValueError(f"{err_msg} for {key} file to {file_path}")
 
-
+        log_scratch_usage(input_directory, "after staging")
         return file_paths
 
     def _retrieve_gff_file(self, input_gff_file):
@@ -346,27 +535,21 @@ class FastaGFFToGenome:
         logging.info("Reading GFF file")
 
         feature_list = collections.defaultdict(list)  # type: dict
-        is_patric = 0
-
-        '''
-        Metagenome Changes:
-            the lines below iterate through the entire gff input file, which
-            for a Metagenome may be an issue.
-
-            ! Only a problem if there are space limits on processing in this
-              request
-        '''
-        for current_line in open(input_gff_file):
-            if current_line.isspace() or current_line == "" or current_line.startswith("#"):
-                continue
+        for ftr in self._read_gff_features(input_gff_file):
+            feature_list[ftr['contig']].append(ftr)
 
-            # Split line
-            try:
-                (contig_id, source_id, feature_type, start, end,
-                 score, strand, phase, attributes) = current_line.split('\t')
-            except ValueError:
-                raise ValueError(f"unable to parse {current_line}")
+        return self._fix_identifiers(feature_list)
 
+    def _read_gff_features(self, input_gff_file):
+        """Yield the features of a GFF file with source specific contig ids corrected, noting
+        whether it is from Phytozome and whether it is a GTF file"""
+        is_patric = 0
+        self.is_gtf = is_gtf_file(input_gff_file, self.gff_chunk_size)
+        if self.is_gtf:
+            logging.info("Building the feature hierarchy from GTF gene and transcript ids")
+        for ftr in read_gff(input_gff_file, self.gff_chunk_size):
+            contig_id = ftr['contig']
+            source_id = ftr['source']
             ''' Do Metagenomes need this phytozome/PATRIC stuff??'''
             # Checking to see if Phytozome
             if "phytozome" in source_id.lower():
@@ -378,48 +561,25 @@ class FastaGFFToGenome:
 
             # PATRIC prepends their contig ids with some gibberish
             if is_patric and "|" in contig_id:
-                contig_id = contig_id.split("|", 1)[1]
-
-            # Populating basic feature object
-            ftr: dict = {'contig': contig_id, 'source': source_id,
-                         'type': feature_type, 'start': int(start),
-                         'end': int(end), 'score': score, 'strand': strand,
-                         'phase': phase, 'attributes': collections.defaultdict(list)}
+                ftr['contig'] = contig_id.split("|", 1)[1]
 
-            # Populating with attribute key-value pair
-            # This is where the feature id is from
-            for attribute in attributes.split(";"):
-                attribute = attribute.strip()
+            yield ftr
 
-                # Sometimes empty string
-                if not attribute:
-                    continue
-
-                # Use of 1 to limit split as '=' character can also be made available later
-                # Sometimes lack of "=", assume spaces instead
-                if "=" in attribute:
-                    key, value = attribute.split("=", 1)
-
-                elif " " in attribute:
-                    key, value = attribute.split(" ", 1)
-
-                else:
-                    logging.debug(f'Unable to parse {attribute}')
-                    continue
-
-                ftr['attributes'][make_snake_case(key)].append(parse.unquote(value.strip('"')))
-
-            ftr['attributes']['raw'] = attributes
-            if "id" in ftr['attributes']:
-                ftr['ID'] = ftr['attributes']['id'][0]
-            if "parent" in ftr['attributes']:
-                ftr['Parent'] = ftr['attributes']['parent'][0]
-
-            feature_list[contig_id].append(ftr)
+    def _fix_identifiers(self, feature_list):
+        """Give every feature of a {contig_id: features} dict an identifier following the same
+        general rules"""
+        # GTF lines are linked by their gene and transcript ids rather than ID and Parent
+        if self.is_gtf:
+            for contig_id, features in feature_list.items():
+                feature_list[contig_id] = gtf_hierarchy(features)
 
         # Some GFF/GTF files don't use "ID" so we go through the possibilities
         feature_list = self._add_missing_identifiers(feature_list)
 
+        # Children may come before their parents in files that aren't sorted that way
+        for contig_id, features in feature_list.items():
+            feature_list[contig_id] = parents_first(features)
+
         # Most bacterial files have only CDSs
         # In order to work with prokaryotic and eukaryotic gene structure synonymously
         # Here we add feature dictionaries representing the parent gene and mRNAs
@@ -435,6 +595,50 @@ class FastaGFFToGenome:
 
         return feature_list
 
+    def _gff_grouped_by_contig(self, input_gff_file):
+        """Check in one pass over the lines of a GFF file, without parsing the features, that
+        all the lines for a contig are together and, as _contig_local does for parsed features,
+        that no ID or Parent link spans contigs, so the file can be processed a contig at a
+        time. Also notes whether the file is from Phytozome, as that changes the identifiers of
+        every contig"""
+        seen = set()
+        current = None
+        is_patric = False
+        contig_of = {}
+        # Parents not seen yet -> the contig of the features naming them
+        awaited = {}
+        for line in iter_gff_lines(input_gff_file, self.gff_chunk_size):
+            if not line or line[0] == '#' or line.isspace():
+                continue
+            columns = line.split('\t')
+            if len(columns) < 9:
+                # leave reporting the bad line to the parser
+                return False
+            contig_id, source_id = columns[0], columns[1]
+            if "phytozome" in source_id.lower():
+                self.is_phytozome = True
+            if "PATRIC" in source_id:
+                is_patric = True
+            if is_patric and "|" in contig_id:
+                contig_id = contig_id.split("|", 1)[1]
+            if contig_id != current:
+                if contig_id in seen:
+                    return False
+                seen.add(contig_id)
+                current = contig_id
+            feat_id, parent_id = feature_links(columns[8])
+            if feat_id is not None:
+                if contig_of.setdefault(feat_id, contig_id) != contig_id or \
+                        awaited.pop(feat_id, contig_id) != contig_id:
+                    return False
+            if parent_id is not None:
+                parent_contig = contig_of.get(parent_id)
+                if parent_contig is None:
+                    parent_contig = awaited.setdefault(parent_id, contig_id)
+                if parent_contig != contig_id:
+                    return False
+        return True
+
     def _add_missing_identifiers(self, feature_list):
         logging.info("Adding missing identifiers")
         # General rule is to iterate through a range of possibilities if "ID" is missing
@@ -452,10 +656,11 @@ class FastaGFFToGenome:
                             break
                     if feat['type'] not in self.skip_types:
                         self.feature_counts[feat['type']] += 1
+                        self.missing_id_counts[feat['type']] += 1
 
                     # If the process fails, throw an error
                     if "ID" not in feature_list[contig][i]:
-                        feat['ID'] = f"{feat['type']}_{self.feature_counts[feat['type']]}"
+                        feat['ID'] = f"{feat['type']}_{self.missing_id_counts[feat['type']]}"
         return feature_list
 
     def _add_missing_parents(self, feature_list):
@@ -570,47 +775,18 @@ class FastaGFFToGenome:
                 last_start = location[1]
         return None
 
-    def _create_ontology_event(self, ontology_type):
-        """Creates the ontology_event if necessary
-        Returns the index of the ontology event back."""
-        if ontology_type not in self.ont_mappings:
-            raise ValueError("{} is not a supported ontology".format(ontology_type))
-
-        if "event_index" not in self.ont_mappings[ontology_type]:
-            self.ont_mappings[ontology_type]['event_index'] = len(self.ontology_events)
-            if ontology_type == "GO":
-                ontology_ref = "KBaseOntology/gene_ontology"
-            elif ontology_type == "PO":
-                ontology_ref = "KBaseOntology/plant_ontology"
-            else:
-                ontology_ref = f"KBaseOntology/{ontology_type.lower()}_ontology"
-            self.ontology_events.append({
-                "method": "GenomeFileUtils Genbank uploader from annotations",
-                "method_version": self.version,
-                "timestamp": self.time_string,
-                "id": ontology_type,
-                "ontology_ref": ontology_ref
-            })
-
-        return self.ont_mappings[ontology_type]['event_index']
-
     def _get_ontology_db_xrefs(self, feature):
         """Splits the ontology info from the other db_xrefs"""
         ontology = collections.defaultdict(dict)  # type: dict
-        db_xrefs = []
         # these are keys are formatted strangely and require special parsing
         for key in ("go_process", "go_function", "go_component"):
-            ontology_event_index = self._create_ontology_event("GO")
             for term in feature.get(key, []):
-                sp = term.split(" - ")
-                ontology['GO'][sp[0]] = [ontology_event_index]
-                self.ontologies_present['GO'][sp[0]] = self.ont_mappings['GO'].get(sp[0], '')
+                self.ontology.add_term(ontology, 'GO', term.split(" - ")[0])
 
         # CATH terms are not distinct from EC numbers so myst be found by key
         for term in feature.get('cath_funfam', []) + feature.get('cath', []):
             for ref in term.split(','):
-                ontology['CATH'][ref] = [self._create_ontology_event("CATH")]
-                self.ontologies_present['CATH'][ref] = self.ont_mappings['CATH'].get(ref, '')
+                self.ontology.add_term(ontology, 'CATH', ref)
 
         search_keys = ['ontology_term', 'db_xref', 'dbxref', 'product_source', 'tigrfam', 'pfam',
                        'cog', 'go', 'po', 'ko']
@@ -620,38 +796,80 @@ class FastaGFFToGenome:
             if key in feature:
                 ont_terms += [x for y in feature[key] for x in y.split(',')]
 
-        for ref in ont_terms:
-            if ref.startswith('GO:'):
-                ontology['GO'][ref] = [self._create_ontology_event("GO")]
-                self.ontologies_present['GO'][ref] = self.ont_mappings['GO'].get(ref, '')
-            elif ref.startswith('PO:'):
-                ontology['PO'][ref] = [self._create_ontology_event("PO")]
-                self.ontologies_present['PO'][ref] = self.ont_mappings['PO'].get(ref, '')
-            elif ref.startswith('KO:'):
-                ontology['KO'][ref] = [self._create_ontology_event("KO")]
-                self.ontologies_present['KO'][ref] = self.ont_mappings['KO'].get(ref, '')
-            elif ref.startswith('COG'):
-                ontology['COG'][ref] = [self._create_ontology_event("COG")]
-                self.ontologies_present['COG'][ref] = self.ont_mappings['COG'].get(ref, '')
-            elif ref.startswith('PF'):
-                ontology['PFAM'][ref] = [self._create_ontology_event("PFAM")]
-                self.ontologies_present['PFAM'][ref] = self.ont_mappings['PFAM'].get(ref, '')
-            elif ref.startswith('TIGR'):
-                ontology['TIGRFAM'][ref] = [self._create_ontology_event("TIGRFAM")]
-                self.ontologies_present['TIGRFAM'][ref] = self.ont_mappings['TIGRFAM'].get(ref, '')
-            elif ":" not in ref:
-                db_xrefs.append(tuple(["Unknown_Source", ref]))
-            else:
-                db_xrefs.append(tuple(ref.split(":", 1)))
+        ontology, db_xrefs = self.ontology.classify(ont_terms, ontology)
         return dict(ontology), db_xrefs
 
+    @staticmethod
+    def _sample_molecule_type(fasta_index):
+        """The molecule type Bio.SeqIO gives the sequences of the FASTA, found by parsing the
+        start of the first contig rather than every contig"""
+        if not len(fasta_index):
+            return None
+        sample = next(iter(fasta_index)).get_bytes(0, 1000).decode('ascii')
+        contig = Bio.SeqIO.read(io.StringIO(f">sample\n{sample}\n"), "fasta")
+        return str(contig.seq.alphabet).replace('IUPACAmbiguous', '').strip('()')
+
+    def _transform_contigs(self, contigs, features_by_contig):
+        """Transform the features of each (contig_id, contig_seq) in turn. With a transform
+        pool started, and no feature ids or parent links spanning contigs, contigs are
+        transformed in the pool and merged back in contig order so the features, warnings and
+        ontology events match a serial run"""
+        if self.transform_pool is None or not _contig_local(features_by_contig):
+            for contig_id, contig_seq in contigs:
+                for feature in features_by_contig[contig_id]:
+                    self._transform_feature(contig_seq, feature)
+            return
+
+        logging.info(f"Transforming contigs with {self.transform_workers} workers")
+        # only keep a few contigs ahead of the results being merged
+        in_flight = deque()
+        for contig_id, contig_seq in contigs:
+            in_flight.append(self.transform_pool.submit(
+                _transform_contig, features_by_contig[contig_id], contig_seq))
+            if len(in_flight) >= 2 * self.transform_workers:
+                self._merge_contig(*in_flight.popleft().result())
+        while in_flight:
+            self._merge_contig(*in_flight.popleft().result())
+
+    def _transform_contig_features(self, contig_seq, features):
+        """Transform one contig's features starting from an empty state. Runs in a worker
+        process and returns what _merge_contig needs"""
+        self.feature_dict = collections.OrderedDict()
+        self.cdss = set()
+        self.warnings = []
+        self.ontology.reset()
+        self.md5_stage = Md5Stage()
+        for feature in features:
+            self._transform_feature(contig_seq, feature)
+        # CDS ids are added to self.cdss as they are added to the feature dict
+        cdss = [feat_id for feat_id in self.feature_dict if feat_id in self.cdss]
+        return (self.feature_dict, cdss, self.warnings, self.ontology.ontology_events,
+                dict(self.ontology.ontologies_present))
+
+    def _merge_contig(self, feature_dict, cdss, contig_warnings, ontology_events,
+                      ontologies_present):
+        """Add a contig transformed in a worker, renumbering its ontology event indexes"""
+        index_map = self.ontology.merge(ontology_events, ontologies_present)
+        for feat in feature_dict.values():
+            # exons and UTRs are only kept on their parent
+            for sub_feat in itertools.chain(
+                    [feat], *(feat.get(key, []) for key in
+                              ('exon', 'five_prime_UTR', 'three_prime_UTR'))):
+                for terms in sub_feat.get('ontology_terms', {}).values():
+                    for term, indexes in terms.items():
+                        terms[term] = [index_map[i] for i in indexes]
+        self.feature_dict.update(feature_dict)
+        self.cdss.update(cdss)
+        self.warnings.extend(contig_warnings)
+
     '''
     Metagenome Changes:
         okay looks like this might be the real meat of it
     '''
-    def _transform_feature(self, contig, in_feature):
+    def _transform_feature(self, contig_seq, in_feature):
         """Converts a feature from the gff ftr format into the appropriate
-        format for a genome object """
+        format for a genome object. contig_seq is the uppercased contig as bytes or a
+        FastaContig"""
         def _aliases(feat):
             keys = ('locus_tag', 'old_locus_tag', 'protein_id',
                     'transcript_id', 'gene', 'ec_number', 'gene_synonym')
@@ -661,24 +879,26 @@ class FastaGFFToGenome:
                     alias_list.extend([(key, val) for val in feat['attributes'][key]])
             return alias_list
 
-        if in_feature['start'] < 1 or in_feature['end'] > len(contig):
+        if in_feature['start'] < 1 or in_feature['end'] > len(contig_seq):
             self.warn(f"Feature with invalid location for specified contig: {in_feature}")
             if self.strict:
                 raise ValueError("Features must be completely contained within the Contig in the "
                                  f"Fasta file. Feature: in_feature")
             return
 
-        feat_seq = contig.seq[in_feature['start']-1:in_feature['end']].upper()
-        if in_feature['strand'] in {'-', '-1'}:
-            feat_seq = feat_seq.reverse_complement()
+        seq_bytes = extract_sequence(contig_seq, in_feature['start'] - 1, in_feature['end'],
+                                     reverse_complement=in_feature['strand'] in {'-', '-1'})
+        feat_seq = seq_bytes.decode('ascii')
 
         # if the feature ID is duplicated (CDS or transpliced gene) we only
-        # need to update the location and dna_sequence
+        # need to update the location and dna_sequence. The sequences of the parts are
+        # collected and only joined once the feature is complete, see _join_segments
         if in_feature.get('ID') in self.feature_dict:
             existing = self.feature_dict[in_feature['ID']]
             existing['location'].append(self._location(in_feature))
-            existing['dna_sequence'] = existing.get('dna_sequence', '') + str(feat_seq)
-            existing['dna_sequence_length'] = len(existing['dna_sequence'])
+            if 'dna_sequence_segments' not in existing:
+                existing['dna_sequence_segments'] = [existing.get('dna_sequence', '')]
+            existing['dna_sequence_segments'].append(feat_seq)
             return
 
         # The following is common to all the feature types
@@ -686,9 +906,9 @@ class FastaGFFToGenome:
             "id": in_feature.get('ID'),
             "type": in_feature['type'],
             "location": [self._location(in_feature)],
-            "dna_sequence": str(feat_seq),
+            "dna_sequence": feat_seq,
             "dna_sequence_length": len(feat_seq),
-            "md5": hashlib.md5(str(feat_seq).encode('utf8')).hexdigest(),
+            "md5": self.md5_stage.add(seq_bytes),
             "warnings": [],
             "flags": [],
         }
@@ -804,19 +1024,21 @@ class FastaGFFToGenome:
 
         self.feature_dict[out_feat['id']] = out_feat
 
-    def _process_cdss(self, prot_fasta_path):
+    def _process_cdss(self):
         """Because CDSs can have multiple fragments, it's necessary to go
-        back over them to calculate a final protein sequence"""
+        back over them to calculate a final protein sequence. Metagenome proteins are written
+        to the protein FASTA instead of being stored on the CDSs"""
         if self.is_metagenome:
-            prot_fasta = {}  # type: dict
             untranslatable_prot = set()
-        for cds_id in self.cdss:
+        cds_ids = list(self.cdss)
+        translations = iter_translate_cdss(
+            (self._join_segments(self.feature_dict[cds_id])['dna_sequence']
+             for cds_id in cds_ids), self.code_table, self.translation_workers,
+            pool=self.translation_pool)
+        for cds_id, prot_seq in zip(cds_ids, translations):
             cds = self.feature_dict[cds_id]
-            try:
-                prot_seq = str(Seq(cds['dna_sequence']).translate(
-                            self.code_table, cds=True).strip("*"))
-            except TranslationError as e:
-                cds['warnings'] = cds.get('warnings', []) + [str(e)]
+            if isinstance(prot_seq, TranslationError):
+                cds['warnings'] = cds.get('warnings', []) + [str(prot_seq)]
                 # NOTE: we may need a different way of handling this for metagenomes.
                 prot_seq = ""
                 if self.is_metagenome:
@@ -837,18 +1059,14 @@ class FastaGFFToGenome:
                         pass
                     # TODO: update header to reflect what we actually want people
                     # to see.
-                    if protein_id in prot_fasta:
-                        prot_fasta[protein_id][0] += "|" + cds['id']
-                    else:
-                        fasta_seq_data = ">" + protein_id + " cds_ids:" + cds['id']
-                        prot_fasta[protein_id] = [fasta_seq_data, prot_seq]
+                    self.protein_fasta.add(protein_id, cds['id'], prot_seq)
                 else:
                     pass
 
             else:
                 cds.update({
                     "protein_translation": prot_seq,
-                    "protein_md5": hashlib.md5(prot_seq.encode('utf8')).hexdigest(),
+                    "protein_md5": self.md5_stage.add(prot_seq),
                     "protein_translation_length": len(prot_seq),
                 })
 
@@ -869,12 +1087,16 @@ class FastaGFFToGenome:
                 raise ValueError(warnings['no_spoof'])
 
             self.feature_dict[cds['id']] = cds
+        # do something with 'untranslatable_prot'
 
-        if self.is_metagenome:
-            with open(prot_fasta_path, 'w') as fid:
-                for key, line in prot_fasta.items():
-                    fid.write('\n'.join(line))
-            # do something with 'untranslatable_prot'
+    @staticmethod
+    def _join_segments(feature):
+        """Set the sequence of a feature made of several GFF lines from its collected parts"""
+        segments = feature.pop('dna_sequence_segments', None)
+        if segments is not None:
+            feature['dna_sequence'] = "".join(segments)
+            feature['dna_sequence_length'] = len(feature['dna_sequence'])
+        return feature
 
     def _update_from_exons(self, feature):
         """This function updates the sequence and location of a feature based
@@ -898,25 +1120,27 @@ class FastaGFFToGenome:
 
         # construct feature location from utrs and cdss if present
         elif 'cds' in feature:
-            cds = [copy.deepcopy(self.feature_dict[feature['cds']])]
+            cds = self.feature_dict[feature['cds']]
             locs = []  # type: list
-            seq = ""
-            for frag in feature.get('five_prime_UTR', []) + cds + \
-                    feature.get('three_prime_UTR', []):
-
+            seqs = []
+            for frag in itertools.chain(feature.get('five_prime_UTR', []), [cds],
+                                        feature.get('three_prime_UTR', [])):
+                frag_locs = frag['location']
                 # merge into last location if adjacent
-                if locs and abs(end(locs) - start(frag['location'])) == 1:
+                if locs and abs(end(locs) - start(frag_locs)) == 1:
                     # extend the location length by the length of the first
-                    # location in the fragment
-                    first = frag['location'].pop(0)
-                    locs[-1][3] += first[3]
+                    # location in the fragment. The merged location is a new list as
+                    # the others are shared with the CDS
+                    contig_id, first_base, strand, length = locs[-1]
+                    locs[-1] = [contig_id, first_base, strand, length + frag_locs[0][3]]
+                    frag_locs = frag_locs[1:]
 
-                locs.extend(frag['location'])
-                seq += frag['dna_sequence']
+                locs.extend(frag_locs)
+                seqs.append(frag['dna_sequence'])
 
             feature['location'] = locs
-            feature['dna_sequence'] = seq
-            feature['dna_sequence_length'] = len(seq)
+            feature['dna_sequence'] = "".join(seqs)
+            feature['dna_sequence_length'] = len(feature['dna_sequence'])
 
         # remove these properties as they are no longer needed
         for x in ['five_prime_UTR', 'three_prime_UTR', 'exon']:
@@ -926,7 +1150,8 @@ class FastaGFFToGenome:
             ValueError('Feature {feature["id"]} must contain either exon or cds data to '
                        'construct an accurate location and sequence')
 
-    def _gen_genome_info(self, assembly_ref, assembly, input_gff_file, molecule_type, prot_fasta_path, params):
+    def _gen_genome_info(self, assembly_ref, assembly, molecule_type, params, gff_handle_ref=None,
+                         protein_handle_ref=None, feature_file=None):
         """
         _gen_genome_info: generate genome info
         Here is the meat of the saving operation.
@@ -937,11 +1162,11 @@ class FastaGFFToGenome:
             mrnas: mrna sequences
             non_coding_features: everything that doesn't fall into 'features',
                 'cdss', 'mrnas'
+
+        The GFF and protein FASTA have already been uploaded where they are kept. A
+        metagenome's features may already have been written to feature_file, a closed
+        FeatureJsonWriter, as they were finished.
         """
-        features = []
-        cdss = []
-        mrnas = []
-        non_coding_features = []
         genome = {
             "id": params.get('genome_name'),
             "scientific_name": params.get('scientific_name', "Unknown"),
@@ -951,8 +1176,8 @@ class FastaGFFToGenome:
             "dna_size": assembly["dna_size"],
             'md5': assembly['md5'],
             'num_contigs': len(assembly['contigs']),
-            'ontologies_present': dict(self.ontologies_present),
-            'ontology_events': self.ontology_events,
+            'ontologies_present': dict(self.ontology.ontologies_present),
+            'ontology_events': self.ontology.ontology_events,
         }
         if self.is_metagenome:
             metagenome_fields = [
@@ -966,11 +1191,7 @@ class FastaGFFToGenome:
             for field, default in metagenome_fields:
                 genome[field] = params.get(field, default)
 
-            # save protein fasta to shock
-            prot_to_shock = self.dfu.file_to_shock(
-                {'file_path': prot_fasta_path, 'make_handle': 1, 'pack': 'gzip'}
-            )
-            genome['protein_handle_ref'] = prot_to_shock['handle']['hid']
+            genome['protein_handle_ref'] = protein_handle_ref
 
         genome['contig_ids'], genome['contig_lengths'] = zip(
             *[(k, v['length']) for k, v in assembly['contigs'].items()])
@@ -991,88 +1212,121 @@ class FastaGFFToGenome:
             if params.get(key):
                 genome[key] = params[key]
 
-        # Phytozome gff files are not compatible with the RNASeq Pipeline
-        # so it's better to build from the object than cache the file
-        if self.is_phytozome or self.is_metagenome:
-            gff_file_to_shock = self.dfu.file_to_shock(
-                {'file_path': input_gff_file, 'make_handle': 1, 'pack': "gzip"})
-            genome['gff_handle_ref'] = gff_file_to_shock['handle']['hid']
-
-        for feature in self.feature_dict.values():
-            self.feature_counts[feature['type']] += 1
-            if 'exon' in feature or feature['type'] == 'mRNA':
-                self._update_from_exons(feature)
-
-            # Test if location order is in order.
-            is_transpliced = "flags" in feature and "trans_splicing" in feature["flags"]
-            if not is_transpliced and len(feature["location"]) > 1:
-                # Check the order only if not trans_spliced and has more than 1 location.
-                location_warning = self._check_location_order(feature["location"])
-                if location_warning is not None:
-                    feature["warnings"] = feature.get('warnings', []) + [location_warning]
-
-            contig_len = genome["contig_lengths"][genome["contig_ids"].index(feature["location"][0][0])]
-            feature = check_full_contig_length_or_multi_strand_feature(
-                feature, is_transpliced, contig_len, self.skip_types)
-
-            # sort features into their respective arrays
-            if feature['type'] == 'CDS':
-                if not self.is_metagenome:
-                    del feature['type']
-                cdss.append(feature)
-            elif feature['type'] == 'mRNA':
-                if not self.is_metagenome:
-                    del feature['type']
-                mrnas.append(feature)
-            elif feature['type'] == 'gene':
-                # remove duplicates that may arise from CDS info propagation
-                for key in ('functions', 'aliases', 'db_xrefs'):
-                    if key in feature:
-                        feature[key] = list(set(feature[key]))
-                if feature['cdss']:
-                    if not self.is_metagenome:
-                        del feature['type']
-                    self.feature_counts["protein_encoding_gene"] += 1
-                    features.append(feature)
-                else:
-                    feature.pop('mrnas', None)
-                    feature.pop('cdss', None)
-                    feature.pop('protein_translation_length', None)
-                    self.feature_counts["non_coding_gene"] += 1
-                    non_coding_features.append(feature)
-            else:
-                non_coding_features.append(feature)
+        if gff_handle_ref is not None:
+            genome['gff_handle_ref'] = gff_handle_ref
 
-        # if input is metagenome, save features, cdss, non_coding_features, and
-        # mrnas to shock
-        if self.is_metagenome:
-            # TODO: make this section more efficient by editing the above.
-            metagenome_features = features + cdss + mrnas + non_coding_features
-            genome['num_features'] = len(metagenome_features)
-            genome_name = params['genome_name']
-            json_file_path = f'{self.cfg.sharedFolder}/{genome_name}_features.json'
-            # save to json files first
-            with open(json_file_path, 'w') as fid:
-                json.dump(metagenome_features, fid)
-            # write json to shock
-            json_to_shock = self.dfu.file_to_shock(
-                {'file_path': json_file_path, 'make_handle': 1, 'pack': 'gzip'}
-            )
-            self.feature_counts["non_coding_features"] = len(non_coding_features)
-            genome['features_handle_ref'] = json_to_shock['handle']['hid']
-            # remove json file to avoid disk overload
-            os.remove(json_file_path)
-            # delete python objects to reduce overhead
-            del metagenome_features
-            del features, cdss, mrnas, non_coding_features
+        if feature_file is not None:
+            # the features were written as they were finished
+            genome['num_features'] = feature_file.num_features
+            self.feature_counts["non_coding_features"] = \
+                feature_file.counts['non_coding_features']
+            genome['features_handle_ref'] = self._features_to_shock(feature_file.path)
         else:
-            # TODO determine whether we want to deepcopy here instead of reference.
-            genome['features'] = features
-            genome['cdss'] = cdss
-            genome['mrnas'] = mrnas
-            genome['non_coding_features'] = non_coding_features
-            self.feature_counts["non_coding_features"] = len(genome['non_coding_features'])
+            feature_lists = {name: [] for name in FEATURE_LISTS}
+            contig_lengths = dict(zip(genome['contig_ids'], genome['contig_lengths']))
+            if not self.is_metagenome:
+                # md5 placeholders are the size of the digests they are resolved to
+                self.genome_size = GenomeSize(default=placeholder_json)
+            for feature in self.feature_dict.values():
+                feature_list, feature = self._finish_feature(feature, contig_lengths)
+                feature_lists[feature_list].append(feature)
+
+            self.md5_stage.run()
+            for feature_list in feature_lists.values():
+                self.md5_stage.resolve(feature_list)
+
+            self.feature_counts["non_coding_features"] = len(
+                feature_lists['non_coding_features'])
+            if self.is_metagenome:
+                # if input is metagenome, save features, cdss, non_coding_features, and
+                # mrnas to shock
+                feature_file = FeatureJsonWriter(
+                    f'{self.cfg.sharedFolder}/{params["genome_name"]}_features.json.gz')
+                for name, feature_list in feature_lists.items():
+                    for feature in feature_list:
+                        feature_file.add(name, feature)
+                feature_file.close()
+                genome['num_features'] = feature_file.num_features
+                genome['features_handle_ref'] = self._features_to_shock(feature_file.path)
+            else:
+                self._check_genome_size()
+                # TODO determine whether we want to deepcopy here instead of reference.
+                genome.update(feature_lists)
         if self.warnings:
             genome['warnings'] = self.warnings
         genome['feature_counts'] = dict(self.feature_counts)
         return genome
+
+    def _check_genome_size(self):
+        """Fail before the genome is saved if its features would be too big to store even
+        once save_one_genome has removed their dna_sequences"""
+        genome_size = self.genome_size
+        dna_size = sum(genome_size.dna_sizes.values())
+        logging.info(f"The feature lists take {genome_size.total} bytes as JSON, {dna_size} "
+                     "of them DNA sequences")
+        if genome_size.total - dna_size > MAX_GENOME_SIZE:
+            raise ValueError(f"The features of this genome take {genome_size.total - dna_size} "
+                             "bytes without their DNA sequences, which exceeds the maximum "
+                             f"permitted genome size of {MAX_GENOME_SIZE} bytes")
+
+    def _finish_feature(self, feature, contig_lengths):
+        """Final location checks on a transformed feature. Returns the name of the genome
+        feature list it belongs in and the feature, which is counted in genome_size if one is
+        being measured"""
+        self.feature_counts[feature['type']] += 1
+        self._join_segments(feature)
+        if 'exon' in feature or feature['type'] == 'mRNA':
+            self._update_from_exons(feature)
+
+        # Test if location order is in order.
+        is_transpliced = "flags" in feature and "trans_splicing" in feature["flags"]
+        if not is_transpliced and len(feature["location"]) > 1:
+            # Check the order only if not trans_spliced and has more than 1 location.
+            location_warning = self._check_location_order(feature["location"])
+            if location_warning is not None:
+                feature["warnings"] = feature.get('warnings', []) + [location_warning]
+
+        contig_len = contig_lengths[feature["location"][0][0]]
+        feature = check_full_contig_length_or_multi_strand_feature(
+            feature, is_transpliced, contig_len, self.skip_types)
+
+        feature_list = self._sort_feature(feature)
+        if self.genome_size is not None:
+            self.genome_size.add(feature_list, feature)
+        return feature_list, feature
+
+    def _sort_feature(self, feature):
+        """The name of the feature list a finished feature belongs in"""
+        if feature['type'] == 'CDS':
+            if not self.is_metagenome:
+                del feature['type']
+            return 'cdss'
+        elif feature['type'] == 'mRNA':
+            if not self.is_metagenome:
+                del feature['type']
+            return 'mrnas'
+        elif feature['type'] == 'gene':
+            # remove duplicates that may arise from CDS info propagation
+            for key in ('functions', 'aliases', 'db_xrefs'):
+                if key in feature:
+                    feature[key] = list(set(feature[key]))
+            if feature['cdss']:
+                if not self.is_metagenome:
+                    del feature['type']
+                self.feature_counts["protein_encoding_gene"] += 1
+                return 'features'
+            else:
+                feature.pop('mrnas', None)
+                feature.pop('cdss', None)
+                feature.pop('protein_translation_length', None)
+                self.feature_counts["non_coding_gene"] += 1
+                return 'non_coding_features'
+        return 'non_coding_features'
+
+    def _features_to_shock(self, json_file_path):
+        """Save a metagenome's gzipped feature file to shock, returning the handle id"""
+        json_to_shock = self.dfu.file_to_shock(
+            {'file_path': json_file_path, 'make_handle': 1})
+        # remove json file to avoid disk overload
+        os.remove(json_file_path)
+        return json_to_shock['handle']['hid']
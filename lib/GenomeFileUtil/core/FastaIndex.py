@@ -0,0 +1,153 @@
+"""
+An in-memory index of a FASTA file, with memory mapped access to contig bases.
+
+The index is built in one scan of the file, each time it is needed, and holds each record's id,
+length, the offset of its first base and its line layout (bases and bytes per line), as a
+samtools .fai file does, so any part of a contig is read straight from the file without loading
+the rest of it. Sequences come out uppercased and cleaned as Bio.SeqIO's FASTA parser does
+(trailing whitespace and spaces dropped). Records with ragged lines or stray whitespace can't be
+described by a line layout; those are cleaned as a whole, once, when first read.
+"""
+import mmap
+import os
+import re
+import threading
+from collections import namedtuple
+
+_STRAY_WHITESPACE = re.compile(rb'[ \t\x0b\x0c]')
+
+# line_bases is 0 for a record that isn't laid out in regular lines. end is the offset just past
+# the record's last base and is not part of the .fai format
+FastaRecord = namedtuple('FastaRecord', ['name', 'length', 'offset', 'line_bases', 'line_width',
+                                         'end'])
+
+# one read only map per file per process, shared by every contig read from it
+_maps = {}
+_maps_lock = threading.Lock()
+
+
+def _mapped(path):
+    buffer = _maps.get(path)
+    if buffer is None:
+        with _maps_lock:
+            buffer = _maps.get(path)
+            if buffer is None:
+                with open(path, 'rb') as f:
+                    buffer = _maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return buffer
+
+
+def _clean(region):
+    """A record's sequence lines joined as Bio.SeqIO does it"""
+    return b''.join(line.rstrip() for line in region.split(b'\n')).replace(
+        b' ', b'').replace(b'\r', b'')
+
+
+def _index_record(name, region, offset):
+    """Describe the sequence lines of a record, region being its bytes with trailing whitespace
+    removed and offset where they start in the file"""
+    end = offset + len(region)
+    first_newline = region.find(b'\n')
+    if first_newline == -1:
+        if not _STRAY_WHITESPACE.search(region) and b'\r' not in region:
+            return FastaRecord(name, len(region), offset, len(region), len(region) + 1, end)
+    else:
+        line_width = first_newline + 1
+        terminator = b'\r\n' if region[first_newline - 1:first_newline] == b'\r' else b'\n'
+        line_bases = line_width - len(terminator)
+        full_lines, last_bases = divmod(len(region), line_width)
+        if (line_bases and 0 < last_bases <= line_bases
+                and region.count(b'\n') == full_lines
+                and region.count(b'\r') == (full_lines if len(terminator) == 2 else 0)
+                and region[line_width - 1::line_width] == b'\n' * full_lines
+                and region[line_width - len(terminator)::line_width][:full_lines]
+                == terminator[:1] * full_lines
+                and not _STRAY_WHITESPACE.search(region)):
+            return FastaRecord(name, full_lines * line_bases + last_bases, offset, line_bases,
+                               line_width, end)
+    return FastaRecord(name, len(_clean(region)), offset, 0, 0, end)
+
+
+class FastaContig:
+    """The bases of one indexed record, sliced like bytes. Pickles as its index entry so it can
+    be handed to worker processes, which map the file themselves. A record without a regular
+    line layout is cleaned the first time it is read and its bases kept with the contig"""
+    __slots__ = ('path', 'record', '_cleaned')
+
+    def __init__(self, path, record):
+        self.path = path
+        self.record = record
+        self._cleaned = None
+
+    def __reduce__(self):
+        return FastaContig, (self.path, self.record)
+
+    def __len__(self):
+        return self.record.length
+
+    def __getitem__(self, item):
+        start, end, step = item.indices(self.record.length)
+        if step != 1:
+            raise ValueError("FastaContig slices must be contiguous")
+        return self.get_bytes(start, end)
+
+    def get_bytes(self, start=0, end=None):
+        """Uppercased bases [start, end) of the contig"""
+        record = self.record
+        start, end, _ = slice(start, end).indices(record.length)
+        if end <= start:
+            return b''
+        if not record.line_bases:
+            if self._cleaned is None:
+                self._cleaned = _clean(_mapped(self.path)[record.offset:record.end]).upper()
+            return self._cleaned[start:end]
+        buffer = _mapped(self.path)
+        first = record.offset + (start // record.line_bases) * record.line_width \
+            + start % record.line_bases
+        last = record.offset + ((end - 1) // record.line_bases) * record.line_width \
+            + (end - 1) % record.line_bases
+        return buffer[first:last + 1].translate(None, b'\r\n').upper()
+
+
+class FastaIndex:
+    def __init__(self, path, records):
+        self.path = path
+        self.records = records
+
+    def __iter__(self):
+        """Yield a FastaContig for each record in file order"""
+        for record in self.records:
+            yield FastaContig(self.path, record)
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def build(cls, path):
+        """Index a FASTA file in one scan"""
+        records = []
+        if os.path.getsize(path):
+            stale = _maps.pop(path, None)
+            if stale is not None:
+                stale.close()
+            buffer = _mapped(path)
+            header = 0 if buffer[:1] == b'>' else buffer.find(b'\n>')
+            if header != -1 and buffer[:1] != b'>':
+                header += 1
+            while header != -1:
+                seq_start = buffer.find(b'\n', header)
+                if seq_start == -1:
+                    seq_start = len(buffer)
+                title = buffer[header + 1:seq_start].rstrip().decode()
+                name = title.split(None, 1)[0] if title.split() else ""
+                next_header = buffer.find(b'\n>', seq_start)
+                seq_end = len(buffer) if next_header == -1 else next_header
+                region = buffer[seq_start + 1:seq_end].rstrip()
+                records.append(_index_record(name, region, seq_start + 1))
+                header = next_header if next_header == -1 else next_header + 1
+        return cls(path, records)
+
+    def close(self):
+        buffer = _maps.pop(self.path, None)
+        if buffer is not None:
+            buffer.close()
@@ -0,0 +1,65 @@
+"""
+Incremental writer for the gzipped JSON feature file of an AnnotatedMetagenomeAssembly.
+
+Features are written as they are finished instead of being collected for one json.dump, so an
+import holds only the features of the contig it is working on. Each genome feature list goes to
+its own gzip part as it grows; close() joins the parts into one multi-member gzip file which
+decompresses to the same JSON array json.dump would have written for the lists concatenated in
+the order features, cdss, mrnas, non_coding_features. Members are written without a timestamp
+so the same features always give the same file.
+"""
+import gzip
+import io
+import json
+import os
+import shutil
+from collections import Counter
+
+FEATURE_LISTS = ('features', 'cdss', 'mrnas', 'non_coding_features')
+
+
+def _gzip_member(data):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as member:
+        member.write(data)
+    return buffer.getvalue()
+
+
+class FeatureJsonWriter:
+    def __init__(self, path, compresslevel=6):
+        self.path = path
+        self.counts = Counter()  # type: Counter
+        self._part_paths = {name: f"{path}.{name}.part" for name in FEATURE_LISTS}
+        self._parts = {
+            name: io.TextIOWrapper(gzip.GzipFile(part_path, 'wb', compresslevel, mtime=0))
+            for name, part_path in self._part_paths.items()}
+
+    def add(self, feature_list, feature):
+        """Append a feature to one of the genome's feature lists"""
+        part = self._parts[feature_list]
+        if self.counts[feature_list]:
+            part.write(', ')
+        part.write(json.dumps(feature))
+        self.counts[feature_list] += 1
+
+    def close(self):
+        """Join the parts into the final file and return its path"""
+        for part in self._parts.values():
+            part.close()
+        separator = b''
+        with open(self.path, 'wb') as out:
+            out.write(_gzip_member(b'['))
+            for name in FEATURE_LISTS:
+                if self.counts[name]:
+                    out.write(separator)
+                    with open(self._part_paths[name], 'rb') as part:
+                        shutil.copyfileobj(part, out)
+                    separator = _gzip_member(b', ')
+            out.write(_gzip_member(b']'))
+        for part_path in self._part_paths.values():
+            os.remove(part_path)
+        return self.path
+
+    @property
+    def num_features(self):
+        return sum(self.counts.values())
@@ -1,32 +1,82 @@
 import copy
 import datetime
-import hashlib
+import io
+import itertools
 import os
 import re
 import shutil
 import sys
 import time
 import uuid
-from collections import Counter, defaultdict, OrderedDict
+from collections import Counter, defaultdict, deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import logging
 
 import Bio.SeqIO
 import Bio.SeqUtils
-from Bio import Seq
 from Bio.Data.CodonTable import TranslationError
 from Bio.SeqFeature import ExactPosition
 
 from installed_clients.AssemblyUtilClient import AssemblyUtil
 from installed_clients.DataFileUtilClient import DataFileUtil
+from GenomeFileUtil.core.AssemblyStats import AssemblyStats
+from GenomeFileUtil.core.ContigSequenceStore import ContigSequenceStore
+from GenomeFileUtil.core.GeneIntervalIndex import GeneIntervalIndex
 from GenomeFileUtil.core.GenomeInterface import GenomeInterface
+from GenomeFileUtil.core.InputStaging import (
+    is_archive, link_or_copy, log_scratch_usage, nonblank_lines, uncompressed_name
+)
+from GenomeFileUtil.core.Md5Stage import Md5Stage
+from GenomeFileUtil.core.OntologyClassifier import OntologyClassifier
+from GenomeFileUtil.core.SequenceUtils import translate_cdss
 from installed_clients.WorkspaceClient import Workspace
 from GenomeFileUtil.core.GenomeUtils import (
-    is_parent, propagate_cds_props_to_gene, warnings, parse_inferences,
-    load_ontology_mappings, set_taxon_data, set_default_taxon_data
+    MAX_MISC_FEATURE_SIZE, is_parent, propagate_cds_props_to_gene, warnings, parse_inferences,
+    set_taxon_data, set_default_taxon_data
 )
 
-MAX_MISC_FEATURE_SIZE = 10000
-MAX_PARENT_LOOKUPS = 5
+GENBANK_SHARD_SIZE = 2 ** 25
+
+
+def _find_record_shards(file_path, shard_size):
+    """Split a genbank file into (start, end) byte ranges of roughly shard_size that each
+    end on a '//' record terminator line"""
+    shards = []
+    file_size = os.path.getsize(file_path)
+    start = 0
+    with open(file_path, 'rb') as f:
+        while start < file_size:
+            f.seek(start + shard_size)
+            # skip the line the seek landed in, it's probably only part of a line
+            f.readline()
+            for line in iter(f.readline, b''):
+                if line.rstrip() == b'//':
+                    break
+            end = min(f.tell(), file_size)
+            shards.append((start, end))
+            start = end
+    return shards
+
+
+def _genbank_record_ids(file_path):
+    """The ids the records of a genbank file may be known by (LOCUS name, ACCESSION and
+    VERSION), found in one pass over its lines without parsing the records"""
+    ids = set()
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if line.startswith((b'LOCUS', b'ACCESSION', b'VERSION')):
+                fields = line.split()
+                if len(fields) > 1:
+                    ids.add(fields[1].decode())
+    return ids
+
+
+def _parse_genbank_shard(file_path, start, end):
+    """Parse the records in one shard of a genbank file. Runs in a worker process"""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        handle = io.TextIOWrapper(io.BytesIO(f.read(end - start)))
+    return list(Bio.SeqIO.parse(handle, "genbank"))
 
 
 class GenbankToGenome:
@@ -44,15 +94,16 @@ class GenbankToGenome:
         self.generate_parents = False
         self.generate_ids = False
         self.genes = OrderedDict()
+        self.gene_index = GeneIntervalIndex()
         self.mrnas = OrderedDict()
         self.cdss = OrderedDict()
         self.noncoding = []
-        self.ontologies_present = defaultdict(dict)
-        self.ontology_events = list()
         self.skiped_features = Counter()
         self.feature_counts = Counter()
         self.orphan_types = Counter()
-        self.contig_seq = {}
+        self.contig_seq = None
+        # ids of the records in the file, read once a feature refers to a contig not read yet
+        self.file_record_ids = None
         self.circ_contigs = set()
         self.features_spaning_zero = set()
         self.genome_warnings = []
@@ -60,9 +111,11 @@ class GenbankToGenome:
         self.defects = Counter()
         self.spoofed_genes = 0
         self.excluded_features = ('source', 'exon', 'fasta_record')
-        self.ont_mappings = load_ontology_mappings('/kb/module/data')
+        self.ontology = OntologyClassifier('/kb/module/data', self.version, self.time_string)
         self.code_table = 11
         self.re_api_url = config.re_api_url
+        self.parse_workers = int(config.raw.get('genbank-parse-workers', 1))
+        self.md5_stage = Md5Stage(int(config.raw.get('md5-workers', 1)))
         self.default_params = {
             'source': 'Genbank',
             'taxon_wsname': self.cfg.raw['taxon-workspace-name'],
@@ -165,13 +218,12 @@ class GenbankToGenome:
         # is just sitting there, then use it.  Move the file to the staging input directory
         file = params['file']
         genbank_file_path = None
+        log_scratch_usage(self.cfg.sharedFolder, "before staging")
         if file.get('path') is not None:
-            # copy the local file to the input staging directory
+            # link the local file into the input staging directory
             # (NOTE: could just move it, but then this method would have the side effect of moving your
             # file which another SDK module might have an open handle on)
-            local_file_path = file['path']
-            genbank_file_path = os.path.join(input_directory, os.path.basename(local_file_path))
-            shutil.copy2(local_file_path, genbank_file_path)
+            genbank_file_path = self._stage_local_file(file['path'], input_directory)
 
         if 'shock_id' in file and file['shock_id'] is not None:
             # handle shock file
@@ -190,20 +242,31 @@ class GenbankToGenome:
                 'file_url': file['ftp_url'],
                 'download_type': 'FTP'
             })['copy_file_path']
-            genbank_file_path = os.path.join(input_directory,
-                                             os.path.basename(local_file_path))
-            shutil.copy2(local_file_path, genbank_file_path)
+            genbank_file_path = self._stage_local_file(local_file_path, input_directory)
 
-        # extract the file if it is compressed
+        # extract the file if it is an archive. gzip and bzip2 files are decompressed as they
+        # are read
         if genbank_file_path is not None:
             logging.info("staged input file =" + genbank_file_path)
-            self.dfu.unpack_file({'file_path': genbank_file_path})
+            if is_archive(genbank_file_path):
+                self.dfu.unpack_file({'file_path': genbank_file_path})
 
         else:
             raise ValueError('No valid files could be extracted based on the input')
 
+        log_scratch_usage(self.cfg.sharedFolder, "after staging")
         return input_directory
 
+    @staticmethod
+    def _stage_local_file(local_file_path, input_directory):
+        """Link a file into the staging directory. Archives are copied as unpacking may alter
+        them in place"""
+        if is_archive(local_file_path):
+            genbank_file_path = os.path.join(input_directory, os.path.basename(local_file_path))
+            shutil.copy2(local_file_path, genbank_file_path)
+            return genbank_file_path
+        return link_or_copy(local_file_path, input_directory)
+
     def parse_genbank(self, file_path, params):
         logging.info("Saving original file to shock")
         shock_res = self.dfu.file_to_shock({
@@ -211,18 +274,12 @@ class GenbankToGenome:
             'make_handle': 1,
             'pack': 'gzip',
         })
-        # Write and save assembly file
-        assembly_ref = self._save_assembly(file_path, params)
-        assembly_data = self.dfu.get_objects(
-            {'object_refs': [assembly_ref],
-             'ignore_errors': 0})['data'][0]['data']
+        existing_assembly_ref = params.get("use_existing_assembly")
+        if existing_assembly_ref:
+            existing_assembly = self._get_existing_assembly(existing_assembly_ref)
         genome = {
             "id": params['genome_name'],
             "original_source_file_name": os.path.basename(file_path),
-            "assembly_ref": assembly_ref,
-            "gc_content": assembly_data['gc_content'],
-            "dna_size": assembly_data['dna_size'],
-            "md5": assembly_data['md5'],
             "genbank_handle_ref": shock_res['handle']['hid'],
             "publications": set(),
             "contig_ids": [],
@@ -241,34 +298,75 @@ class GenbankToGenome:
             set_default_taxon_data(genome)
 
         dates = []
-        # Parse data from genbank file
-        contigs = Bio.SeqIO.parse(file_path, "genbank")
-        for record in contigs:
-            r_annot = record.annotations
-            logging.info("parsing contig: " + record.id)
-            try:
-                dates.append(time.strptime(r_annot.get('date'), "%d-%b-%Y"))
-            except (TypeError, ValueError):
-                pass
-            genome['contig_ids'].append(record.id)
-            genome['contig_lengths'].append(len(record))
-            genome["publications"] |= self._get_pubs(r_annot)
-
-            # only do the following once(on the first contig)
-            if "source_id" not in genome:
-                genome["source_id"] = record.id.split('.')[0]
-                organism = r_annot.get('organism', 'Unknown Organism')
-                if params.get('scientific_name'):
-                    genome['scientific_name'] = params['scientific_name']
-                else:
-                    genome['scientific_name'] = organism
-                self.code_table = genome['genetic_code']
-                genome["molecule_type"] = r_annot.get('molecule_type', 'DNA')
-                genome['notes'] = r_annot.get('comment', "").replace('\\n', '\n')
-
-            self._parse_features(record, params['source'])
+        extra_info = defaultdict(dict)
+        assembly_stats = AssemblyStats()
+        # records wait here until every contig their features reference has been read
+        pending_records = deque()
+        fasta_file = f"{self.cfg.sharedFolder}/{params['genome_name']}_assembly.fasta"
+        # contig sequences are kept on disk rather than in memory while features are extracted
+        self.contig_seq = ContigSequenceStore(
+            os.path.join(self.cfg.sharedFolder, f"contig_seq_{uuid.uuid4()}.bin"))
+        try:
+            # Parse data from genbank file, writing the assembly fasta in the same pass
+            with open(fasta_file, 'w') as fasta_out:
+                for record in self._iter_genbank_records(file_path):
+                    r_annot = record.annotations
+                    logging.info("parsing contig: " + record.id)
+                    self._add_contig(record, extra_info)
+                    if not existing_assembly_ref:
+                        Bio.SeqIO.write(record, fasta_out, "fasta")
+                        assembly_stats.add(record.id, record.seq)
+                    try:
+                        dates.append(time.strptime(r_annot.get('date'), "%d-%b-%Y"))
+                    except (TypeError, ValueError):
+                        pass
+                    genome['contig_ids'].append(record.id)
+                    genome['contig_lengths'].append(len(record))
+                    genome["publications"] |= self._get_pubs(r_annot)
+
+                    # only do the following once(on the first contig)
+                    if "source_id" not in genome:
+                        genome["source_id"] = record.id.split('.')[0]
+                        organism = r_annot.get('organism', 'Unknown Organism')
+                        if params.get('scientific_name'):
+                            genome['scientific_name'] = params['scientific_name']
+                        else:
+                            genome['scientific_name'] = organism
+                        self.code_table = genome['genetic_code']
+                        genome["molecule_type"] = r_annot.get('molecule_type', 'DNA')
+                        genome['notes'] = r_annot.get('comment', "").replace('\\n', '\n')
+
+                    pending_records.append(record)
+                    while pending_records and self._contig_refs_loaded(pending_records[0],
+                                                                       file_path):
+                        self._parse_features(pending_records.popleft(), params['source'])
+
+            # anything left references a contig known by another id than its record's
+            for record in pending_records:
+                self._parse_features(record, params['source'])
+
+            # Write and save assembly file
+            if existing_assembly_ref:
+                os.remove(fasta_file)
+                assembly_ref = self._check_existing_assembly(existing_assembly_ref,
+                                                             existing_assembly)
+                assembly_data = existing_assembly
+            else:
+                assembly_ref = self._save_assembly(fasta_file, extra_info, params)
+                assembly_data = assembly_stats.assembly_data()
+        finally:
+            self.contig_seq.close()
+        genome.update({
+            "assembly_ref": assembly_ref,
+            "gc_content": assembly_data['gc_content'],
+            "dna_size": assembly_data['dna_size'],
+            "md5": assembly_data['md5'],
+        })
 
         genome.update(self.get_feature_lists())
+        self.md5_stage.run()
+        for field in ('features', 'cdss', 'mrnas', 'non_coding_features'):
+            self.md5_stage.resolve(genome[field])
 
         genome['num_contigs'] = len(genome['contig_ids'])
         # add dates
@@ -280,9 +378,9 @@ class GenbankToGenome:
                 genome['external_source_origination_date'] += " _ " + \
                     time.strftime("%d-%b-%Y", dates[-1])
 
-        if self.ontologies_present:
-            genome['ontologies_present'] = dict(self.ontologies_present)
-            genome["ontology_events"] = self.ontology_events
+        if self.ontology.ontologies_present:
+            genome['ontologies_present'] = dict(self.ontology.ontologies_present)
+            genome["ontology_events"] = self.ontology.ontology_events
         genome['feature_counts'] = dict(self.feature_counts)
         # can't serialize a set
         genome['publications'] = list(genome['publications'])
@@ -317,52 +415,86 @@ class GenbankToGenome:
         logging.info(f"Feature Counts: {genome['feature_counts']}")
         return genome
 
-    def _save_assembly(self, genbank_file, params):
-        """Convert genbank file to fasta and sve as assembly"""
-        contigs = Bio.SeqIO.parse(genbank_file, "genbank")
-        assembly_id = f"{params['genome_name']}_assembly"
-        fasta_file = f"{self.cfg.sharedFolder}/{params['genome_name']}_assembly.fasta"
+    def _iter_genbank_records(self, file_path):
+        """Yield the records of a genbank file in file order. With more than one parse worker
+        configured, shards of the file are parsed in a process pool. Features are still
+        processed here one record at a time so ids and counters match a serial import"""
+        shards = []
+        if self.parse_workers > 1:
+            shards = _find_record_shards(file_path, GENBANK_SHARD_SIZE)
+        if len(shards) < 2:
+            yield from Bio.SeqIO.parse(file_path, "genbank")
+            return
+
+        logging.info(f"Parsing {len(shards)} shards with {self.parse_workers} workers")
+        shards = iter(shards)
+        with ProcessPoolExecutor(max_workers=self.parse_workers) as pool:
+            # only keep a few parsed shards ahead of the features being processed
+            in_flight = deque(pool.submit(_parse_genbank_shard, file_path, *shard)
+                              for shard in itertools.islice(shards, 2 * self.parse_workers))
+            while in_flight:
+                records = in_flight.popleft().result()
+                for shard in itertools.islice(shards, 1):
+                    in_flight.append(pool.submit(_parse_genbank_shard, file_path, *shard))
+                yield from records
+
+    def _add_contig(self, record, extra_info):
+        """Register a contig's topology and sequence for feature extraction"""
+        if record.annotations.get('topology', "") == 'circular':
+            extra_info[record.id]['is_circ'] = 1
+            self.circ_contigs.add(record.id)
+        elif record.annotations.get('topology', "") == 'linear':
+            extra_info[record.id]['is_circ'] = 0
+        self.contig_seq.add(record.id, record.seq)
+
+    def _contig_refs_loaded(self, record, file_path):
+        """Features may be trans-spliced from contigs later in the file so
+        check that every contig a record refers to has already been read. A contig
+        that is not in the file at all is not waited for"""
+        for feat in record.features:
+            for part in feat.location.parts:
+                if part.ref and part.ref not in self.contig_seq:
+                    if self.file_record_ids is None:
+                        self.file_record_ids = _genbank_record_ids(file_path)
+                    if part.ref in self.file_record_ids:
+                        return False
+        return True
+
+    def _get_existing_assembly(self, assembly_ref):
+        """Fetch a user supplied assembly, failing early if it is not usable"""
+        if not re.match("\d+\/\d+\/\d+", assembly_ref):
+            raise ValueError(f"Assembly ref: {assembly_ref} is not a valid format. Must"
+                             f" be in numerical <ws>/<object>/<version> format.")
+        ret = self.dfu.get_objects(
+            {'object_refs': [assembly_ref]}
+        )['data'][0]
+        if "KBaseGenomeAnnotations.Assembly" not in ret['info'][2]:
+            raise ValueError(f"{assembly_ref} is not a reference to an assembly")
+        return ret['data']
+
+    def _check_existing_assembly(self, assembly_ref, assembly_data):
+        """Check that every contig in the genbank file matches the supplied assembly"""
+        unmatched_ids = list()
+        unmatched_ids_md5s = list()
+        contig_ids = list(self.contig_seq.keys())
+        contig_md5s = self.md5_stage.map(self.contig_seq.md5, contig_ids)
+        for current_contig, current_contig_md5 in zip(contig_ids, contig_md5s):
+            if current_contig in assembly_data['contigs']:
+                if current_contig_md5 != assembly_data['contigs'][current_contig]['md5']:
+                    unmatched_ids_md5s.append(current_contig)
+            else:
+                unmatched_ids.append(current_contig)
+        if len(unmatched_ids) > 0:
+            raise ValueError(warnings['assembly_ref_extra_contigs'].format(", ".join(unmatched_ids)))
+        if len(unmatched_ids_md5s) > 0:
+            raise ValueError(warnings["assembly_ref_diff_seq"].format(", ".join(unmatched_ids_md5s)))
+        logging.info(f"Using supplied assembly: {assembly_ref}")
+        return assembly_ref
 
-        out_contigs = []
-        extra_info = defaultdict(dict)
-        for in_contig in contigs:
-            if in_contig.annotations.get('topology', "") == 'circular':
-                extra_info[in_contig.id]['is_circ'] = 1
-                self.circ_contigs.add(in_contig.id)
-            elif in_contig.annotations.get('topology', "") == 'linear':
-                extra_info[in_contig.id]['is_circ'] = 0
-            out_contigs.append(in_contig)
-            self.contig_seq[in_contig.id] = in_contig.seq.upper()
-
-        assembly_ref = params.get("use_existing_assembly")
-        if assembly_ref:
-            if not re.match("\d+\/\d+\/\d+", assembly_ref):
-                raise ValueError(f"Assembly ref: {assembly_ref} is not a valid format. Must"
-                                 f" be in numerical <ws>/<object>/<version> format.")
-            ret = self.dfu.get_objects(
-                {'object_refs': [assembly_ref]}
-            )['data'][0]
-            if "KBaseGenomeAnnotations.Assembly" not in ret['info'][2]:
-                raise ValueError(f"{assembly_ref} is not a reference to an assembly")
-            unmatched_ids = list()
-            unmatched_ids_md5s = list()
-            for current_contig in self.contig_seq.keys():
-                current_contig_md5 = hashlib.md5(
-                    str(self.contig_seq[current_contig]).encode('utf8')
-                ).hexdigest()
-                if current_contig in ret['data']['contigs']:
-                    if current_contig_md5 != ret['data']['contigs'][current_contig]['md5']:
-                        unmatched_ids_md5s.append(current_contig)
-                else:
-                    unmatched_ids.append(current_contig)
-            if len(unmatched_ids) > 0:
-                raise ValueError(warnings['assembly_ref_extra_contigs'].format(", ".join(unmatched_ids)))
-            if len(unmatched_ids_md5s) > 0:
-                raise ValueError(warnings["assembly_ref_diff_seq"].format(", ".join(unmatched_ids_md5s)))
-            logging.info(f"Using supplied assembly: {assembly_ref}")
-            return assembly_ref
+    def _save_assembly(self, fasta_file, extra_info, params):
+        """Save the fasta written while parsing the genbank file as an assembly"""
+        assembly_id = f"{params['genome_name']}_assembly"
         logging.info("Saving sequence as Assembly object")
-        Bio.SeqIO.write(out_contigs, fasta_file, "fasta")
         assembly_ref = self.aUtil.save_assembly_from_fasta(
             {'file': {'path': fasta_file},
              'workspace_name': params['workspace_name'],
@@ -379,7 +511,7 @@ class GenbankToGenome:
         files = os.listdir(os.path.abspath(input_directory))
         logging.info("Genbank Files : " + ", ".join(files))
         genbank_files = [x for x in files if
-                         os.path.splitext(x)[-1].lower() in valid_extensions]
+                         os.path.splitext(uncompressed_name(x))[-1].lower() in valid_extensions]
 
         if len(genbank_files) == 0:
             raise Exception(
@@ -397,25 +529,22 @@ class GenbankToGenome:
     def _join_files_skip_empty_lines(self, input_files):
             """ Applies strip to each line of each input file.
             Args:
-                input_files: Paths to input files in Genbank format.
+                input_files: Paths to input files in Genbank format, which may be gzip or bzip2
+                    compressed.
             Returns:
-                Path to resulting file (currenly it's the same file as input).
+                Path to resulting uncompressed file.
             """
             if len(input_files) == 0:
                 raise ValueError("NO GENBANK FILE")
             temp_dir = os.path.join(os.path.dirname(input_files[0]), "combined")
             if not os.path.exists(temp_dir):
                 os.makedirs(temp_dir)
-            ret_file = os.path.join(temp_dir, os.path.basename(input_files[0]))
+            ret_file = os.path.join(temp_dir, uncompressed_name(input_files[0]))
 
             # take in Genbank file and remove all empty lines from it.
             with open(ret_file, 'w', buffering=2 ** 20) as f_out:
-                for input_file in input_files:
-                    with open(input_file, 'r') as f_in:
-                        for line in f_in:
-                            line = line.rstrip('\r\n')
-                            if line.strip():
-                                f_out.write(line + '\n')
+                f_out.writelines(nonblank_lines(input_files))
+            log_scratch_usage(temp_dir, "after combining input files")
             return ret_file
 
     def _get_pubs(self, r_annotations):
@@ -517,7 +646,8 @@ class GenbankToGenome:
             if in_feature.type in self.excluded_features:
                 self.skiped_features[in_feature.type] += 1
                 continue
-            feat_seq = self._get_seq(in_feature, record.id)
+            seq_bytes = self._get_seq(in_feature, record.id)
+            feat_seq = seq_bytes.decode('ascii')
             if source == "Ensembl":
                 _id = self._get_id(in_feature, ['gene', 'locus_tag'])
             else:
@@ -527,9 +657,9 @@ class GenbankToGenome:
             out_feat = {
                 "id": "_".join([_id, in_feature.type]),
                 "location": _location(in_feature),
-                "dna_sequence": str(feat_seq),
+                "dna_sequence": feat_seq,
                 "dna_sequence_length": len(feat_seq),
-                "md5": hashlib.md5(str(feat_seq).encode('utf8')).hexdigest(),
+                "md5": self.md5_stage.add(seq_bytes),
             }
             if not _id:
                 out_feat['id'] = in_feature.type
@@ -608,83 +738,27 @@ class GenbankToGenome:
                 'cdss': list(self.cdss.values()), 'mrnas': list(self.mrnas.values())}
 
     def _get_seq(self, feat, contig):
-        """Extract the DNA sequence for a feature"""
+        """Extract the DNA sequence for a feature as bytes"""
         seq = []
         for part in feat.location.parts:
-            strand = part.strand
             # handle trans-splicing across contigs
             if part.ref:
                 part_contig = part.ref
             else:
                 part_contig = contig
 
-            if strand >= 0:
-                seq.append(str(self.contig_seq[part_contig]
-                               [part.start:part.end]))
-            else:
-                seq.append(str(self.contig_seq[part_contig]
-                               [part.start:part.end].reverse_complement()))
-        return "".join(seq)
-
-    def _create_ontology_event(self, ontology_type):
-        """Creates the ontology_event if necessary
-        Returns the index of the ontology event back."""
-        if ontology_type not in self.ont_mappings:
-            raise ValueError(f"{ontology_type} is not a supported ontology")
-
-        if "event_index" not in self.ont_mappings[ontology_type]:
-            self.ont_mappings[ontology_type]['event_index'] = len(self.ontology_events)
-            if ontology_type == "GO":
-                ontology_ref = "KBaseOntology/gene_ontology"
-            elif ontology_type == "PO":
-                ontology_ref = "KBaseOntology/plant_ontology"
-            else:
-                ontology_ref = f"KBaseOntology/{ontology_type.lower()}_ontology"
-            self.ontology_events.append({
-                "method": "GenomeFileUtils Genbank uploader from annotations",
-                "method_version": self.version,
-                "timestamp": self.time_string,
-                "id": ontology_type,
-                "ontology_ref": ontology_ref
-            })
-
-        return self.ont_mappings[ontology_type]['event_index']
+            seq.append(self.contig_seq.get_bytes(
+                part_contig, part.start, part.end, reverse_complement=part.strand < 0))
+        return b"".join(seq)
 
     def _get_ontology_db_xrefs(self, feature):
         """Splits the ontology info from the other db_xrefs"""
         ontology = defaultdict(dict)
-        db_xrefs = []
         for key in ("GO_process", "GO_function", "GO_component"):
-            ontology_event_index = self._create_ontology_event("GO")
             for term in feature.qualifiers.get(key, []):
-                sp = term.split(" - ")
-                ontology['GO'][sp[0]] = [ontology_event_index]
-                self.ontologies_present['GO'][sp[0]] = self.ont_mappings['GO'].get(sp[0], '')
-
-        for ref in feature.qualifiers.get('db_xref', []):
-            if ref.startswith('GO:'):
-                ontology['GO'][ref] = [self._create_ontology_event("GO")]
-                self.ontologies_present['GO'][ref] = self.ont_mappings['GO'].get(ref, '')
-            elif ref.startswith('PO:'):
-                ontology['PO'][ref] = [self._create_ontology_event("PO")]
-                self.ontologies_present['PO'][ref] = self.ont_mappings['PO'].get(ref, '')
-            elif ref.startswith('KO:'):
-                ontology['KO'][ref] = [self._create_ontology_event("KO")]
-                self.ontologies_present['KO'][ref] = self.ont_mappings['KO'].get(ref, '')
-            elif ref.startswith('COG'):
-                ontology['COG'][ref] = [self._create_ontology_event("COG")]
-                self.ontologies_present['COG'][ref] = self.ont_mappings['COG'].get(ref, '')
-            elif ref.startswith('PF'):
-                ontology['PFAM'][ref] = [self._create_ontology_event("PFAM")]
-                self.ontologies_present['PFAM'][ref] = self.ont_mappings['PFAM'].get(ref, '')
-            elif ref.startswith('TIGR'):
-                ontology['TIGRFAM'][ref] = [self._create_ontology_event("TIGRFAM")]
-                self.ontologies_present['TIGRFAM'][ref] = self.ont_mappings['TIGRFAM'].get(ref, '')
-            elif ":" not in ref:
-                db_xrefs.append(tuple(["Unknown_Source", ref]))
-            else:
-                db_xrefs.append(tuple(ref.split(":", 1)))
-
+                self.ontology.add_term(ontology, 'GO', term.split(" - ")[0])
+        ontology, db_xrefs = self.ontology.classify(feature.qualifiers.get('db_xref', []),
+                                                    ontology)
         return dict(ontology), sorted(db_xrefs)
 
     @staticmethod
@@ -708,20 +782,16 @@ class GenbankToGenome:
 
     def _find_parent_gene(self, potential_id, feature):
         """Unfortunately, Genbank files don't have a parent ID and the features can be out of
-        order at times. To account for this, the this function works backwards from the end of
-        list of IDs and stops when if finds a parent with valid coordinates or it hits the maximum
-        number of tries"""
+        order at times. To account for this, if the gene with the expected ID fails location
+        validation, the genes that contain the feature are checked, most recently added first,
+        and the first one with valid coordinates is used"""
         if potential_id in self.genes:
-            lookup_attempts = 0
-            while lookup_attempts < MAX_PARENT_LOOKUPS:
-                if is_parent(self.genes[potential_id], feature):
-                    return potential_id
+            if is_parent(self.genes[potential_id], feature):
+                return potential_id
 
-                lookup_attempts += 1
-                try:
-                    potential_id = list(self.genes.keys())[-(lookup_attempts + 1)]
-                except IndexError:
-                    break  # no more genes that could match exist
+            for gene_id in self.gene_index.containing(feature['location']):
+                if gene_id != potential_id and is_parent(self.genes[gene_id], feature):
+                    return gene_id
 
             self.defects['bad_parent_loc'] += 1
         return None
@@ -736,6 +806,7 @@ class GenbankToGenome:
         if _id in self.genes:
             raise ValueError(f"Duplicate gene ID: {_id}")
         self.genes[_id] = out_feat
+        self.gene_index.add(_id, out_feat['location'])
 
     def process_noncoding(self, gene_id, feat_type, out_feat):
         out_feat["type"] = feat_type
@@ -823,27 +894,24 @@ class GenbankToGenome:
                     out_feat['id'], len(feat_seq), len(prot_seq)))
             self.genome_suspect = 1
 
-        try:
-            if prot_seq and prot_seq != Seq.translate(
-                    feat_seq, self.code_table, cds=True).strip("*"):
+        # translate once, the result both verifies and fills in the protein
+        translation = translate_cdss([feat_seq], self.code_table)[0]
+        if prot_seq:
+            if isinstance(translation, TranslationError):
+                cds_warnings.append("Unable to verify protein sequence:" + str(translation))
+            elif prot_seq != translation:
                 cds_warnings.append(warnings["inconsistent_translation"])
                 self.defects['cds_seq_not_matching'] += 1
 
-        except TranslationError as e:
-            cds_warnings.append("Unable to verify protein sequence:" + str(e))
-
-        if not prot_seq:
-            try:
-                prot_seq = Seq.translate(
-                        feat_seq, self.code_table, cds=True).strip("*")
-                cds_warnings.append(warnings["no_translation_supplied"])
-
-            except TranslationError as e:
-                cds_warnings.append(warnings["no_translation_supplied"] + str(e))
+        elif isinstance(translation, TranslationError):
+            cds_warnings.append(warnings["no_translation_supplied"] + str(translation))
+        else:
+            prot_seq = translation
+            cds_warnings.append(warnings["no_translation_supplied"])
 
         out_feat.update({
             "protein_translation": prot_seq,
-            "protein_md5": hashlib.md5(prot_seq.encode('utf8')).hexdigest(),
+            "protein_md5": self.md5_stage.add(prot_seq),
             "protein_translation_length": len(prot_seq),
         })
 
@@ -0,0 +1,54 @@
+"""
+A positional index of gene locations used to find the genes that could be the parent of a
+feature when the file does not say so directly (Genbank).
+"""
+from bisect import bisect_right
+from collections import defaultdict
+
+from GenomeFileUtil.core.GenomeUtils import get_start, get_end
+
+
+class GeneIntervalIndex:
+    """Each location part of a gene is kept in a per contig list sorted by start. A lookup
+    bisects to the last part starting at or before the feature and scans back no further than
+    the longest part on that contig, so the cost depends on gene density rather than genome
+    size."""
+
+    def __init__(self):
+        self._starts = defaultdict(list)  # contig -> sorted part starts
+        self._parts = defaultdict(list)  # contig -> (end, strand, insert order, gene_id)
+        self._max_span = defaultdict(int)  # contig -> longest part
+        self._inserted = 0
+
+    def __len__(self):
+        return self._inserted
+
+    def add(self, gene_id, location):
+        """Index every part of a gene's KBase style location"""
+        self._inserted += 1
+        for loc in location:
+            contig, start, end = loc[0], get_start(loc), get_end(loc)
+            starts = self._starts[contig]
+            i = bisect_right(starts, start)
+            starts.insert(i, start)
+            self._parts[contig].insert(i, (end, loc[2], self._inserted, gene_id))
+            self._max_span[contig] = max(self._max_span[contig], end - start)
+
+    def containing(self, location):
+        """Return the ids of genes with a part containing the first part of location,
+        most recently added first"""
+        loc = location[0]
+        contig, start, end, strand = loc[0], get_start(loc), get_end(loc), loc[2]
+        starts = self._starts.get(contig)
+        if not starts:
+            return []
+        parts = self._parts[contig]
+        lowest_start = start - self._max_span[contig]
+        found = {}
+        i = bisect_right(starts, start) - 1
+        while i >= 0 and starts[i] >= lowest_start:
+            part_end, part_strand, order, gene_id = parts[i]
+            if part_end >= end and part_strand == strand:
+                found[gene_id] = order
+            i -= 1
+        return sorted(found, key=found.get, reverse=True)
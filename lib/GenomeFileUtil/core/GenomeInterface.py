@@ -3,19 +3,36 @@ import json
 import logging
 import os
 import sys
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 
 from GenomeFileUtil.authclient import KBaseAuth as _KBaseAuth
 from installed_clients.AbstractHandleClient import AbstractHandle as HandleService
-from installed_clients.AssemblySequenceAPIServiceClient import AssemblySequenceAPI
 from installed_clients.DataFileUtilClient import DataFileUtil
 from installed_clients.WSLargeDataIOClient import WsLargeDataIO
 from GenomeFileUtil.core import GenomeUtils
+from GenomeFileUtil.core.AssemblySequences import AssemblySequences, features_missing_sequence
+from GenomeFileUtil.core.GenomeJsonWriter import write_genome_json
+from GenomeFileUtil.core.GenomeSize import GenomeSize
 
 MAX_GENOME_SIZE = 2**30
 
+# Shared across GenomeInterface instances so that connections to Shock are kept alive and the
+# token to user cache of the auth client lasts between genome saves
+_SHOCK_SESSION = requests.Session()
+_AUTH_CLIENTS = {}
+_AUTH_CLIENTS_LOCK = threading.Lock()
+
+
+def _auth_client(auth_url):
+    with _AUTH_CLIENTS_LOCK:
+        if auth_url not in _AUTH_CLIENTS:
+            _AUTH_CLIENTS[auth_url] = _KBaseAuth(auth_url)
+        return _AUTH_CLIENTS[auth_url]
+
 
 class GenomeInterface:
     def __init__(self, config):
@@ -26,11 +43,15 @@ class GenomeInterface:
         self.auth_service_url = config.authServiceUrl
         self.callback_url = config.callbackURL
         self.re_api_url = config.re_api_url
-        self.auth_client = _KBaseAuth(self.auth_service_url)
+        self.auth_client = _auth_client(self.auth_service_url)
         self.dfu = DataFileUtil(self.callback_url)
         self.taxon_wsname = config.raw['taxon-workspace-name']
         self.scratch = config.raw['scratch']
         self.ws_large_data = WsLargeDataIO(self.callback_url)
+        self.json_encoder = config.raw.get('genome-json-encoder', 'json')
+        self.assembly_sequences = AssemblySequences(
+            self.callback_url, self.sw_url, self.token,
+            int(config.raw.get('sequence-backfill-workers', 1)))
 
     @staticmethod
     def _validate_save_one_genome_params(params):
@@ -64,60 +85,65 @@ class GenomeInterface:
         """
         _own_handle: check that handle_property point to shock nodes owned by calling user
         """
+        self._own_handles(genome_data, [handle_property])
 
-        logging.info('start checking handle {} ownership'.format(handle_property))
-
-        if handle_property in genome_data:
-            handle_id = genome_data[handle_property]
-            hs = HandleService(self.handle_url, token=self.token)
-            handles = hs.hids_to_handles([handle_id])
-            shock_id = handles[0]['id']
-
-            # Copy from DataFileUtil.own_shock_node implementation:
-            header = {'Authorization': 'Oauth {}'.format(self.token)}
-            res = requests.get(self.shock_url + '/node/' + shock_id +
-                               '/acl/?verbosity=full',
-                               headers=header, allow_redirects=True)
-            self._check_shock_response(
-                res, 'Error getting ACLs for Shock node {}: '.format(shock_id))
-            owner = res.json()['data']['owner']['username']
-            user_id = self.auth_client.get_user(self.token)
+    def _own_handles(self, genome_data, handle_properties):
+        """
+        _own_handles: check that the handle_properties point to shock nodes owned by calling
+                      user, copying any node owned by someone else.
 
+        The handles are resolved with one hids_to_handles call and the node ACLs are fetched
+        concurrently, along with the user, over a shared keep-alive session.
+        """
+        properties = [p for p in handle_properties if p in genome_data]
+        logging.info('start checking handle {} ownership'.format(', '.join(properties)))
+        if not properties:
+            return
+
+        # properties may share a handle, which is then checked and copied once
+        hids = list(dict.fromkeys(genome_data[p] for p in properties))
+        hs = HandleService(self.handle_url, token=self.token)
+        # the handles are matched to the hids by hid, not by their order
+        by_hid = {str(h.get('hid')): h for h in hs.hids_to_handles(hids)}
+        for p in properties:
+            if str(genome_data[p]) not in by_hid:
+                raise ValueError('Handle {} of {} was not found by the handle service'.format(
+                    genome_data[p], p))
+        shock_ids = [by_hid[str(hid)]['id'] for hid in hids]
+
+        with ThreadPoolExecutor(max_workers=len(shock_ids) + 1) as executor:
+            user_future = executor.submit(self.auth_client.get_user, self.token)
+            owners = list(executor.map(self._shock_node_owner, shock_ids))
+            user_id = user_future.result()
+
+        new_hids = {}
+        for hid, shock_id, owner in zip(hids, shock_ids, owners):
             if owner != user_id:
                 logging.info('start copying node to owner: {}'.format(user_id))
                 dfu_shock = self.dfu.copy_shock_node({'shock_id': shock_id,
                                                       'make_handle': True})
-                handle_id = dfu_shock['handle']['hid']
-                genome_data[handle_property] = handle_id
+                new_hids[hid] = dfu_shock['handle']['hid']
+        for p in properties:
+            genome_data[p] = new_hids.get(genome_data[p], genome_data[p])
+
+    def _shock_node_owner(self, shock_id):
+        """
+        _shock_node_owner: the user name of the owner of a shock node
+        """
+        # Copy from DataFileUtil.own_shock_node implementation:
+        header = {'Authorization': 'Oauth {}'.format(self.token)}
+        res = _SHOCK_SESSION.get(self.shock_url + '/node/' + shock_id + '/acl/?verbosity=full',
+                                 headers=header, allow_redirects=True)
+        self._check_shock_response(
+            res, 'Error getting ACLs for Shock node {}: '.format(shock_id))
+        return res.json()['data']['owner']['username']
 
     def _check_dna_sequence_in_features(self, genome):
         """
         _check_dna_sequence_in_features: check dna sequence in each feature
         """
         logging.info('start checking dna sequence in each feature')
-
-        if 'features' in genome:
-            features_to_work = {}
-            for feature in genome['features']:
-                if not ('dna_sequence' in feature and feature['dna_sequence']):
-                    features_to_work[feature['id']] = feature['location']
-
-            if len(features_to_work) > 0:
-                aseq = AssemblySequenceAPI(self.sw_url, token=self.token)
-                get_dna_params = {'requested_features': features_to_work}
-                if 'assembly_ref' in genome:
-                    get_dna_params['assembly_ref'] = genome['assembly_ref']
-                elif 'contigset_ref' in genome:
-                    get_dna_params['contigset_ref'] = genome['contigset_ref']
-                else:
-                    # Nothing to do (it may be test genome without contigs)...
-                    return
-                dna_sequences = aseq.get_dna_sequences(get_dna_params)[
-                    'dna_sequences']
-                for feature in genome['features']:
-                    if feature['id'] in dna_sequences:
-                        feature['dna_sequence'] = dna_sequences[feature['id']]
-                        feature['dna_sequence_length'] = len(feature['dna_sequence'])
+        self.assembly_sequences.fill(genome)
 
     def get_one_genome(self, params):
         """Fetch a genome using WSLargeDataIO and return it as a python dict"""
@@ -128,7 +154,9 @@ class GenomeInterface:
         return data, res['info']
         # return self.dfu.get_objects(params)['data'][0]
 
-    def save_one_genome(self, params):
+    def save_one_genome(self, params, genome_size=None):
+        """genome_size is the GenomeSize of the genome's features if the importer measured them
+        as they were finished"""
         logging.info('start saving genome object')
         self._validate_save_one_genome_params(params)
         workspace = params['workspace']
@@ -146,17 +174,17 @@ class GenomeInterface:
                 data = self._update_genome(data)
 
         # check all handles point to shock nodes owned by calling user
-        self._own_handle(data, 'genbank_handle_ref')
-        self._own_handle(data, 'gff_handle_ref')
+        self._own_handles(data, ('genbank_handle_ref', 'gff_handle_ref'))
         if "AnnotatedMetagenomeAssembly" not in ws_datatype:
+            if features_missing_sequence(data):
+                # the features measured are given sequences or warnings
+                genome_size = None
             self._check_dna_sequence_in_features(data)
-            data['warnings'] = self.validate_genome(data)
+            data['warnings'] = self.validate_genome(data, genome_size)
 
-        # sort data
-        data = GenomeUtils.sort_dict(data)
-        # dump genome to scratch for upload
-        data_path = os.path.join(self.scratch, name + ".json")
-        json.dump(data, open(data_path, 'w'))
+        # dump genome to scratch for upload, with its keys sorted
+        data_path = write_genome_json(data, os.path.join(self.scratch, name + ".json"),
+                                      self.json_encoder)
         if 'hidden' in params and str(params['hidden']).lower() in ('yes', 'true', 't', '1'):
             hidden = 1
         else:
@@ -213,7 +241,7 @@ class GenomeInterface:
         # do top level updates
         ontologies_present = defaultdict(dict)  # type: dict
         ontologies_present.update(genome.get('ontologies_present', {}))
-        ontology_events = genome.get('ontology_events', [])
+        ontology_events = GenomeUtils.OntologyEventIndex(genome.get('ontology_events', []))
         # NOTE: 'genome_tiers' not in Metagenome spec
         if 'genome_tiers' not in genome:
             genome['source'], genome['genome_tiers'] = self.determine_tier(genome['source'])
@@ -283,8 +311,6 @@ class GenomeInterface:
                         for ev in term['evidence']:
                             ev['id'] = ontology
                             ev['ontology_ref'] = term["ontology_ref"]
-                            if ev not in ontology_events:
-                                ontology_events.append(ev)
                             term_evidence.append(ontology_events.index(ev))
                         feat['ontology_terms'][ontology][term['id']] = term_evidence
 
@@ -324,8 +350,8 @@ class GenomeInterface:
                         genome['mrnas'].append(feat)
 
         genome['features'] = retained_features
-        if ontology_events:
-            genome['ontology_events'] = ontology_events
+        if ontology_events.events:
+            genome['ontology_events'] = ontology_events.events
         if ontologies_present:
             genome['ontologies_present'] = ontologies_present
 
@@ -338,7 +364,7 @@ class GenomeInterface:
         return genome
 
     @staticmethod
-    def validate_genome(g):
+    def validate_genome(g, genome_size=None):
         """
         Run a series of checks on the genome object and return any warnings
         """
@@ -376,16 +402,14 @@ class GenomeInterface:
                 'taxon_ref' in g and g['taxon_ref'] == "ReferenceTaxons/unknown_taxon"):
             warnings.append('Unable to determine organism taxonomy')
 
-        GenomeInterface.handle_large_genomes(g)
+        GenomeInterface.handle_large_genomes(g, genome_size)
         return warnings
 
     @staticmethod
-    def handle_large_genomes(g):
+    def handle_large_genomes(g, genome_size=None):
         """Determines the size of various feature arrays and starts removing the dna_sequence if
-        the genome is getting too big to store in the workspace"""
-        def _get_size(obj):
-            return sys.getsizeof(json.dumps(obj))
-
+        the genome is getting too big to store in the workspace. genome_size, a GenomeSize of
+        the genome's feature lists, saves measuring them again"""
         # seems pretty uneccessary...
         def sizeof_fmt(num):
             for unit in ['', 'Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei', 'Zi']:
@@ -399,9 +423,14 @@ class GenomeInterface:
         # Change want full breakdown to True if want to see break down of sizes.
         # By making this a changeable flag it will run faster for standard uploads.
         want_full_breakdown = False
+        # the serialized size, measured once and updated as dna_sequences are removed
+        if genome_size is None:
+            genome_size = GenomeSize(g)
+        else:
+            genome_size.measure_other(g)
         for x in feature_lists:
             if x in g:
-                need_to_remove_dna_sequence = _get_size(g) > MAX_GENOME_SIZE
+                need_to_remove_dna_sequence = genome_size.total > MAX_GENOME_SIZE
                 if need_to_remove_dna_sequence or want_full_breakdown:
                     feature_type_dict_keys = dict()
                     for feature in g[x]:
@@ -418,8 +447,10 @@ class GenomeInterface:
                         feature_type_dict_keys[feature_key] = sizeof_fmt(
                             feature_type_dict_keys[feature_key])
                     master_key_sizes[x] = feature_type_dict_keys
-                print(f"{x}: {sizeof_fmt(_get_size(g[x]))}")
-        total_size = _get_size(g)
+                    if need_to_remove_dna_sequence:
+                        genome_size.dna_sequences_removed(x)
+                print(f"{x}: {sizeof_fmt(genome_size.list_size(x))}")
+        total_size = genome_size.total
         print(f"Total size {sizeof_fmt(total_size)} ")
         if want_full_breakdown:
             print(f"Here is the breakdown of the sizes of feature lists elements : "
@@ -0,0 +1,69 @@
+"""
+Writes a genome to a JSON file with its keys sorted, for saving to the workspace.
+
+This writes the same bytes as json.dump(GenomeUtils.sort_dict(genome), f), but without the
+sorted copy of the genome and without json.dump's pure Python encoder: the top level keys are
+written in sorted order and the items of top level lists (the feature lists, ontology events...)
+are encoded one at a time by the C encoder and written through a large buffer. Only one feature
+is held as a string at a time.
+
+With the orjson encoder, when it is installed, items are encoded by orjson instead. The file
+then parses to the same genome but is not byte-identical: orjson leaves out the spaces after
+separators and writes non-ASCII characters as UTF-8 rather than escapes.
+"""
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODERS = ('json', 'orjson')
+WRITE_BUFFER_SIZE = 2 ** 22
+
+
+def _json_encode(value):
+    return json.dumps(value, sort_keys=True).encode('ascii')
+
+
+def _orjson_encode(value):
+    try:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        # e.g. integers too big for 64 bits, which the json module can write
+        return json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')
+
+
+def write_genome_json(genome, path, encoder='json'):
+    """Write a genome as key sorted JSON with the 'json' or 'orjson' encoder. Falls back to
+    json if orjson is not installed"""
+    if encoder not in ENCODERS:
+        raise ValueError(f"Unknown JSON encoder {encoder}, expected one of {ENCODERS}")
+    if encoder == 'orjson' and orjson is None:
+        logging.info("orjson is not installed, writing the genome with json")
+        encoder = 'json'
+    if encoder == 'orjson':
+        encode, item_separator, key_separator = _orjson_encode, b',', b':'
+    else:
+        encode, item_separator, key_separator = _json_encode, b', ', b': '
+
+    with open(path, 'wb', buffering=WRITE_BUFFER_SIZE) as out:
+        out.write(b'{')
+        for i, key in enumerate(sorted(genome)):
+            if i:
+                out.write(item_separator)
+            out.write(encode(key))
+            out.write(key_separator)
+            value = genome[key]
+            if not isinstance(value, list):
+                out.write(encode(value))
+                continue
+            out.write(b'[')
+            for j, item in enumerate(value):
+                if j:
+                    out.write(item_separator)
+                out.write(encode(item))
+            out.write(b']')
+        out.write(b'}')
+    return path
@@ -0,0 +1,89 @@
+"""
+Exact size, in bytes, of a genome serialized by json.dumps with its default settings.
+
+The size of each feature list is the sum of the sizes of its features, each serialized on its
+own, so the whole genome is never held as one string. The bytes each list's dna_sequences take
+are kept apart, so the size after dropping them needs no second pass. Features can also be added
+one at a time as an importer finishes them, to see early on whether a genome will be too big,
+and the rest of the genome measured once it is known.
+"""
+import json
+import re
+
+FEATURE_LISTS = ('features', 'cdss', 'mrnas', 'non_coding_features')
+
+# strings json.dumps writes as they are, between quotes
+_PLAIN_STRING = re.compile(r'[A-Za-z0-9*.\-]*\Z')
+_DNA_SEQUENCE_KEY_SIZE = len('"dna_sequence": ')
+# an empty list is serialized as "[]" and each item after the first adds a ", " separator
+_EMPTY_LIST_SIZE = 2
+_SEPARATOR_SIZE = 2
+
+
+def value_size(value, default=None):
+    """Size of a serialized value, counted without serializing strings that are written as
+    they are"""
+    if isinstance(value, str) and _PLAIN_STRING.match(value):
+        return len(value) + 2
+    return len(json.dumps(value, default=default))
+
+
+def feature_size(feature, default=None):
+    """Sizes of a serialized feature and of the part its dna_sequence takes, separator
+    included. default is passed to json.dumps"""
+    if 'dna_sequence' not in feature:
+        return len(json.dumps(feature, default=default)), 0
+    rest = {key: value for key, value in feature.items() if key != 'dna_sequence'}
+    dna_size = _DNA_SEQUENCE_KEY_SIZE + value_size(feature['dna_sequence'], default)
+    if rest:
+        dna_size += _SEPARATOR_SIZE
+    return len(json.dumps(rest, default=default)) + dna_size, dna_size
+
+
+class GenomeSize:
+    def __init__(self, genome=None, default=None):
+        # passed to json.dumps for values replaced before the genome is saved, like md5
+        # placeholders
+        self.default = default
+        # serialized size of each feature list and the part of it taken by dna_sequences
+        self.list_sizes = {}  # type: dict
+        self.dna_sizes = {}  # type: dict
+        self._lengths = {}  # type: dict
+        # everything but the contents of the feature lists
+        self.other_size = 0
+        if genome is not None:
+            self.measure_other(genome)
+            for name in FEATURE_LISTS:
+                for feature in genome.get(name, ()):
+                    self.add(name, feature)
+
+    def measure_other(self, genome):
+        """Measure everything in the genome but the contents of its feature lists"""
+        self.other_size = len(json.dumps(
+            {key: [] if key in FEATURE_LISTS else value for key, value in genome.items()},
+            default=self.default))
+
+    def add(self, feature_list, feature):
+        """Count a feature added to one of the genome's feature lists"""
+        size, dna_size = feature_size(feature, self.default)
+        if self._lengths.get(feature_list):
+            size += _SEPARATOR_SIZE
+        self._lengths[feature_list] = self._lengths.get(feature_list, 0) + 1
+        self.list_sizes[feature_list] = self.list_sizes.get(
+            feature_list, _EMPTY_LIST_SIZE) + size
+        self.dna_sizes[feature_list] = self.dna_sizes.get(feature_list, 0) + dna_size
+
+    def dna_sequences_removed(self, feature_list):
+        """Update the size once the dna_sequences of a feature list have been deleted"""
+        if feature_list in self.list_sizes:
+            self.list_sizes[feature_list] -= self.dna_sizes[feature_list]
+            self.dna_sizes[feature_list] = 0
+
+    def list_size(self, feature_list):
+        return self.list_sizes.get(feature_list, _EMPTY_LIST_SIZE)
+
+    @property
+    def total(self):
+        """Size of the genome. Until the rest of the genome is measured, this is of the feature
+        lists alone"""
+        return self.other_size + sum(size - _EMPTY_LIST_SIZE for size in self.list_sizes.values())
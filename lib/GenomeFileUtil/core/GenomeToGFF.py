@@ -11,6 +11,7 @@ from collections import defaultdict
 from installed_clients.DataFileUtilClient import DataFileUtil
 from GenomeFileUtil.core.GenomeInterface import GenomeInterface
 from GenomeFileUtil.core.GenomeUtils import get_start, get_end
+from GenomeFileUtil.core.InputStaging import open_text
 
 
 class GenomeToGFF:
@@ -111,7 +112,8 @@ class GenomeToGFF:
                 'handle_id': genome_data['features_handle_ref'],
                 'file_path': json_file_path
             })
-            with open(json_res['file_path']) as json_fid:
+            # newer feature files are stored gzipped
+            with open_text(json_res['file_path']) as json_fid:
                 features = json.load(json_fid)
 
             features_by_contig = defaultdict(list)
@@ -10,6 +10,9 @@ from relation_engine_client.exceptions import RENotFound
 # Name of the ncbi taxonomy namespace stored in "taxon_assignments"
 _NCBI_TAX = 'ncbi'
 
+# misc features longer than this are imported without their dna_sequence
+MAX_MISC_FEATURE_SIZE = 10000
+
 warnings = {
     "cds_excluded": "SUSPECT: CDS from {} was excluded because the associated "
                     "CDS failed coordinates validation",
@@ -74,6 +77,8 @@ warnings = {
     "gff_odd_strand_type": "This feature had \"{}\" as the strand designation and not + or -. "
                     "The location and sequence was defaulted to the + strand.",
     "contig_length_feature": "This feature spans entire contig length.",
+    "location_outside_contig": "This feature's location {} is outside contig {}, so its DNA "
+                    "sequence could not be filled in from the assembly.",
     "assembly_ref_extra_contigs": "The genbank file contains the following contigs which are not present "
                     "in the supplied assembly: {}",
     "assembly_ref_diff_seq": "The genbank file contains the following contigs which sequence does not match the "
@@ -368,6 +373,36 @@ def confirm_genomes_feature_relationships(genome):
     return features_with_relationships_not_found
 
 
+def hashable_key(value):
+    """A hashable stand in for a JSON value, equal for values that compare equal"""
+    if isinstance(value, dict):
+        return frozenset((k, hashable_key(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        # lists and tuples never compare equal to each other
+        return type(value), tuple(hashable_key(v) for v in value)
+    return value
+
+
+class OntologyEventIndex:
+    """A list of ontology events without repeats, with the position of each event looked up
+    by value in constant time"""
+
+    def __init__(self, events=None):
+        self.events = events if events is not None else []
+        self._indexes = {}
+        for i, event in enumerate(self.events):
+            self._indexes.setdefault(hashable_key(event), i)
+
+    def index(self, event):
+        """Position of the first event equal to event, appending event if there is none"""
+        key = hashable_key(event)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = len(self.events)
+            self.events.append(event)
+        return index
+
+
 # James wrote this in AssemblyUtil, copying here.
 def sort_dict(in_struct):
     """Recursively sort a dictionary by dictionary keys. (saves WS the trouble)"""
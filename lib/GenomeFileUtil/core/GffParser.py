@@ -0,0 +1,387 @@
+"""
+Line parser for GFF3 and GTF files.
+
+Each feature line becomes a GffRecord, a compact stand-in for the feature dict used by
+FastaGFFToGenome, as every line of a file is held during an import. Attribute keys are
+normalized to snake_case through a cache, since a file only uses a handful of distinct keys,
+and values are only URL unquoted when they contain a '%'. Files may be read line by line or, for
+very large files, in big blocks that are split into lines.
+
+The importers resolve a feature's Parent as they go, so parents_first orders the features of a
+file in which children come before their parents (e.g. one sorted by position) without an
+external sort.
+"""
+import functools
+import logging
+import re
+import sys
+import urllib.parse as parse
+from collections import defaultdict
+
+from GenomeFileUtil.core.InputStaging import open_text
+
+snake_re = re.compile('((?<=[a-z0-9])[A-Z]|(?!^)[A-Z](?=[a-z]))')
+
+
+def make_snake_case(string):
+    """Simple function to convert CamelCase to snake_case"""
+    return snake_re.sub(r'_\1', string).lower()
+
+
+@functools.lru_cache(maxsize=4096)
+def attribute_key(key):
+    """make_snake_case, memoized for attribute keys"""
+    return make_snake_case(key)
+
+
+def _unquote(value):
+    return parse.unquote(value) if '%' in value else value
+
+
+# attributes whose values are mostly unique to a line. Other values (products, parent and
+# transcript ids shared by the parts of a feature...) are interned as they tend to repeat
+IDENTIFIER_KEYS = frozenset(('id', 'name', 'locus_tag', 'old_locus_tag', 'protein_id', 'alias'))
+
+
+def _split_attributes(attributes):
+    """Yield the snake_case key and the still quoted value of each attribute in a column"""
+    for attribute in attributes.split(";"):
+        attribute = attribute.strip()
+
+        # Sometimes empty string
+        if not attribute:
+            continue
+
+        # Use of 1 to limit split as '=' character can also be made available later
+        # Sometimes lack of "=", assume spaces instead
+        if "=" in attribute:
+            key, value = attribute.split("=", 1)
+        elif " " in attribute:
+            key, value = attribute.split(" ", 1)
+        else:
+            logging.debug(f'Unable to parse {attribute}')
+            continue
+        yield attribute_key(key), value
+
+
+def parse_attributes(attributes):
+    """Parse a GFF3 (key=value) or GTF (key "value") attribute column into a dict of
+    snake_case keys to lists of values"""
+    parsed = {}
+    for key, value in _split_attributes(attributes):
+        value = _unquote(value.strip('"'))
+        if key not in IDENTIFIER_KEYS:
+            value = sys.intern(value)
+        if key in parsed:
+            parsed[key].append(value)
+        else:
+            parsed[key] = [value]
+    return parsed
+
+
+class GffRecord:
+    """A feature parsed from one GFF line. It is read and changed like the feature dict the
+    importers were written for, but as it has slots it takes a fraction of the memory. The
+    columns that repeat on every line are interned. ID and Parent are only set when the line
+    has them"""
+    __slots__ = ('contig', 'source', 'type', 'start', 'end', 'score', 'strand', 'phase',
+                 'attributes', 'ID', 'Parent')
+
+    def __init__(self, contig, source, feature_type, start, end, score, strand, phase,
+                 attributes):
+        self.contig = sys.intern(contig)
+        self.source = sys.intern(source)
+        self.type = sys.intern(feature_type)
+        self.start = start
+        self.end = end
+        self.score = sys.intern(score)
+        self.strand = sys.intern(strand)
+        self.phase = sys.intern(phase)
+        self.attributes = attributes
+
+    def __getitem__(self, key):
+        if key in _RECORD_FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in _RECORD_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _RECORD_FIELDS and hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in _RECORD_FIELDS else default
+
+    def keys(self):
+        return [key for key in self.__slots__ if hasattr(self, key)]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def copy(self):
+        """A copy sharing the attributes"""
+        record = GffRecord.__new__(GffRecord)
+        for key, value in self.items():
+            setattr(record, key, value)
+        return record
+
+    def __eq__(self, other):
+        if isinstance(other, (GffRecord, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+_RECORD_FIELDS = frozenset(GffRecord.__slots__)
+
+
+def parse_gff_line(line):
+    """Parse a GFF line into a GffRecord. Returns None for blank and comment lines"""
+    if not line or line[0] == '#' or line.isspace():
+        return None
+    try:
+        (contig_id, source_id, feature_type, start, end,
+         score, strand, phase, attributes) = line.split('\t')
+    except ValueError:
+        raise ValueError(f"unable to parse {line}")
+
+    ftr = GffRecord(contig_id, source_id, feature_type, int(start), int(end), score, strand,
+                    phase, parse_attributes(attributes))
+    attributes = ftr.attributes
+    if "id" in attributes:
+        ftr.ID = attributes['id'][0]
+    if "parent" in attributes:
+        ftr.Parent = attributes['parent'][0]
+    return ftr
+
+
+def feature_links(attributes):
+    """The ID and Parent parse_gff_line would give a feature with this attribute column (None
+    for those it has not), without parsing its other attributes"""
+    links = {}
+    for key, value in _split_attributes(attributes):
+        if key in ('id', 'parent') and key not in links:
+            links[key] = _unquote(value.strip('"'))
+    return links.get('id'), links.get('parent')
+
+
+def iter_gff_lines(path, chunk_size=None):
+    """Yield the lines of a (possibly gzip or bzip2 compressed) GFF file. With a chunk_size
+    the file is read in blocks of that many characters and lines are yielded without their
+    line endings"""
+    with open_text(path) as gff:
+        if not chunk_size:
+            yield from gff
+            return
+        partial = ''
+        for block in iter(lambda: gff.read(chunk_size), ''):
+            lines = (partial + block).split('\n')
+            partial = lines.pop()
+            yield from lines
+        if partial:
+            yield partial
+
+
+def read_gff(path, chunk_size=None):
+    """Yield the features of a GFF file as GffRecords"""
+    for line in iter_gff_lines(path, chunk_size):
+        ftr = parse_gff_line(line)
+        if ftr is not None:
+            yield ftr
+
+
+def parents_first(features):
+    """Order features so each one comes after the first feature with its Parent ID, keeping
+    file order otherwise. Only parents that are in the list are waited for: a feature whose
+    parent is on another contig, or nowhere, keeps its place for the importer to resolve or
+    report. A list already in order is returned as it is after one check pass"""
+    ids = None
+    placed = set()
+    for first_waiting, ftr in enumerate(features):
+        parent_id = ftr.get('Parent')
+        if parent_id and parent_id not in placed:
+            if ids is None:
+                ids = {ftr.get('ID') for ftr in features}
+            if parent_id in ids:
+                break
+        placed.add(ftr.get('ID'))
+    else:
+        return features
+
+    ordered = features[:first_waiting]
+    # parent ID -> features waiting for it, in file order
+    waiting = defaultdict(list)
+    for ftr in features[first_waiting:]:
+        parent_id = ftr.get('Parent')
+        if parent_id and parent_id not in placed and parent_id in ids:
+            waiting[parent_id].append(ftr)
+            continue
+        # place the feature, then anything that was waiting for it, depth first
+        stack = [ftr]
+        while stack:
+            ftr = stack.pop()
+            ordered.append(ftr)
+            feat_id = ftr.get('ID')
+            if feat_id not in placed:
+                placed.add(feat_id)
+                stack.extend(reversed(waiting.pop(feat_id, ())))
+    # only features in a cycle of parents are left
+    for children in waiting.values():
+        ordered.extend(children)
+    return ordered
+
+
+GTF_UTR_TYPES = {'five_prime_utr': 'five_prime_UTR', '5UTR': 'five_prime_UTR',
+                 'three_prime_utr': 'three_prime_UTR', '3UTR': 'three_prime_UTR'}
+
+
+# a GTF attribute column starts with a key and a value separated by a space (gene_id "g1")
+# where a GFF3 one has key=value
+_GTF_ATTRIBUTES = re.compile(r'\s*[^\s=;"]+[ \t]+[^\s;]')
+_GFF3_LINKS = re.compile(r'(?:^|;)\s*(?:ID|Parent)=')
+
+
+def is_gtf_line(line):
+    """Whether a GFF feature line is GTF, going by the syntax of its attributes, whatever the
+    type of the line"""
+    columns = line.rstrip('\r\n').split('\t')
+    if len(columns) != 9:
+        return False
+    attributes = columns[8]
+    return bool(_GTF_ATTRIBUTES.match(attributes)) and not _GFF3_LINKS.search(attributes)
+
+
+def is_gtf_file(path, chunk_size=None):
+    """Whether a GFF file is GTF, going by its first feature line"""
+    for line in iter_gff_lines(path, chunk_size):
+        if line and line[0] != '#' and not line.isspace():
+            return is_gtf_line(line)
+    return False
+
+
+def _spanning(feature_type, lines, attributes):
+    """A made up feature covering lines of a GTF gene or transcript"""
+    first = lines[0]
+    return GffRecord(first['contig'], first['source'], feature_type,
+                     min(f['start'] for f in lines), max(f['end'] for f in lines),
+                     '.', first['strand'], '.', attributes)
+
+
+def _prefixed_attributes(ftr, prefixes):
+    return {key: values for key, values in ftr['attributes'].items() if key.startswith(prefixes)}
+
+
+def _add_stop_codon(cdss, stop):
+    """GTF CDS lines leave out the stop codon. Extend the adjoining CDS line over it, or add it
+    as a CDS line of its own when it is split from the rest by an intron"""
+    for cds in cdss:
+        if stop['strand'] == '-' and cds['start'] == stop['end'] + 1:
+            cds['start'] = stop['start']
+            return
+        if stop['strand'] != '-' and cds['end'] == stop['start'] - 1:
+            cds['end'] = stop['end']
+            return
+    cds = stop.copy()
+    cds['type'] = 'CDS'
+    cdss.append(cds)
+
+
+def _gtf_gene(gene_id, gene):
+    """The features of one GTF gene with GFF3 style IDs and Parents"""
+    lines = gene['lines'] + [f for t in gene['transcripts'].values() for f in t['lines']]
+    gene_ftr = gene['gene'] or _spanning('gene', lines, _prefixed_attributes(lines[0], 'gene_'))
+    gene_ftr['ID'] = gene_id
+    yield gene_ftr
+    for ftr in gene['lines']:
+        ftr['Parent'] = gene_id
+        yield ftr
+
+    for transcript_id, transcript in gene['transcripts'].items():
+        lines = transcript['lines']
+        cdss = [f for f in lines if f['type'] == 'CDS']
+        stops = [f for f in lines if f['type'] == 'stop_codon']
+        transcript_ftr = transcript['transcript'] or _spanning(
+            'transcript', lines or [gene_ftr],
+            _prefixed_attributes(lines[0] if lines else gene_ftr, ('gene_', 'transcript_')))
+        # a transcript named after its gene would be renamed to this by the importer anyway
+        mrna_id = transcript_id if transcript_id != gene_id else f"{transcript_id}.mRNA"
+        transcript_ftr['ID'] = mrna_id
+        transcript_ftr['Parent'] = gene_id
+        if cdss:
+            transcript_ftr['type'] = 'mRNA'
+            for stop in stops:
+                _add_stop_codon(cdss, stop)
+            cds_start = min(f['start'] for f in cdss)
+            cds_end = max(f['end'] for f in cdss)
+        yield transcript_ftr
+
+        for ftr in lines:
+            if ftr['type'] == 'stop_codon' and cdss:
+                continue
+            ftr['Parent'] = mrna_id
+            if ftr['type'] == 'CDS':
+                ftr['ID'] = mrna_id
+            elif ftr['type'] in GTF_UTR_TYPES:
+                ftr['type'] = GTF_UTR_TYPES[ftr['type']]
+            elif ftr['type'] == 'UTR' and cdss:
+                upstream = ftr['end'] < cds_start if ftr['strand'] != '-' else ftr['start'] > cds_end
+                ftr['type'] = 'five_prime_UTR' if upstream else 'three_prime_UTR'
+            yield ftr
+        for ftr in cdss:
+            if 'Parent' not in ftr:
+                # a stop codon split from the rest of the CDS
+                ftr['ID'] = ftr['Parent'] = mrna_id
+                yield ftr
+
+
+def gtf_hierarchy(features):
+    """Give the lines of one contig of a GTF file GFF3 style IDs and Parents by grouping them on
+    their gene_id and transcript_id in one pass. The gene and transcript lines are used when the
+    file has them, otherwise features spanning the gene's or transcript's lines are made up, and
+    transcripts with a CDS become mRNAs. A gene is placed where its first line was, followed by
+    its transcripts, each followed by its own lines. Lines with no gene_id are left as they are"""
+    # lines without a gene_id, and gene_ids where the gene's first line was
+    order = []
+    genes = {}
+    for ftr in features:
+        attributes = ftr['attributes']
+        gene_id = attributes.get('gene_id', [''])[0]
+        if not gene_id:
+            order.append(ftr)
+            continue
+        gene = genes.get(gene_id)
+        if gene is None:
+            gene = genes[gene_id] = {'gene': None, 'lines': [], 'transcripts': {}}
+            order.append(gene_id)
+        transcript_id = attributes.get('transcript_id', [''])[0]
+        if not transcript_id:
+            if ftr['type'] == 'gene':
+                gene['gene'] = ftr
+            else:
+                gene['lines'].append(ftr)
+            continue
+        transcript = gene['transcripts'].get(transcript_id)
+        if transcript is None:
+            transcript = gene['transcripts'][transcript_id] = {'transcript': None, 'lines': []}
+        if ftr['type'] == 'transcript':
+            transcript['transcript'] = ftr
+        else:
+            transcript['lines'].append(ftr)
+
+    grouped = []
+    for item in order:
+        if isinstance(item, str):
+            grouped.extend(_gtf_gene(item, genes[item]))
+        else:
+            grouped.append(item)
+    return grouped
@@ -0,0 +1,84 @@
+"""
+Helpers for staging importer input files without copying them around.
+
+Local inputs are hard linked into the staging directory (copied only when the link fails, e.g.
+across file systems) and gzip or bzip2 files are read through a streaming decompressor instead
+of being unpacked into scratch first. Archives which can hold several files (zip, tar) are
+still unpacked by DataFileUtil.
+"""
+import bz2
+import gzip
+import logging
+import os
+import shutil
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tgz', '.tar.gz', '.tar.bz2', '.tbz', '.tbz2')
+COMPRESSED_EXTENSIONS = ('.gz', '.gzip', '.bz2', '.bzip2')
+_MAGIC = ((b'\x1f\x8b', gzip.open), (b'BZh', bz2.open))
+
+
+def is_archive(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def uncompressed_name(path):
+    """File name with any gzip/bzip2 extension removed"""
+    name = os.path.basename(path)
+    root, ext = os.path.splitext(name)
+    return root if ext.lower() in COMPRESSED_EXTENSIONS else name
+
+
+def link_or_copy(src, dest_dir):
+    """Hard link src into dest_dir, copying if it can't be linked. Returns the new path"""
+    dest = os.path.join(dest_dir, os.path.basename(src))
+    if os.path.exists(dest) and os.path.samefile(src, dest):
+        return dest
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+    return dest
+
+
+def _decompressor(path):
+    """gzip.open or bz2.open going by the file's leading bytes, or None for a plain file"""
+    with open(path, 'rb') as f:
+        head = f.read(3)
+    for magic, opener in _MAGIC:
+        if head.startswith(magic):
+            return opener
+    return None
+
+
+def open_text(path):
+    """Open a plain, gzip or bzip2 file for reading text"""
+    opener = _decompressor(path)
+    return opener(path, 'rt') if opener else open(path)
+
+
+def nonblank_lines(paths):
+    """Yield the lines of each file in turn with line endings normalized to '\\n', skipping
+    lines that are only whitespace"""
+    for path in paths:
+        with open_text(path) as f:
+            for line in f:
+                line = line.rstrip('\r\n')
+                if line.strip():
+                    yield line + '\n'
+
+
+def decompress_to(src, dest_dir):
+    """Write the uncompressed contents of a plain, gzip or bzip2 file into dest_dir. Plain
+    files are linked rather than rewritten. Returns the new path"""
+    if _decompressor(src) is None:
+        return link_or_copy(src, dest_dir)
+    dest = os.path.join(dest_dir, uncompressed_name(src))
+    with open_text(src) as f_in, open(dest, 'w') as f_out:
+        shutil.copyfileobj(f_in, f_out, 2 ** 20)
+    return dest
+
+
+def log_scratch_usage(path, stage):
+    usage = shutil.disk_usage(path)
+    logging.info(f"Scratch {stage}: {usage.used / 2 ** 30:.2f} GB used, "
+                 f"{usage.free / 2 ** 30:.2f} GB free")
@@ -0,0 +1,123 @@
+"""
+Batched md5 hashing of feature and protein sequences.
+
+In inline mode digests are computed as sequences are added, as the importers always did. In
+pooled mode add() hands back a PendingMd5 placeholder and the sequences are hashed in batches on
+a thread pool (hashlib releases the GIL on large buffers) while parsing continues; resolve()
+then swaps the placeholders in the finished feature lists for the digests.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from GenomeFileUtil.core.SequenceUtils import sequence_md5
+
+MD5_BATCH_SIZE = 2000
+MD5_FIELDS = ('md5', 'protein_md5')
+MD5_HEX_SIZE = 32
+
+
+class PendingMd5:
+    """An md5 still being computed. Shallow and deep copies of a feature share the placeholder
+    so every copy gets the digest"""
+    __slots__ = ('data', 'digest')
+
+    def __init__(self, data):
+        self.data = data
+        self.digest = None
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def placeholder_json(value):
+    """json.dumps default writing a placeholder as a string the size of its hex digest, so a
+    feature can be measured before its md5s are resolved"""
+    if isinstance(value, PendingMd5):
+        return '0' * MD5_HEX_SIZE
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _hash_batch(batch):
+    start = time.time()
+    for pending in batch:
+        pending.digest = sequence_md5(pending.data)
+        pending.data = None
+    return time.time() - start
+
+
+class Md5Stage:
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.pooled = workers > 1
+        self._pool = None
+        self._batch = []
+        self._futures = []
+        self._count = 0
+        self._bytes = 0
+        self._hash_time = 0.0
+
+    def add(self, data):
+        """Queue a sequence (str or bytes) and return its md5, or a placeholder for it"""
+        self._count += 1
+        self._bytes += len(data)
+        if not self.pooled:
+            start = time.time()
+            digest = sequence_md5(data)
+            self._hash_time += time.time() - start
+            return digest
+        pending = PendingMd5(data)
+        self._batch.append(pending)
+        if len(self._batch) >= MD5_BATCH_SIZE:
+            self._submit()
+        return pending
+
+    def _submit(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._futures.append(self._pool.submit(_hash_batch, self._batch))
+        self._batch = []
+
+    def map(self, func, items):
+        """Apply an md5 function (e.g. a contig store's md5) to items, on the pool if pooled"""
+        start = time.time()
+        if self.pooled:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            digests = list(self._pool.map(func, items))
+        else:
+            digests = [func(item) for item in items]
+        logging.info(f"Hashed {len(digests)} contigs in {time.time() - start:.2f}s")
+        return digests
+
+    def run(self):
+        """Wait for all queued sequences to be hashed and log the stage timings"""
+        if self._batch:
+            self._submit()
+        start = time.time()
+        for future in self._futures:
+            self._hash_time += future.result()
+        wait = time.time() - start
+        self._futures = []
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        size = f"{self._count} sequences ({self._bytes / 2 ** 20:.1f} MB)"
+        if self.pooled:
+            logging.info(f"Hashed {size} on {self.workers} threads: {self._hash_time:.2f}s "
+                         f"hashing summed over threads, {wait:.2f}s waiting after parse")
+        else:
+            logging.info(f"Hashed {size} inline: {self._hash_time:.2f}s hashing")
+
+    def resolve(self, features):
+        """Replace md5 placeholders in features with their digests. Call after run()"""
+        if not self.pooled:
+            return
+        for feat in features:
+            for field in MD5_FIELDS:
+                value = feat.get(field)
+                if isinstance(value, PendingMd5):
+                    feat[field] = value.digest
@@ -0,0 +1,94 @@
+"""
+Splits ontology terms from other database cross references for the genome importers.
+
+The ontology a reference belongs to is found from its prefix using the table in
+data/ontology_prefixes.json, so another ontology only needs a mapping file and a prefix entry
+there. An ontology event is created the first time a term from that ontology is seen.
+"""
+import json
+import os
+from collections import defaultdict
+
+from GenomeFileUtil.core.GenomeUtils import load_ontology_mappings
+
+ONTOLOGY_PREFIX_FILE = 'ontology_prefixes.json'
+
+
+class OntologyClassifier:
+    def __init__(self, data_dir, method_version, timestamp):
+        self.ont_mappings = load_ontology_mappings(data_dir)
+        with open(os.path.join(data_dir, ONTOLOGY_PREFIX_FILE)) as f:
+            config = json.load(f)
+        # first character -> (prefix, ontology) pairs, longest prefix first so it wins over a
+        # shorter prefix it starts with. Most references are rejected by one dict lookup
+        self._prefixes = defaultdict(list)
+        for prefix, ontology_type in sorted(config['prefixes'].items(),
+                                            key=lambda x: len(x[0]), reverse=True):
+            self._prefixes[prefix[0]].append((prefix, ontology_type))
+        self._prefixes = dict(self._prefixes)
+        self._ontology_refs = config.get('ontology_refs', {})
+        self.method_version = method_version
+        self.timestamp = timestamp
+        self.reset()
+
+    def reset(self):
+        """Forget the events and terms seen so far"""
+        self.ontology_events = []
+        self.ontologies_present = defaultdict(dict)
+        self._event_indexes = {}
+
+    def merge(self, ontology_events, ontologies_present):
+        """Add the events and terms seen by another classifier (e.g. in a worker process),
+        returning this classifier's event index for each of the other's events. Merging in the
+        order the work was split keeps the event order of a serial run"""
+        index_map = [self.event_index(event['id']) for event in ontology_events]
+        for ontology_type, terms in ontologies_present.items():
+            self.ontologies_present[ontology_type].update(terms)
+        return index_map
+
+    def event_index(self, ontology_type):
+        """Return the index of the ontology event, creating the event if necessary"""
+        index = self._event_indexes.get(ontology_type)
+        if index is not None:
+            return index
+        if ontology_type not in self.ont_mappings:
+            raise ValueError(f"{ontology_type} is not a supported ontology")
+        index = self._event_indexes[ontology_type] = len(self.ontology_events)
+        self.ontology_events.append({
+            "method": "GenomeFileUtils Genbank uploader from annotations",
+            "method_version": self.method_version,
+            "timestamp": self.timestamp,
+            "id": ontology_type,
+            "ontology_ref": self._ontology_refs.get(
+                ontology_type, f"KBaseOntology/{ontology_type.lower()}_ontology")
+        })
+        return index
+
+    def add_term(self, ontology_terms, ontology_type, term):
+        """Record a term of a known ontology in a feature's ontology_terms"""
+        ontology_terms[ontology_type][term] = [self.event_index(ontology_type)]
+        self.ontologies_present[ontology_type][term] = \
+            self.ont_mappings[ontology_type].get(term, '')
+
+    def ontology_of(self, ref):
+        """The ontology a reference belongs to by prefix, or None"""
+        for prefix, ontology_type in self._prefixes.get(ref[:1], ()):
+            if ref.startswith(prefix):
+                return ontology_type
+        return None
+
+    def classify(self, refs, ontology_terms=None):
+        """Split a feature's references into ontology terms (added to ontology_terms) and
+        db_xref (source, id) tuples"""
+        if ontology_terms is None:
+            ontology_terms = defaultdict(dict)
+        db_xrefs = []
+        for ref in refs:
+            ontology_type = self.ontology_of(ref)
+            if ontology_type:
+                self.add_term(ontology_terms, ontology_type, ref)
+            elif ":" not in ref:
+                db_xrefs.append(("Unknown_Source", ref))
+            else:
+                db_xrefs.append(tuple(ref.split(":", 1)))
+        return ontology_terms, db_xrefs
@@ -0,0 +1,53 @@
+"""
+Streaming writer for the protein FASTA of an AnnotatedMetagenomeAssembly.
+
+Records are written as CDSs are translated, each header and sequence on its own newline
+terminated line. A protein_id shared by several CDSs gets one record holding the first CDS's
+sequence, with every CDS id listed in its header; as the header can't be changed once written,
+the ids of the later CDSs are kept aside and added in one pass over the file when it is closed.
+Only the protein ids seen so far are held in memory.
+"""
+import os
+from collections import defaultdict
+
+HEADER_CDS_IDS = " cds_ids:"
+
+
+class ProteinFastaWriter:
+    def __init__(self, path):
+        self.path = path
+        self._part_path = path + '.part'
+        self._file = open(self._part_path, 'w')
+        # protein_id -> record number
+        self._records = {}  # type: dict
+        self._extra_cds_ids = defaultdict(list)  # type: defaultdict
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, protein_id, cds_id, protein):
+        """Write the record for a protein_id, or note another CDS for one already written"""
+        record = self._records.get(protein_id)
+        if record is not None:
+            self._extra_cds_ids[record].append(cds_id)
+            return
+        self._records[protein_id] = len(self._records)
+        self._file.write(f">{protein_id}{HEADER_CDS_IDS}{cds_id}\n{protein}\n")
+
+    def close(self):
+        """Finish the file and return its path"""
+        self._file.close()
+        if not self._extra_cds_ids:
+            os.replace(self._part_path, self.path)
+            return self.path
+        record = -1
+        with open(self._part_path) as part, open(self.path, 'w') as out:
+            for line in part:
+                if line[0] == '>':
+                    record += 1
+                    extra = self._extra_cds_ids.get(record)
+                    if extra:
+                        line = line[:-1] + "|" + "|".join(extra) + "\n"
+                out.write(line)
+        os.remove(self._part_path)
+        return self.path
@@ -0,0 +1,204 @@
+"""
+Sequence helpers shared by the genome importers.
+
+Feature sequences are cut from uppercased contig bytes (bytes, mmap or memoryview), reverse
+complemented with a byte translate table and hashed without going through Bio.Seq or str.
+
+CDS translation uses lookup tables built once per NCBI genetic code from Biopython's own
+ambiguous codon tables: every codon that can be spelled with the letters Biopython accepts is
+resolved up front to what Bio.Seq.translate would emit for it. Translating is then a C level
+split of the sequence into codons and one dict lookup per codon, done over a batch of CDSs at
+a time. Results and TranslationError messages follow Bio.Seq.translate(cds=True) in
+Biopython 1.70, the release pinned in the Dockerfile. Large sets of CDSs can be split into
+chunks translated in a process pool.
+"""
+import functools
+import hashlib
+import itertools
+import multiprocessing
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from Bio.Data import CodonTable, IUPACData
+from Bio.Data.CodonTable import TranslationError
+
+# IUPAC complements, matching Bio.Seq.reverse_complement for DNA
+COMPLEMENT = bytes.maketrans(b'ACGTUMRWSYKVHDBN', b'TGCAAKYWSRMBDHVN')
+# bases of CDS body translated per buffer, bounds the temporary codon list
+TRANSLATION_BATCH_SIZE = 2 ** 20
+# CDSs per task when translating in a process pool
+TRANSLATION_CHUNK_SIZE = 5000
+
+_CODON = re.compile('...', re.DOTALL)
+_INVALID = '?'
+
+
+def extract_sequence(buffer, start, end, reverse_complement=False):
+    """Return bytes [start, end) of an uppercased contig buffer, reverse complemented for
+    features on the minus strand"""
+    data = bytes(buffer[start:end])
+    if reverse_complement:
+        return data.translate(COMPLEMENT)[::-1]
+    return data
+
+
+def sequence_md5(data):
+    """md5 hex digest of a sequence held as bytes, or as str"""
+    if isinstance(data, str):
+        data = data.encode('utf8')
+    return hashlib.md5(data).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _codon_table(table_id):
+    """Expand a genetic code into (codon -> residue, start codons, stop codons). Codons which
+    Biopython would reject are left out of the residue lookup"""
+    table = CodonTable.ambiguous_generic_by_id[table_id]
+    alphabet = table.nucleotide_alphabet
+    # an Alphabet object in older Biopython releases and a string or None in newer ones
+    valid = getattr(alphabet, 'letters', alphabet) or (
+        IUPACData.ambiguous_dna_letters + IUPACData.ambiguous_rna_letters)
+    valid = set(valid.upper())
+    letters = valid | set(getattr(table.forward_table, 'ambiguous_nucleotide', {}))
+    stops = set(table.stop_codons)
+    residues = {}
+    for codon in map(''.join, itertools.product(sorted(letters), repeat=3)):
+        try:
+            residues[codon] = table.forward_table[codon]
+        except (KeyError, TranslationError):
+            if codon in stops:
+                residues[codon] = '*'
+            elif valid.issuperset(codon):
+                # possible stop codon (e.g. NNN or TAN)
+                residues[codon] = 'X'
+    return residues, set(table.start_codons), stops
+
+
+def _check_cds(seq, starts, stops):
+    if seq[:3] not in starts:
+        return TranslationError(f"First codon '{seq[:3]}' is not a start codon")
+    if len(seq) % 3:
+        return TranslationError(f"Sequence length {len(seq)} is not a multiple of three")
+    if seq[-3:] not in stops:
+        return TranslationError(f"Final codon '{seq[-3:]}' is not a stop codon")
+    return None
+
+
+def _translate_batch(bodies, residues):
+    """Translate CDS bodies (start and stop codons removed) as one buffer"""
+    translated = ''.join(map(residues.get, _CODON.findall(''.join(bodies)),
+                             itertools.repeat(_INVALID)))
+    offset = 0
+    for body in bodies:
+        n_codons = len(body) // 3
+        protein = translated[offset:offset + n_codons]
+        offset += n_codons
+        stop, invalid = protein.find('*'), protein.find(_INVALID)
+        if stop == invalid == -1:
+            yield 'M' + protein
+        elif invalid == -1 or -1 < stop < invalid:
+            yield TranslationError("Extra in frame stop codon found.")
+        else:
+            yield TranslationError(f"Codon '{body[invalid * 3:invalid * 3 + 3]}' is invalid")
+
+
+def translate_cdss(sequences, table=11):
+    """Translate coding sequences with a genetic code. Returns a list holding, for each
+    sequence, either its protein sequence or the TranslationError Biopython would raise"""
+    residues, starts, stops = _codon_table(int(table))
+    results = []
+    batch, batch_index, batch_size = [], [], 0
+    for seq in sequences:
+        seq = seq.upper()
+        error = _check_cds(seq, starts, stops)
+        results.append(error)
+        if error:
+            continue
+        batch.append(seq[3:-3])
+        batch_index.append(len(results) - 1)
+        batch_size += len(seq)
+        if batch_size >= TRANSLATION_BATCH_SIZE:
+            for i, result in zip(batch_index, _translate_batch(batch, residues)):
+                results[i] = result
+            batch, batch_index, batch_size = [], [], 0
+    for i, result in zip(batch_index, _translate_batch(batch, residues)):
+        results[i] = result
+    return results
+
+
+# held by the workers of a pool being started by fork_pool until all of them are running
+_start_barrier = None
+
+
+def _wait_for_workers():
+    _start_barrier.wait()
+
+
+def fork_pool(workers):
+    """A process pool whose workers are all forked before it is returned, so a caller that
+    starts threads afterwards never forks while they run. Workers inherit the caller's memory
+    as it is now"""
+    global _start_barrier
+    context = multiprocessing.get_context('fork')
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    # some Python versions only fork a worker when a task finds none idle, so each worker is
+    # held in a task until every one has been forked
+    _start_barrier = context.Barrier(workers)
+    try:
+        for future in [pool.submit(_wait_for_workers) for _ in range(workers)]:
+            future.result()
+    except BaseException:
+        pool.shutdown()
+        raise
+    finally:
+        _start_barrier = None
+    return pool
+
+
+def translation_pool(workers):
+    """A process pool to hand to iter_translate_cdss, so that several calls share its workers.
+    None for fewer than two workers"""
+    if workers < 2:
+        return None
+    return fork_pool(workers)
+
+
+def iter_translate_cdss(sequences, table=11, workers=1, chunk_size=TRANSLATION_CHUNK_SIZE,
+                        pool=None):
+    """Yield the translate_cdss result for each coding sequence in order. With more than one
+    worker and more than one chunk of sequences, chunks are translated in a process pool with
+    only a few of them in flight, so results are yielded as the chunks complete. The pool is
+    made for the call unless one from translation_pool is given"""
+    sequences = iter(sequences)
+    chunks = iter(lambda: list(itertools.islice(sequences, chunk_size)), [])
+    head = list(itertools.islice(chunks, 2))
+    chunks = itertools.chain(head, chunks)
+    if workers < 2 or len(head) < 2:
+        for chunk in chunks:
+            yield from translate_cdss(chunk, table)
+        return
+
+    if pool is None:
+        with translation_pool(workers) as pool:
+            yield from _pooled_translations(pool, chunks, table, workers)
+    else:
+        yield from _pooled_translations(pool, chunks, table, workers)
+
+
+def _pooled_translations(pool, chunks, table, workers):
+    in_flight = deque()
+    for chunk in chunks:
+        in_flight.append(pool.submit(translate_cdss, chunk, table))
+        if len(in_flight) >= 2 * workers:
+            yield from in_flight.popleft().result()
+    while in_flight:
+        yield from in_flight.popleft().result()
+
+
+def translate_cds(sequence, table=11):
+    """Equivalent of Bio.Seq.translate(sequence, table, cds=True)"""
+    result = translate_cdss([sequence], table)[0]
+    if isinstance(result, TranslationError):
+        raise result
+    return result
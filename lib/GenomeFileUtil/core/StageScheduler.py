@@ -0,0 +1,123 @@
+"""
+Runs the stages of an import as soon as the stages they depend on are done.
+
+Most of an import's wall time is spent either on local parsing or waiting on remote services
+(saving the assembly, uploading files to Shock), so stages with no dependency between them can
+overlap: a remote call waits on a thread while the parsing holds the GIL. Stages run on a thread
+pool, except local ones which run on the calling thread, e.g. so process pools they start are
+forked from it. Each stage is called with the results of its dependencies, in the order they
+were listed. If a stage fails, no further stages are started, those queued for a thread are
+cancelled and the first error is raised once the running ones have finished. Stages with side
+effects that outlive the run (a saved object, an uploaded file) that had finished by then are
+logged with their results, as they are not undone.
+
+After a run, the time of each stage and the critical path (the chain of dependencies that
+decided the total time) are logged.
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class StageScheduler:
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        # name -> (func, dependency names, local, side effects), in the order they were added
+        self._stages = {}  # type: dict
+        self.results = {}  # type: dict
+        # name -> (start, end) in seconds since the run started
+        self.timings = {}  # type: dict
+
+    def add(self, name, func, depends=(), local=False, side_effects=False):
+        """Add a stage calling func with the results of the named stages"""
+        if name in self._stages:
+            raise ValueError(f"Stage {name} was already added")
+        for dependency in depends:
+            if dependency not in self._stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dependency}")
+        self._stages[name] = (func, tuple(depends), local, side_effects)
+
+    def run(self):
+        """Run every stage and return a dict of their results"""
+        start = time.time()
+        pending = dict(self._stages)
+        running = {}
+        errors = []
+        # stages that were not run because another one failed
+        skipped = []
+
+        def timed(name, func, args):
+            stage_start = time.time() - start
+            try:
+                return func(*args)
+            finally:
+                self.timings[name] = (stage_start, time.time() - start)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                if errors:
+                    for future in [future for future in running if future.cancel()]:
+                        skipped.append(running.pop(future))
+                ready = [] if errors else [
+                    name for name, (_, depends, _, _) in pending.items()
+                    if all(dependency in self.results for dependency in depends)]
+                local = None
+                for name in ready:
+                    stage = pending.pop(name)
+                    func, depends, is_local, _ = stage
+                    args = [self.results[dependency] for dependency in depends]
+                    if is_local and local is None:
+                        local = (name, func, args)
+                    elif is_local:
+                        # the next one is run once the first is done
+                        pending[name] = stage
+                    else:
+                        running[pool.submit(timed, name, func, args)] = name
+                if local is not None:
+                    try:
+                        self.results[local[0]] = timed(*local)
+                    except Exception as err:
+                        errors.append(err)
+                    continue
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as err:
+                        errors.append(err)
+        if errors:
+            self.log_failure(skipped + list(pending))
+            raise errors[0]
+        self.log_timings(time.time() - start)
+        return self.results
+
+    def critical_path(self):
+        """The stages, in order, of the dependency chain that finished last"""
+        path = []
+        name = max(self.timings, key=lambda stage: self.timings[stage][1], default=None)
+        while name is not None:
+            path.append(name)
+            depends = self._stages[name][1]
+            name = max(depends, key=lambda stage: self.timings[stage][1], default=None)
+        return path[::-1]
+
+    def log_failure(self, skipped):
+        if skipped:
+            logging.error(f"Stages not run after a failure: {', '.join(skipped)}")
+        for name in self.results:
+            if self._stages[name][3]:
+                logging.error(f"Stage {name} finished before the failure and was not undone, "
+                              f"result: {self.results[name]!r}")
+
+    def log_timings(self, total):
+        for name, (stage_start, stage_end) in sorted(self.timings.items(),
+                                                     key=lambda item: item[1]):
+            logging.info(f"Stage {name}: {stage_end - stage_start:.2f}s "
+                         f"({stage_start:.2f}s - {stage_end:.2f}s)")
+        path = self.critical_path()
+        path_time = sum(self.timings[name][1] - self.timings[name][0] for name in path)
+        logging.info(f"All stages took {total:.2f}s, critical path {' -> '.join(path)} "
+                     f"{path_time:.2f}s")
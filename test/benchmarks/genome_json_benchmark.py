@@ -0,0 +1,52 @@
+"""
+Compares the time taken to write the key sorted genome JSON that save_one_genome uploads, as it
+used to be written (json.dump of a GenomeUtils.sort_dict copy) and with write_genome_json using
+the json and, if installed, orjson encoders, on the synthetic genome of genome_size_benchmark.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/genome_json_benchmark.py [size in MB]
+"""
+import filecmp
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from genome_size_benchmark import synthetic_genome
+
+from GenomeFileUtil.core import GenomeJsonWriter
+from GenomeFileUtil.core.GenomeJsonWriter import write_genome_json
+from GenomeFileUtil.core.GenomeUtils import sort_dict
+
+
+def sort_dict_dump(genome, path):
+    with open(path, 'w') as f:
+        json.dump(sort_dict(genome), f)
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    genome = synthetic_genome(size_mb)
+    tmp = tempfile.mkdtemp()
+    writers = [('sort_dict + json.dump', sort_dict_dump),
+               ('write_genome_json', write_genome_json)]
+    if GenomeJsonWriter.orjson is not None:
+        writers.append(('with orjson', lambda g, path: write_genome_json(g, path, 'orjson')))
+    try:
+        paths = []
+        for i, (label, writer) in enumerate(writers):
+            path = os.path.join(tmp, f'{i}.json')
+            start = time.time()
+            writer(genome, path)
+            elapsed = time.time() - start
+            print(f"{label:22} {os.path.getsize(path) / 2 ** 20:8.1f} MB in {elapsed:6.2f}s")
+            paths.append(path)
+        assert filecmp.cmp(paths[0], paths[1], shallow=False)
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
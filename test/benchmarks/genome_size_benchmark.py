@@ -0,0 +1,67 @@
+"""
+Compares the time GenomeInterface.handle_large_genomes takes to size a genome that is under the
+limit, as it used to (serializing the whole genome before each feature list, each list and the
+genome again at the end) and with GenomeSize, on a synthetic genome of about 800 MB of JSON.
+
+Features share a small pool of sequence strings so the genome itself takes little memory; the
+old way still needs room for several 800 MB strings. The size in MB can be given as an argument.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/genome_size_benchmark.py [size in MB]
+"""
+import json
+import random
+import sys
+import time
+
+from GenomeFileUtil.core.GenomeSize import GenomeSize
+
+FEATURE_LISTS = ('mrnas', 'features', 'non_coding_features', 'cdss')
+SEQUENCE_LENGTH = 3000
+
+
+def synthetic_genome(size_mb, seed=3):
+    rand = random.Random(seed)
+    sequences = [''.join(rand.choices('ACGT', k=SEQUENCE_LENGTH)) for _ in range(100)]
+    genome = {'id': 'synthetic', 'scientific_name': 'Unknown', 'dna_size': 0,
+              'contig_ids': [f'contig_{i}' for i in range(1000)],
+              'features': [], 'cdss': [], 'mrnas': [], 'non_coding_features': []}
+    # gene, CDS and mRNA each carry the sequence
+    num_genes = size_mb * 2 ** 20 // (3 * (SEQUENCE_LENGTH + 300))
+    for i in range(num_genes):
+        seq = sequences[i % len(sequences)]
+        location = [[f'contig_{i % 1000}', i * 10, '+', SEQUENCE_LENGTH]]
+        common = {'location': location, 'dna_sequence': seq, 'dna_sequence_length': len(seq),
+                  'md5': 'd41d8cd98f00b204e9800998ecf8427e', 'functions': ['hypothetical protein']}
+        genome['features'].append(dict(common, id=f'gene_{i}', cdss=[f'gene_{i}_CDS_1']))
+        genome['cdss'].append(dict(common, id=f'gene_{i}_CDS_1', parent_gene=f'gene_{i}'))
+        genome['mrnas'].append(dict(common, id=f'gene_{i}_mRNA_1', parent_gene=f'gene_{i}'))
+    return genome
+
+
+def old_sizes(genome):
+    """The json.dumps calls handle_large_genomes made for a genome under the limit"""
+    sizes = {}
+    for name in FEATURE_LISTS:
+        if name in genome:
+            sys.getsizeof(json.dumps(genome))
+            sizes[name] = sys.getsizeof(json.dumps(genome[name]))
+    return sizes, sys.getsizeof(json.dumps(genome))
+
+
+def new_sizes(genome):
+    size = GenomeSize(genome)
+    return {name: size.list_size(name) for name in FEATURE_LISTS if name in genome}, size.total
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    genome = synthetic_genome(size_mb)
+    for label, sizer in (('json.dumps', old_sizes), ('GenomeSize', new_sizes)):
+        start = time.time()
+        _, total = sizer(genome)
+        print(f"{label:12} {total / 2 ** 20:8.1f} MB sized in {time.time() - start:6.2f}s")
+
+
+if __name__ == '__main__':
+    main()
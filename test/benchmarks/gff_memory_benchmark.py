@@ -0,0 +1,117 @@
+"""
+Measures the memory held per feature by the parsed lines of a large metagenome GFF, as the
+FASTA/GFF importer keeps every line of a file while it builds the genome. The feature dicts
+GffParser used to return are compared with its GffRecords.
+
+The GFF is made up in the style of a JGI metagenome annotation, or given as an argument.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/gff_memory_benchmark.py [gff file]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import tracemalloc
+import urllib.parse as parse
+
+from GenomeFileUtil.core.GffParser import attribute_key, iter_gff_lines, read_gff
+
+NUM_CONTIGS = 20000
+PRODUCTS = ['hypothetical protein', 'ABC transporter ATP-binding protein',
+            'DNA-binding response regulator', 'MFS transporter', 'glycosyltransferase',
+            'TonB-dependent receptor'] + [f'protein of unknown function DUF{i}' for i in range(500)]
+
+
+def make_gff(path, seed=3):
+    """Write a metagenome GFF with a few genes on each of many contigs"""
+    rand = random.Random(seed)
+    with open(path, 'w') as gff:
+        gff.write('##gff-version 3\n')
+        for contig in range(1, NUM_CONTIGS + 1):
+            contig_id = f'Ga0065724_1{contig:07}'
+            start = rand.randint(1, 300)
+            for gene in range(1, rand.randint(2, 20)):
+                end = start + 3 * rand.randint(50, 600) - 1
+                feature_id = f'{contig_id}.{gene}'
+                strand = rand.choice('+-')
+                attributes = (f'ID={feature_id};locus_tag={contig_id}{gene};'
+                              f'product={rand.choice(PRODUCTS)}')
+                if rand.random() < 0.3:
+                    attributes += f';ko=KO:K{rand.randint(0, 25000):05}'
+                gff.write(f'{contig_id}\tProdigal v2.6.3\tCDS\t{start}\t{end}\t.\t{strand}\t0'
+                          f'\t{attributes}\n')
+                start = end + rand.randint(1, 300)
+
+
+def dict_attributes(attributes):
+    """GffParser.parse_attributes before its values were interned"""
+    parsed = {}
+    for attribute in attributes.split(";"):
+        attribute = attribute.strip()
+        if not attribute:
+            continue
+        if "=" in attribute:
+            key, value = attribute.split("=", 1)
+        elif " " in attribute:
+            key, value = attribute.split(" ", 1)
+        else:
+            continue
+        value = parse.unquote(value.strip('"'))
+        parsed.setdefault(attribute_key(key), []).append(value)
+    return parsed
+
+
+def dict_features(path):
+    """The feature dicts GffParser.parse_gff_line used to return"""
+    for line in iter_gff_lines(path):
+        if not line or line[0] == '#' or line.isspace():
+            continue
+        (contig_id, source_id, feature_type, start, end,
+         score, strand, phase, attributes) = line.split('\t')
+        ftr = {'contig': contig_id, 'source': source_id,
+               'type': feature_type, 'start': int(start),
+               'end': int(end), 'score': score, 'strand': strand,
+               'phase': phase, 'attributes': dict_attributes(attributes)}
+        if "id" in ftr['attributes']:
+            ftr['ID'] = ftr['attributes']['id'][0]
+        if "parent" in ftr['attributes']:
+            ftr['Parent'] = ftr['attributes']['parent'][0]
+        yield ftr
+
+
+def held_bytes(features):
+    tracemalloc.start()
+    held = list(features)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, size
+
+
+def main():
+    tmp = None
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+    else:
+        tmp = tempfile.mkdtemp()
+        path = os.path.join(tmp, 'metagenome.gff')
+        make_gff(path)
+    try:
+        # measured apart, as interned strings would otherwise be shared
+        records, record_bytes = held_bytes(read_gff(path))
+        num_features = len(records)
+        del records
+        dicts, dict_bytes = held_bytes(dict_features(path))
+        assert list(read_gff(path)) == dicts
+        print(f"{path}: {num_features} features")
+        print(f"    feature dicts {dict_bytes / num_features:8.0f} bytes per feature")
+        print(f"    GffRecords    {record_bytes / num_features:8.0f} bytes per feature"
+              f"  {dict_bytes / record_bytes:5.2f}x smaller")
+    finally:
+        if tmp:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
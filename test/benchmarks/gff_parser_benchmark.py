@@ -0,0 +1,83 @@
+"""
+Compares the throughput, in lines per second, of the GFF line parsing FastaGFFToGenome used to
+do inline (str.split, a defaultdict of attributes, the snake_case regex and unquote on every
+key and value, plus a copy of the raw attribute column) with GffParser, reading line by line and
+in 1 MB blocks. The parsed features are checked to be the same.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/gff_parser_benchmark.py
+"""
+import collections
+import time
+import urllib.parse as parse
+
+from GenomeFileUtil.core.GffParser import make_snake_case, read_gff
+
+GFF_FILES = ('data/e_coli/NC_000913.3.gff3',
+             'data/metagenomes/toy/Test_v1.0.gene.gff',
+             'data/fasta_gff/PATRIC/Ecoli_O104/1240778.3.PATRIC.gff',
+             'data/rhodobacter.gtf')
+REPEATS = 5
+
+
+def inline_parser(path):
+    """The previous parsing loop of FastaGFFToGenome._retrieve_gff_file"""
+    for current_line in open(path):
+        if current_line.isspace() or current_line == "" or current_line.startswith("#"):
+            continue
+        (contig_id, source_id, feature_type, start, end,
+         score, strand, phase, attributes) = current_line.split('\t')
+        ftr = {'contig': contig_id, 'source': source_id,
+               'type': feature_type, 'start': int(start),
+               'end': int(end), 'score': score, 'strand': strand,
+               'phase': phase, 'attributes': collections.defaultdict(list)}
+        for attribute in attributes.split(";"):
+            attribute = attribute.strip()
+            if not attribute:
+                continue
+            if "=" in attribute:
+                key, value = attribute.split("=", 1)
+            elif " " in attribute:
+                key, value = attribute.split(" ", 1)
+            else:
+                continue
+            ftr['attributes'][make_snake_case(key)].append(parse.unquote(value.strip('"')))
+        ftr['attributes']['raw'] = attributes
+        if "id" in ftr['attributes']:
+            ftr['ID'] = ftr['attributes']['id'][0]
+        if "parent" in ftr['attributes']:
+            ftr['Parent'] = ftr['attributes']['parent'][0]
+        yield ftr
+
+
+def line_parser(path):
+    return read_gff(path)
+
+
+def chunked_parser(path):
+    return read_gff(path, 2 ** 20)
+
+
+def main():
+    for path in GFF_FILES:
+        with open(path) as f:
+            n_lines = sum(1 for _ in f)
+        expected = list(inline_parser(path))
+        for ftr in expected:
+            del ftr['attributes']['raw']
+            ftr['attributes'] = dict(ftr['attributes'])
+        assert list(line_parser(path)) == expected, path
+        assert list(chunked_parser(path)) == expected, path
+        print(f"{path}: {n_lines} lines, {len(expected)} features")
+        for label, parser in (('inline', inline_parser), ('GffParser', line_parser),
+                              ('chunked', chunked_parser)):
+            start = time.time()
+            for _ in range(REPEATS):
+                for _ in parser(path):
+                    pass
+            rate = n_lines * REPEATS / (time.time() - start)
+            print(f"    {label:10} {rate / 1000:8.1f} k lines/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Compares splitting feature cross references into ontology terms and db_xrefs with the chain of
+startswith checks the importers used (including the GO event lookups every feature made) and
+with the prefix table of OntologyClassifier, on the Dbxref and Ontology_term attributes of
+RefSeq GFF files.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/ontology_classifier_benchmark.py
+"""
+import time
+import urllib.parse as parse
+from collections import defaultdict
+
+from GenomeFileUtil.core.OntologyClassifier import OntologyClassifier
+
+GFF_FILES = ('data/e_coli/NC_000913.3.gff3',
+             'data/fasta_gff/RefSeq/Bacterial_Data/NC_021490.gff')
+REPEATS = 20
+CHAIN = (('GO:', 'GO'), ('PO:', 'PO'), ('KO:', 'KO'), ('COG', 'COG'), ('PF', 'PFAM'),
+         ('TIGR', 'TIGRFAM'))
+
+
+def feature_refs(path):
+    features = []
+    with open(path) as gff:
+        for line in gff:
+            cols = line.rstrip('\n').split('\t')
+            if len(cols) != 9:
+                continue
+            refs = []
+            for attribute in cols[8].split(';'):
+                key, _, value = attribute.partition('=')
+                if key in ('Dbxref', 'Ontology_term'):
+                    refs.extend(parse.unquote(x) for x in value.split(','))
+            features.append(refs)
+    return features
+
+
+def chained(classifier, refs):
+    """The previous per reference startswith chain"""
+    ontology = defaultdict(dict)
+    db_xrefs = []
+    for _ in range(3):
+        classifier.event_index("GO")
+    for ref in refs:
+        for prefix, ontology_type in CHAIN:
+            if ref.startswith(prefix):
+                ontology[ontology_type][ref] = [classifier.event_index(ontology_type)]
+                classifier.ontologies_present[ontology_type][ref] = \
+                    classifier.ont_mappings[ontology_type].get(ref, '')
+                break
+        else:
+            if ":" not in ref:
+                db_xrefs.append(tuple(["Unknown_Source", ref]))
+            else:
+                db_xrefs.append(tuple(ref.split(":", 1)))
+    return dict(ontology), db_xrefs
+
+
+def table(classifier, refs):
+    ontology, db_xrefs = classifier.classify(refs)
+    return dict(ontology), db_xrefs
+
+
+def main():
+    start = time.time()
+    classifier = OntologyClassifier('../data', 'benchmark', 'now')
+    print(f"loaded ontology mappings in {time.time() - start:.1f}s")
+    for path in GFF_FILES:
+        features = feature_refs(path)
+        n_refs = sum(len(refs) for refs in features)
+        for refs in features:
+            old, new = chained(classifier, refs), table(classifier, refs)
+            assert old[0] == new[0] and old[1] == new[1], refs
+        timings = {}
+        for label, func in (('startswith', chained), ('prefix table', table)):
+            start = time.time()
+            for _ in range(REPEATS):
+                for refs in features:
+                    func(classifier, refs)
+            timings[label] = (time.time() - start) / (REPEATS * len(features))
+        print(f"{path}: {len(features)} features, {n_refs} references")
+        for label, per_feature in timings.items():
+            print(f"    {label:12} {per_feature * 1e6:7.2f} us/feature")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Compares de-duplicating the ontology evidence of a legacy genome into ontology_events, as
+GenomeInterface._update_genome does when it upgrades old RAST/Prokka genomes, with the list
+scans it used to make (ev not in ontology_events, ontology_events.index(ev)) and with
+GenomeUtils.OntologyEventIndex, on a synthetic genome with 1M evidence records.
+
+The number of evidence records and of distinct events can be given as arguments; the list
+scans take time proportional to their product.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/ontology_event_benchmark.py [evidence] [distinct events]
+"""
+import copy
+import random
+import sys
+import time
+
+from GenomeFileUtil.core.GenomeUtils import OntologyEventIndex
+
+EVIDENCE_PER_TERM = 2
+TERMS_PER_FEATURE = 5
+
+
+def legacy_genome(num_evidence, num_events, seed=5):
+    rand = random.Random(seed)
+    methods = [{'method': f'annotator {i % 7}', 'method_version': str(i % 3),
+                'timestamp': f'2016-0{i % 9 + 1}-01', 'eco': f'ECO:{i:07d}'}
+               for i in range(num_events // 2)]
+    features = []
+    per_feature = EVIDENCE_PER_TERM * TERMS_PER_FEATURE
+    for i in range(num_evidence // per_feature):
+        terms = {}
+        for j in range(TERMS_PER_FEATURE):
+            term_id = f'SSO:{rand.randrange(10000):09d}'
+            terms[term_id] = {'id': term_id, 'term_name': f'term {term_id}',
+                              'ontology_ref': f'6/{rand.randrange(2) + 1}/1',
+                              'evidence': [dict(rand.choice(methods))
+                                           for _ in range(EVIDENCE_PER_TERM)]}
+        features.append({'id': f'fig|1.peg.{i}', 'ontology_terms': {'SSO': terms}})
+    return {'features': features}
+
+
+class ListScans:
+    """De-duplication as _update_genome used to do it"""
+
+    def __init__(self):
+        self.events = []
+
+    def index(self, ev):
+        if ev not in self.events:
+            self.events.append(ev)
+        return self.events.index(ev)
+
+
+def upgrade(genome, ontology_events):
+    """The ontology term loop of _update_genome"""
+    for feat in genome['features']:
+        for ontology, terms in feat['ontology_terms'].items():
+            for term in terms.values():
+                term_evidence = []
+                for ev in term['evidence']:
+                    ev['id'] = ontology
+                    ev['ontology_ref'] = term['ontology_ref']
+                    term_evidence.append(ontology_events.index(ev))
+                feat['ontology_terms'][ontology][term['id']] = term_evidence
+    return ontology_events.events
+
+
+def main():
+    num_evidence = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    num_events = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    genome = legacy_genome(num_evidence, num_events)
+    results = []
+    for label, ontology_events in (('list scans', ListScans),
+                                   ('OntologyEventIndex', OntologyEventIndex)):
+        upgraded = copy.deepcopy(genome)
+        start = time.time()
+        events = upgrade(upgraded, ontology_events())
+        print(f"{label:20} {len(events)} events from {num_evidence} evidence records in "
+              f"{time.time() - start:7.2f}s")
+        results.append((events, upgraded))
+    assert results[0] == results[1]
+
+
+if __name__ == '__main__':
+    main()
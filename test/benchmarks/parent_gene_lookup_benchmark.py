@@ -0,0 +1,107 @@
+"""
+Compares Genbank parent gene resolution by walking back through the gene list (the previous
+GenbankToGenome._find_parent_gene) with the positional GeneIntervalIndex on a synthetic genome
+with overlapping, out of order genes.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/parent_gene_lookup_benchmark.py
+"""
+import random
+import time
+from collections import OrderedDict
+
+from GenomeFileUtil.core.GeneIntervalIndex import GeneIntervalIndex
+from GenomeFileUtil.core.GenomeUtils import is_parent
+
+N_GENES = 60000
+N_CONTIGS = 6
+# the walk back lookup is too slow to run over every feature
+N_WALK_BACK_SAMPLE = 500
+MAX_PARENT_LOOKUPS = 5
+
+
+def make_genes(seed=7):
+    """Genes are placed along each contig with overlaps and nested genes, then every tenth
+    gene is moved to the end of the list to mimic an out of order file"""
+    rand = random.Random(seed)
+    genes = []
+    for i in range(N_GENES):
+        contig = f"contig_{i % N_CONTIGS}"
+        start = (i // N_CONTIGS) * 800 + rand.randint(1, 400)
+        length = rand.randint(600, 3000)
+        strand = rand.choice("+-")
+        begin = start if strand == "+" else start + length - 1
+        genes.append({"id": f"gene_{i}", "type": "gene",
+                      "location": [[contig, begin, strand, length]]})
+    return [g for i, g in enumerate(genes) if i % 10] + genes[::10]
+
+
+def make_children(genes, seed=11):
+    """Each child sits inside its real parent but names a neighbouring gene, so the expected
+    ID always fails location validation and the search has to continue"""
+    rand = random.Random(seed)
+    children = []
+    for i, gene in enumerate(genes):
+        contig, begin, strand, length = gene['location'][0]
+        offset = rand.randint(0, length // 4)
+        child_length = rand.randint(100, length // 2)
+        child_begin = begin + offset if strand == "+" else begin - offset
+        decoy = genes[min(len(genes) - 1, i + rand.randint(6, 20))]['id']
+        children.append((decoy, {"id": f"CDS_{i}", "type": "CDS",
+                                 "location": [[contig, child_begin, strand, child_length]]}))
+    return children
+
+
+def walk_back(genes, potential_id, feature):
+    if potential_id in genes:
+        lookup_attempts = 0
+        while lookup_attempts < MAX_PARENT_LOOKUPS:
+            if is_parent(genes[potential_id], feature):
+                return potential_id
+            lookup_attempts += 1
+            try:
+                potential_id = list(genes.keys())[-(lookup_attempts + 1)]
+            except IndexError:
+                break
+    return None
+
+
+def indexed(genes, index, potential_id, feature):
+    if potential_id in genes:
+        if is_parent(genes[potential_id], feature):
+            return potential_id
+        for gene_id in index.containing(feature['location']):
+            if gene_id != potential_id and is_parent(genes[gene_id], feature):
+                return gene_id
+    return None
+
+
+def main():
+    gene_list = make_genes()
+    children = make_children(gene_list)
+    genes = OrderedDict((g['id'], g) for g in gene_list)
+
+    start = time.time()
+    index = GeneIntervalIndex()
+    for gene in gene_list:
+        index.add(gene['id'], gene['location'])
+    build_time = time.time() - start
+    print(f"{len(genes)} genes on {N_CONTIGS} contigs, index built in {build_time:.2f}s")
+
+    start = time.time()
+    resolved = sum(1 for pid, feat in children if indexed(genes, index, pid, feat))
+    index_time = time.time() - start
+
+    sample = children[:N_WALK_BACK_SAMPLE]
+    start = time.time()
+    walk_resolved = sum(1 for pid, feat in sample if walk_back(genes, pid, feat))
+    walk_time = time.time() - start
+
+    print(f"walk back: {walk_time / len(sample) * 1e6:10.1f} us/feature, "
+          f"resolved {walk_resolved}/{len(sample)} (sampled)")
+    print(f"index:     {index_time / len(children) * 1e6:10.1f} us/feature, "
+          f"resolved {resolved}/{len(children)}")
+
+
+if __name__ == '__main__':
+    main()
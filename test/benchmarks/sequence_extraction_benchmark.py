@@ -0,0 +1,93 @@
+"""
+Compares per feature sequence extraction through Bio.Seq (slice, upper, reverse_complement,
+str, md5 of the encoded string) with the byte level SequenceUtils helpers the importers use.
+
+Features come from the Arabidopsis chloroplast Genbank file and the E. coli K-12 GFF. There is
+no FASTA for the E. coli GFF in the test data, so its features are cut from a random contig of
+the length given in the file's sequence-region header.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/sequence_extraction_benchmark.py
+"""
+import hashlib
+import random
+import time
+
+import Bio.SeqIO
+from Bio.Seq import Seq
+
+from GenomeFileUtil.core.SequenceUtils import extract_sequence, sequence_md5
+
+ARABIDOPSIS = 'data/Arabidopsis_gbff/Arab_Chloro_Modified.gbff'
+E_COLI = 'data/e_coli/NC_000913.3.gff3'
+REPEATS = 5
+
+
+def arabidopsis_features():
+    record = next(Bio.SeqIO.parse(ARABIDOPSIS, 'genbank'))
+    features = [(int(part.start), int(part.end), part.strand == -1)
+                for feat in record.features for part in feat.location.parts]
+    return record.seq, features
+
+
+def e_coli_features(seed=3):
+    features = []
+    contig_length = 0
+    with open(E_COLI) as gff:
+        for line in gff:
+            if line.startswith('##sequence-region'):
+                contig_length = int(line.split()[3])
+            elif line.strip() and not line.startswith('#'):
+                cols = line.split('\t')
+                features.append((int(cols[3]) - 1, int(cols[4]), cols[6] == '-'))
+    rand = random.Random(seed)
+    seq = Seq(''.join(rand.choice('acgtACGTN') for _ in range(contig_length)))
+    return seq, features
+
+
+def old_way(seq, features):
+    for start, end, minus in features:
+        feat_seq = seq[start:end].upper()
+        if minus:
+            feat_seq = feat_seq.reverse_complement()
+        dna = str(feat_seq)
+        hashlib.md5(str(feat_seq).encode('utf8')).hexdigest()
+        len(dna)
+
+
+def new_way(seq, features):
+    contig = str(seq).upper().encode('ascii')
+    for start, end, minus in features:
+        seq_bytes = extract_sequence(contig, start, end, reverse_complement=minus)
+        dna = seq_bytes.decode('ascii')
+        sequence_md5(seq_bytes)
+        len(dna)
+
+
+def check(seq, features):
+    contig = str(seq).upper().encode('ascii')
+    for start, end, minus in features:
+        feat_seq = seq[start:end].upper()
+        if minus:
+            feat_seq = feat_seq.reverse_complement()
+        assert str(feat_seq) == extract_sequence(contig, start, end, minus).decode('ascii')
+
+
+def main():
+    for name, loader in (('Arabidopsis_gbff', arabidopsis_features), ('e_coli', e_coli_features)):
+        seq, features = loader()
+        check(seq, features)
+        timings = {}
+        for label, func in (('Bio.Seq', old_way), ('bytes', new_way)):
+            start = time.time()
+            for _ in range(REPEATS):
+                func(seq, features)
+            timings[label] = (time.time() - start) / (REPEATS * len(features))
+        print(f"{name}: {len(features)} feature parts on {len(seq)} bp")
+        for label, per_feature in timings.items():
+            print(f"    {label:8} {per_feature * 1e6:8.2f} us/feature")
+        print(f"    speedup  {timings['Bio.Seq'] / timings['bytes']:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
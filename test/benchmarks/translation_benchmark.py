@@ -0,0 +1,45 @@
+"""
+Measures CDS translation throughput of SequenceUtils.iter_translate_cdss for increasing numbers
+of worker processes, as used for the translation-workers setting of the FASTA/GFF importer.
+
+CDSs are random open reading frames with lengths typical of bacterial genes.
+
+Run from the test directory:
+    PYTHONPATH=../lib python benchmarks/translation_benchmark.py
+"""
+import os
+import random
+import time
+
+from GenomeFileUtil.core.SequenceUtils import iter_translate_cdss, translate_cdss
+
+NUM_CDSS = 200000
+CODONS = [a + b + c for a in 'ACGT' for b in 'ACGT' for c in 'ACGT'
+          if a + b + c not in ('TAA', 'TAG', 'TGA')]
+
+
+def random_cdss(seed=3):
+    rand = random.Random(seed)
+    return ['ATG' + ''.join(rand.choices(CODONS, k=rand.randint(100, 500))) + 'TAA'
+            for _ in range(NUM_CDSS)]
+
+
+def main():
+    cdss = random_cdss()
+    bases = sum(map(len, cdss))
+    expected = translate_cdss(cdss[:1000])
+    print(f"{NUM_CDSS} CDSs, {bases} bp")
+    worker_counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    baseline = None
+    for workers in worker_counts:
+        start = time.time()
+        proteins = list(iter_translate_cdss(cdss, 11, workers))
+        elapsed = time.time() - start
+        assert proteins[:1000] == expected
+        baseline = baseline or elapsed
+        print(f"    {workers:3} workers {bases / elapsed / 1e6:8.1f} Mbp/s"
+              f"  {baseline / elapsed:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from GenomeFileUtil.core import AssemblySequences as AS
+from GenomeFileUtil.core.AssemblySequences import (
+    AssemblySequences, features_missing_sequence, location_sequence
+)
+from GenomeFileUtil.core.FastaIndex import FastaIndex
+
+FASTA = ">contig_1 first\nACGTACGTAA\nCCGGTTAACC\nGG\n>contig_2\nttttgggccc\n"
+CONTIG_1 = "ACGTACGTAACCGGTTAACCGG"
+GENOME = {
+    'id': 'genome',
+    'features': [{'id': 'gene_1', 'location': [['contig_1', 3, '+', 5]]},
+                 {'id': 'gene_2', 'location': [['contig_1', 12, '-', 4]],
+                  'dna_sequence': 'KEEP', 'dna_sequence_length': 4}],
+    'cdss': [{'id': 'gene_1', 'location': [['contig_1', 21, '+', 2], ['contig_2', 3, '-', 3]]}],
+    'mrnas': [{'id': 'mrna', 'location': [['contig_1', 12, '-', 4]], 'dna_sequence': ''}],
+    'non_coding_features': [{'id': 'nc', 'location': [['contig_3', 1, '+', 1]]},
+                            {'id': 'no_location', 'location': []}],
+}
+
+
+class AssemblySequencesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.fasta = os.path.join(self.dir, 'assembly.fa')
+        with open(self.fasta, 'w') as f:
+            f.write(FASTA)
+        AS._assemblies.clear()
+
+    def tearDown(self):
+        FastaIndex(self.fasta, []).close()
+        AS._assemblies.clear()
+        shutil.rmtree(self.dir)
+
+    def test_location_sequence(self):
+        contigs = {c.record.name: c for c in FastaIndex.build(self.fasta)}
+        self.assertEqual(location_sequence(contigs, [['contig_1', 1, '+', 4]]), 'ACGT')
+        self.assertEqual(location_sequence(contigs, [['contig_1', 12, '-', 4]]), 'GGTT')
+        self.assertEqual(location_sequence(contigs, [['contig_1', 21, '+', 2],
+                                                     ['contig_2', 3, '-', 3]]), 'GGAAA')
+        self.assertIsNone(location_sequence(contigs, [['contig_1', 1, '+', 4],
+                                                      ['contig_3', 1, '+', 1]]))
+        # segments ending on either end of the contig
+        self.assertEqual(location_sequence(contigs, [['contig_1', 1, '+', 22]]), CONTIG_1)
+        self.assertEqual(location_sequence(contigs, [['contig_2', 10, '-', 10]]), 'GGGCCCAAAA')
+        for segment in (['contig_1', 0, '+', 2], ['contig_1', 20, '+', 4],
+                        ['contig_2', 3, '-', 4], ['contig_2', 11, '-', 2]):
+            with self.assertRaisesRegex(ValueError, 'is outside contig'):
+                location_sequence(contigs, [['contig_1', 1, '+', 4], segment])
+
+    def check_filled(self, genome):
+        self.assertEqual(genome['features'][0]['dna_sequence'], CONTIG_1[2:7])
+        self.assertEqual(genome['features'][0]['dna_sequence_length'], 5)
+        self.assertEqual(genome['features'][1]['dna_sequence'], 'KEEP')
+        self.assertEqual(genome['cdss'][0]['dna_sequence'], 'GGAAA')
+        self.assertEqual(genome['mrnas'][0]['dna_sequence'], 'GGTT')
+        self.assertNotIn('dna_sequence', genome['non_coding_features'][0])
+        self.assertNotIn('dna_sequence', genome['non_coding_features'][1])
+
+    @mock.patch.object(AS, 'AssemblyUtil')
+    def test_fill_from_assembly(self, assembly_util):
+        assembly_util.return_value.get_assembly_as_fasta.return_value = {'path': self.fasta}
+        for workers, chunk_size in ((1, AS.BACKFILL_CHUNK_SIZE), (3, 1)):
+            genome = dict(copy.deepcopy(GENOME), assembly_ref='1/2/3')
+            sequences = AssemblySequences('callback', 'wizard', 'token', workers, chunk_size)
+            self.assertEqual(sequences.fill(genome), 3)
+            self.check_filled(genome)
+        # the FASTA is fetched once per assembly
+        assembly_util.return_value.get_assembly_as_fasta.assert_called_once_with(
+            {'ref': '1/2/3'})
+
+    @mock.patch.object(AS, 'AssemblySequenceAPI')
+    def test_fill_from_contigset(self, api):
+        contigs = {c.record.name: c for c in FastaIndex.build(self.fasta)}
+
+        def get_dna_sequences(params):
+            self.assertEqual(params['contigset_ref'], '4/5/6')
+            return {'dna_sequences': {key: location_sequence(contigs, location)
+                                      for key, location in params['requested_features'].items()
+                                      if location[0][0] != 'contig_3'}}
+
+        api.return_value.get_dna_sequences.side_effect = get_dna_sequences
+        genome = dict(copy.deepcopy(GENOME), contigset_ref='4/5/6')
+        sequences = AssemblySequences('callback', 'wizard', 'token', chunk_size=2)
+        self.assertEqual(sequences.fill(genome), 3)
+        self.check_filled(genome)
+        self.assertEqual(api.return_value.get_dna_sequences.call_count, 2)
+
+    @mock.patch.object(AS, 'AssemblyUtil')
+    def test_outside_contig(self, assembly_util):
+        assembly_util.return_value.get_assembly_as_fasta.return_value = {'path': self.fasta}
+        genome = {'assembly_ref': '1/2/3',
+                  'features': [{'id': 'past_end', 'location': [['contig_1', 20, '+', 5]],
+                                'warnings': ['earlier']},
+                               {'id': 'gene', 'location': [['contig_1', 3, '+', 5]]}],
+                  'cdss': [{'id': 'before_start', 'location': [['contig_2', 3, '-', 4]]}]}
+        sequences = AssemblySequences('callback', 'wizard', 'token')
+        self.assertEqual(sequences.fill(genome), 1)
+        past_end, gene = genome['features']
+        before_start = genome['cdss'][0]
+        self.assertEqual(gene['dna_sequence'], CONTIG_1[2:7])
+        self.assertNotIn('warnings', gene)
+        for feature in (past_end, before_start):
+            self.assertNotIn('dna_sequence', feature)
+            self.assertIn('is outside contig', feature['warnings'][-1])
+        self.assertEqual(len(before_start['warnings']), 1)
+        self.assertEqual(past_end['warnings'][0], 'earlier')
+
+    @mock.patch.object(AS, 'AssemblyUtil')
+    def test_long_misc_feature(self, assembly_util):
+        with open(self.fasta, 'w') as f:
+            f.write(">contig_1\n" + "ACGT" * 4000 + "\n")
+        assembly_util.return_value.get_assembly_as_fasta.return_value = {'path': self.fasta}
+        # the importers drop the dna_sequence of misc features over MAX_MISC_FEATURE_SIZE
+        misc = {'id': 'misc', 'type': 'misc_feature', 'location': [['contig_1', 1, '+', 12000]],
+                'dna_sequence_length': 12000}
+        short = {'id': 'short', 'location': [['contig_1', 1, '+', 8]]}
+        genome = {'assembly_ref': '1/2/3', 'non_coding_features': [copy.deepcopy(misc), short]}
+        self.assertEqual(features_missing_sequence(genome), [short])
+        sequences = AssemblySequences('callback', 'wizard', 'token')
+        self.assertEqual(sequences.fill(genome), 1)
+        self.assertEqual(genome['non_coding_features'][0], misc)
+        self.assertEqual(short['dna_sequence'], 'ACGTACGT')
+        self.assertEqual(features_missing_sequence(genome), [])
+
+    def test_nothing_to_fill(self):
+        sequences = AssemblySequences('callback', 'wizard', 'token')
+        genome = copy.deepcopy(GENOME)
+        self.assertEqual(sequences.fill(genome), 0)
+        self.assertEqual(genome, GENOME)
+        self.assertEqual(sequences.fill({'missing_features': 'features'}), 0)
@@ -0,0 +1,42 @@
+import json
+import unittest
+
+import Bio.SeqIO
+
+from GenomeFileUtil.core.AssemblyStats import AssemblyStats
+from GenomeFileUtil.core.SequenceUtils import sequence_md5
+
+
+class AssemblyStatsTest(unittest.TestCase):
+
+    def test_matches_assembly_util(self):
+        # test_genome.json was imported from this file, with the assembly values computed and
+        # stored by AssemblyUtil
+        with open('data/test_genome.json') as f:
+            expected = json.load(f)
+        stats = AssemblyStats()
+        with open('data/Arabidopsis_gbff/Arab_Chloro_Modified.gbff') as f:
+            for record in Bio.SeqIO.parse(f, 'genbank'):
+                stats.add(record.id, record.seq)
+        data = stats.assembly_data()
+        self.assertEqual(data['gc_content'], expected['gc_content'])
+        self.assertEqual(data['dna_size'], expected['dna_size'])
+        self.assertEqual(data['md5'], expected['md5'])
+        self.assertEqual([c['length'] for c in data['contigs'].values()],
+                         expected['contig_lengths'])
+
+    def test_contigs(self):
+        stats = AssemblyStats()
+        stats.add('b', 'acgtNN')
+        stats.add('a', b'GGCC')
+        data = stats.assembly_data()
+        self.assertEqual(list(data['contigs']), ['a', 'b'])
+        self.assertEqual(data['contigs']['b'], {
+            'contig_id': 'b', 'length': 6, 'md5': sequence_md5('ACGTNN'), 'gc_content': 0.33333})
+        self.assertEqual(data['gc_content'], 0.6)
+        self.assertEqual(data['dna_size'], 10)
+        self.assertEqual(data['num_contigs'], 2)
+        self.assertEqual(data['md5'], sequence_md5(
+            ','.join(sorted([sequence_md5('ACGTNN'), sequence_md5('GGCC')]))))
+        with self.assertRaisesRegex(ValueError, "appears more than once"):
+            stats.add('a', 'A')
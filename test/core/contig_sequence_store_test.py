@@ -0,0 +1,56 @@
+import hashlib
+import os
+import tempfile
+import unittest
+
+from Bio.Seq import Seq
+
+from GenomeFileUtil.core.ContigSequenceStore import ContigSequenceStore
+
+
+class ContigSequenceStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'contigs.bin')
+        self.store = ContigSequenceStore(self.path)
+        self.contigs = {
+            'contig_1': 'ATGCGTacgtNNRYKMBVDHswTTAGC',
+            'contig_2': '',
+            'contig_3': 'GGGCCCAAATTT' * 50,
+        }
+        for contig_id, seq in self.contigs.items():
+            self.store.add(contig_id, Seq(seq))
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_slices_match_seq(self):
+        for contig_id, seq in self.contigs.items():
+            upper = Seq(seq).upper()
+            for start, end in ((0, None), (3, 10), (5, 5), (20, 1000), (1000, 2000)):
+                self.assertEqual(self.store.get_sequence(contig_id, start, end),
+                                 str(upper[start:end]))
+                self.assertEqual(
+                    self.store.get_sequence(contig_id, start, end, reverse_complement=True),
+                    str(upper[start:end].reverse_complement()))
+
+    def test_reads_interleaved_with_adds(self):
+        self.assertEqual(self.store.get_sequence('contig_1', 0, 3), 'ATG')
+        self.store.add('contig_4', 'ttaacc')
+        self.assertEqual(self.store.get_sequence('contig_4', 2, 6, True), 'GGTT')
+        self.assertIn('contig_4', self.store)
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store.contig_length('contig_4'), 6)
+
+    def test_md5(self):
+        for contig_id, seq in self.contigs.items():
+            self.assertEqual(self.store.md5(contig_id),
+                             hashlib.md5(seq.upper().encode('utf8')).hexdigest())
+
+    def test_missing_contig(self):
+        with self.assertRaises(KeyError):
+            self.store.get_sequence('not_a_contig', 0, 10)
+
+    def test_close_removes_file(self):
+        self.store.close()
+        self.assertFalse(os.path.exists(self.path))
@@ -0,0 +1,86 @@
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import Bio.SeqIO
+
+from GenomeFileUtil.core import FastaIndex as fasta_index_module
+from GenomeFileUtil.core.FastaIndex import FastaIndex
+
+ODD_FASTA = (
+    ">crlf first contig\r\nACGTAC\r\nGTacgt\r\nAC\r\n"
+    ">ragged\nACGTACGT\nACG\nACGTAC\n"
+    ">blank_lines\nACGT\n\nACGT\n\n\n"
+    ">spaces\nAC GT \nACGT\t\nAC\n"
+    ">empty\n"
+    ">\nNNNN\n"
+    ">last no newline\nacgtnACGTN\nAC"
+)
+
+
+class FastaIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check_matches_bio(self, path):
+        index = FastaIndex.build(path)
+        records = list(Bio.SeqIO.parse(path, 'fasta'))
+        self.assertEqual([c.record.name for c in index], [r.id for r in records])
+        rand = random.Random(3)
+        for contig, record in zip(index, records):
+            seq = str(record.seq).upper().encode()
+            self.assertEqual(len(contig), len(seq))
+            self.assertEqual(contig.get_bytes(), seq)
+            for _ in range(20):
+                start = rand.randint(0, len(seq))
+                end = rand.randint(start, len(seq) + 5)
+                self.assertEqual(contig[start:end], seq[start:end])
+        index.close()
+        return index
+
+    def test_test_data(self):
+        for path in ('data/wigglesworthia/genome.fasta',
+                     'data/fasta_gff/RefSeq/Red_Algae/RedAlgaeModified.fna',
+                     'data/metagenomes/toy/metagenome.fa'):
+            index = self.check_matches_bio(path)
+            self.assertTrue(all(r.line_bases for r in index.records))
+
+    def test_odd_layouts(self):
+        path = os.path.join(self.dir, 'odd.fa')
+        with open(path, 'w', newline='') as f:
+            f.write(ODD_FASTA)
+        index = self.check_matches_bio(path)
+        layouts = {r.name: (r.line_bases, r.line_width) for r in index.records}
+        self.assertEqual(layouts['crlf'], (6, 8))
+        self.assertEqual(layouts['last'], (10, 11))
+        for name in ('ragged', 'blank_lines', 'spaces'):
+            self.assertEqual(layouts[name][0], 0)
+
+    def test_ragged_cleaned_once(self):
+        path = os.path.join(self.dir, 'ragged.fa')
+        with open(path, 'w') as f:
+            f.write(">ragged\nACGTACGT\nacg\nACGTAC\n")
+        contig = next(iter(FastaIndex.build(path)))
+        with mock.patch.object(fasta_index_module, '_clean',
+                               wraps=fasta_index_module._clean) as clean:
+            self.assertEqual([contig[i:i + 3] for i in range(0, 15, 5)],
+                             [b'ACG', b'CGT', b'GAC'])
+            self.assertEqual(clean.call_count, 1)
+        self.assertEqual(pickle.loads(pickle.dumps(contig))[5:10], b'CGTAC')
+        FastaIndex(path, []).close()
+
+    def test_pickle(self):
+        path = os.path.join(self.dir, 'genome.fasta')
+        shutil.copy('data/wigglesworthia/genome.fasta', path)
+        index = FastaIndex.build(path)
+        contig = next(iter(index))
+        self.assertEqual(pickle.loads(pickle.dumps(contig))[100:200], contig[100:200])
+        index.close()
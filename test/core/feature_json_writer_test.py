@@ -0,0 +1,42 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from GenomeFileUtil.core.FeatureJsonWriter import FeatureJsonWriter
+
+
+class FeatureJsonWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'features.json.gz')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_lists_in_genome_order(self):
+        writer = FeatureJsonWriter(self.path)
+        writer.add('non_coding_features', {'id': 'trna1', 'type': 'tRNA'})
+        writer.add('cdss', {'id': 'g1.CDS', 'type': 'CDS'})
+        writer.add('features', {'id': 'g1', 'type': 'gene'})
+        writer.add('cdss', {'id': 'g2.CDS', 'type': 'CDS'})
+        writer.add('features', {'id': 'g2', 'type': 'gene'})
+        self.assertEqual(writer.close(), self.path)
+        self.assertEqual(os.listdir(self.dir), ['features.json.gz'])
+        features = [{'id': 'g1', 'type': 'gene'}, {'id': 'g2', 'type': 'gene'},
+                    {'id': 'g1.CDS', 'type': 'CDS'}, {'id': 'g2.CDS', 'type': 'CDS'},
+                    {'id': 'trna1', 'type': 'tRNA'}]
+        with gzip.open(self.path, 'rt') as f:
+            self.assertEqual(f.read(), json.dumps(features))
+        self.assertEqual(writer.num_features, 5)
+        self.assertEqual(writer.counts['mrnas'], 0)
+
+    def test_empty(self):
+        writer = FeatureJsonWriter(self.path)
+        writer.close()
+        with gzip.open(self.path, 'rt') as f:
+            self.assertEqual(json.load(f), [])
+        self.assertEqual(writer.num_features, 0)
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest import mock
+
+import Bio.SeqIO
+from Bio.SeqFeature import FeatureLocation, SeqFeature
+
+from GenomeFileUtil.core import GenbankToGenome as gtg
+from GenomeFileUtil.core.GenbankToGenome import (
+    _find_record_shards, _genbank_record_ids, _parse_genbank_shard
+)
+
+
+class GenbankShardTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = os.path.join(tempfile.mkdtemp(), 'multi.gbff')
+        with open(cls.path, 'w') as out:
+            for f in ('data/minimal.gbff', 'data/duplication.gbff', 'data/minimal.gbff'):
+                with open(f) as gbff:
+                    out.write(gbff.read().rstrip('\n') + '\n')
+        cls.serial = list(Bio.SeqIO.parse(cls.path, 'genbank'))
+
+    def _check_shards(self, shard_size):
+        shards = _find_record_shards(self.path, shard_size)
+        self.assertEqual(shards[0][0], 0)
+        self.assertEqual(shards[-1][1], os.path.getsize(self.path))
+        for (_, end), (start, _) in zip(shards, shards[1:]):
+            self.assertEqual(end, start)
+        records = [rec for shard in shards for rec in _parse_genbank_shard(self.path, *shard)]
+        self.assertEqual([r.id for r in records], [r.id for r in self.serial])
+        self.assertEqual([str(r.seq) for r in records], [str(r.seq) for r in self.serial])
+        self.assertEqual([len(r.features) for r in records],
+                         [len(r.features) for r in self.serial])
+        return shards
+
+    def test_one_record_per_shard(self):
+        self.assertEqual(len(self._check_shards(1)), 3)
+
+    def test_single_shard(self):
+        self.assertEqual(len(self._check_shards(2 ** 25)), 1)
+
+    def test_record_ids(self):
+        self.assertTrue({r.id for r in self.serial} <= _genbank_record_ids(self.path))
+
+    def test_contig_refs_loaded(self):
+        config = SimpleNamespace(callbackURL='https://callback', workspaceURL='https://ws',
+                                 re_api_url=None, raw=defaultdict(str))
+        with mock.patch.object(gtg, 'GenomeInterface'), \
+                mock.patch.object(gtg, 'DataFileUtil'), mock.patch.object(gtg, 'AssemblyUtil'), \
+                mock.patch.object(gtg, 'Workspace'):
+            importer = gtg.GenbankToGenome(config)
+        contig_id = self.serial[0].id
+        importer.contig_seq = set()
+        record = mock.Mock(features=[SeqFeature(FeatureLocation(0, 10, ref=contig_id))])
+        # a record trans-spliced from a contig further on in the file waits for it
+        self.assertFalse(importer._contig_refs_loaded(record, self.path))
+        importer.contig_seq.add(contig_id)
+        self.assertTrue(importer._contig_refs_loaded(record, self.path))
+        # but not for a contig the file doesn't have
+        record.features.append(SeqFeature(FeatureLocation(0, 10, ref='NOT_IN_FILE.1')))
+        self.assertTrue(importer._contig_refs_loaded(record, self.path))
@@ -0,0 +1,37 @@
+import unittest
+
+from GenomeFileUtil.core.GeneIntervalIndex import GeneIntervalIndex
+
+
+class GeneIntervalIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = GeneIntervalIndex()
+        self.index.add('outer', [["A", 100, "+", 1000]])
+        self.index.add('inner', [["A", 300, "+", 200]])
+        self.index.add('minus', [["A", 900, "-", 500]])
+        self.index.add('split', [["A", 2000, "+", 100], ["A", 3000, "+", 100]])
+        self.index.add('other_contig', [["B", 100, "+", 1000]])
+
+    def test_containing(self):
+        # most recently added first
+        self.assertEqual(self.index.containing([["A", 350, "+", 50]]), ['inner', 'outer'])
+        self.assertEqual(self.index.containing([["A", 150, "+", 50]]), ['outer'])
+        self.assertEqual(self.index.containing([["B", 150, "+", 50]]), ['other_contig'])
+
+    def test_strand(self):
+        self.assertEqual(self.index.containing([["A", 800, "-", 100]]), ['minus'])
+        self.assertEqual(self.index.containing([["A", 800, "+", 100]]), ['outer'])
+
+    def test_boundaries(self):
+        self.assertEqual(self.index.containing([["A", 100, "+", 1000]]), ['outer'])
+        self.assertEqual(self.index.containing([["A", 100, "+", 1001]]), [])
+        self.assertEqual(self.index.containing([["A", 99, "+", 10]]), [])
+
+    def test_multi_part_genes(self):
+        self.assertEqual(self.index.containing([["A", 3010, "+", 20]]), ['split'])
+        self.assertEqual(self.index.containing([["A", 2500, "+", 20]]), [])
+
+    def test_missing_contig(self):
+        self.assertEqual(self.index.containing([["C", 10, "+", 20]]), [])
+        self.assertEqual(len(self.index), 5)
@@ -0,0 +1,54 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from GenomeFileUtil.core import GenomeJsonWriter
+from GenomeFileUtil.core.GenomeJsonWriter import write_genome_json
+from GenomeFileUtil.core.GenomeUtils import sort_dict
+
+ODD_GENOME = {
+    'z_last': 1, 'id': 'odd', 'gc_content': 0.50123456789, 'dna_size': 2 ** 70,
+    'warnings': ['café', 'tab\there', 'quote " and \\'], 'taxonomy': None, 'suspect': True,
+    'contig_ids': ('c2', 'c1'), 'empty': [], 'ontologies_present': {'GO': {}},
+    'features': [{'id': 'g1', 'location': [['c1', 1, '+', 9]], 'functions': ['ß'],
+                  'ontology_terms': {'GO': {'GO:2': [1], 'GO:1': [0]}}, 'aliases': [],
+                  'dna_sequence': 'ATG'}, {}],
+}
+
+
+class GenomeJsonWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def check_same_as_json_dump(self, genome):
+        expected_path = os.path.join(self.dir, 'expected.json')
+        with open(expected_path, 'w') as f:
+            json.dump(sort_dict(genome), f)
+        path = write_genome_json(genome, os.path.join(self.dir, 'genome.json'))
+        with open(expected_path, 'rb') as expected, open(path, 'rb') as written:
+            self.assertEqual(written.read(), expected.read())
+
+    def test_same_as_json_dump(self):
+        with open('data/test_genome.json') as f:
+            self.check_same_as_json_dump(json.load(f))
+        self.check_same_as_json_dump(ODD_GENOME)
+        self.check_same_as_json_dump({})
+
+    def test_orjson(self):
+        if GenomeJsonWriter.orjson is None:
+            self.skipTest('orjson is not installed')
+        for genome in (ODD_GENOME, json.load(open('data/test_genome.json'))):
+            path = write_genome_json(genome, os.path.join(self.dir, 'genome.json'), 'orjson')
+            with open(path, 'rb') as f:
+                self.assertEqual(json.loads(f.read().decode('utf-8')),
+                                 json.loads(json.dumps(genome)))
+
+    def test_bad_encoder(self):
+        with self.assertRaisesRegex(ValueError, 'Unknown JSON encoder'):
+            write_genome_json({}, os.path.join(self.dir, 'genome.json'), 'pickle')
@@ -0,0 +1,90 @@
+import copy
+import json
+import unittest
+from unittest import mock
+
+from GenomeFileUtil.core import GenomeInterface as GI
+from GenomeFileUtil.core.GenomeSize import FEATURE_LISTS, GenomeSize, feature_size
+from GenomeFileUtil.core.Md5Stage import PendingMd5, placeholder_json
+from GenomeFileUtil.core.SequenceUtils import sequence_md5
+
+GENOME = {
+    'id': 'genome', 'scientific_name': 'Escherichia coli "K-12"', 'dna_size': 42,
+    'gc_content': 0.5, 'warnings': ['café', 'tab\there'], 'taxonomy': None,
+    'features': [
+        {'id': 'g1', 'location': [['c1', 1, '+', 9]], 'dna_sequence': 'ATGAAATAA',
+         'functions': ['hypothetical protein']},
+        {'dna_sequence': 'ATG'},
+        {'id': 'g2', 'flags': [], 'note': 'snø \\ "quoted"'},
+    ],
+    'cdss': [{'id': 'g1_CDS', 'dna_sequence': 'ATGNNN-*', 'protein_translation': 'MK'}],
+    'mrnas': [],
+}
+
+
+class GenomeSizeTest(unittest.TestCase):
+
+    def test_exact(self):
+        genome = copy.deepcopy(GENOME)
+        size = GenomeSize(genome)
+        self.assertEqual(size.total, len(json.dumps(genome)))
+        for name in ('features', 'cdss', 'mrnas'):
+            self.assertEqual(size.list_size(name), len(json.dumps(genome[name])))
+        self.assertEqual(size.list_size('non_coding_features'), 2)
+
+        for name in ('mrnas', 'features', 'non_coding_features', 'cdss'):
+            for feature in genome.get(name, []):
+                feature.pop('dna_sequence', None)
+            size.dna_sequences_removed(name)
+            self.assertEqual(size.total, len(json.dumps(genome)))
+        self.assertEqual(sum(size.dna_sizes.values()), 0)
+
+    def test_feature(self):
+        feature = {'id': 'x', 'dna_sequence': 'café'}
+        self.assertEqual(feature_size(feature), (len(json.dumps(feature)),
+                                                 len(', "dna_sequence": "caf\\u00e9"')))
+
+    def test_incremental(self):
+        size = GenomeSize()
+        for name in ('features', 'cdss'):
+            for feature in GENOME[name]:
+                size.add(name, feature)
+        expected = {name: GENOME[name] for name in ('features', 'cdss')}
+        self.assertEqual(size.list_sizes, {name: len(json.dumps(features))
+                                           for name, features in expected.items()})
+        without_dna = sum(len(json.dumps([{k: v for k, v in f.items() if k != 'dna_sequence'}
+                                          for f in features]))
+                          for features in expected.values())
+        self.assertEqual(sum(size.list_sizes.values()) - sum(size.dna_sizes.values()),
+                         without_dna)
+
+    def test_features_then_rest(self):
+        genome = copy.deepcopy(GENOME)
+        pending = PendingMd5('ATGAAATAA')
+        genome['features'][0]['md5'] = pending
+        size = GenomeSize(default=placeholder_json)
+        for name in FEATURE_LISTS:
+            for feature in genome.get(name, []):
+                size.add(name, feature)
+        # the features were measured before their md5s were resolved
+        pending.digest = sequence_md5(pending.data)
+        genome['features'][0]['md5'] = pending.digest
+        size.measure_other(genome)
+        self.assertEqual(size.total, len(json.dumps(genome)))
+        with self.assertRaises(TypeError):
+            placeholder_json(object())
+
+    def test_handle_large_genomes_measured(self):
+        genome = copy.deepcopy(GENOME)
+        size = GenomeSize()
+        for name in FEATURE_LISTS:
+            for feature in genome.get(name, []):
+                size.add(name, feature)
+        without_dna = len(json.dumps(genome)) - sum(size.dna_sizes.values())
+        # the features are not measured again
+        with mock.patch.object(GI, 'MAX_GENOME_SIZE', without_dna), \
+                mock.patch.object(GI, 'GenomeSize', side_effect=AssertionError):
+            GI.GenomeInterface.handle_large_genomes(genome, size)
+        self.assertFalse(any('dna_sequence' in feature for name in FEATURE_LISTS
+                             for feature in genome.get(name, [])))
+        self.assertEqual(size.total, len(json.dumps(genome)))
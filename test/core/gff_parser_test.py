@@ -0,0 +1,174 @@
+import gzip
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from GenomeFileUtil.core.GffParser import (
+    GffRecord, feature_links, gtf_hierarchy, is_gtf_file, is_gtf_line, iter_gff_lines,
+    make_snake_case, parents_first, parse_attributes, parse_gff_line, read_gff
+)
+
+
+class GffParserTest(unittest.TestCase):
+
+    def test_snake_case(self):
+        self.assertEqual(make_snake_case('Ontology_term'), 'ontology_term')
+        self.assertEqual(make_snake_case('ID'), 'id')
+        self.assertEqual(make_snake_case('transcriptId'), 'transcript_id')
+        self.assertEqual(make_snake_case('PACid'), 'pa_cid')
+
+    def test_gff3_attributes(self):
+        self.assertEqual(
+            parse_attributes('ID=cds0;Parent=rna0;Dbxref=GO:1,GeneID:2;Dbxref=x;'
+                             'Note=a%3Bb=c; ;product="50S"\n'),
+            {'id': ['cds0'], 'parent': ['rna0'], 'dbxref': ['GO:1,GeneID:2', 'x'],
+             'note': ['a;b=c'], 'product': ['50S']})
+
+    def test_gtf_attributes(self):
+        self.assertEqual(
+            parse_attributes('gene_id "g1"; transcript_id "t1"; exon_number "1"; lonely;'),
+            {'gene_id': ['g1'], 'transcript_id': ['t1'], 'exon_number': ['1']})
+
+    def test_line(self):
+        for line in ('', '\n', '  \t\n', '##gff-version 3\n'):
+            self.assertIsNone(parse_gff_line(line))
+        ftr = parse_gff_line('chr1\tRefSeq\tCDS\t10\t99\t.\t-\t0\tID=c1;Parent=g1\n')
+        self.assertEqual(ftr, {
+            'contig': 'chr1', 'source': 'RefSeq', 'type': 'CDS', 'start': 10, 'end': 99,
+            'score': '.', 'strand': '-', 'phase': '0',
+            'attributes': {'id': ['c1'], 'parent': ['g1']}, 'ID': 'c1', 'Parent': 'g1'})
+        with self.assertRaisesRegex(ValueError, "unable to parse"):
+            parse_gff_line('chr1\tRefSeq\tCDS\t10\t99\n')
+
+    def test_feature_links(self):
+        for attributes in ('ID=c%3B1;Parent=g1;product=x', ' Parent = g1 ; ID=c%3B1;ID=c2\n',
+                           'id "c;1"; parent "g1"'):
+            ftr = parse_gff_line(f'chr1\tRefSeq\tCDS\t10\t99\t.\t-\t0\t{attributes}')
+            self.assertEqual(feature_links(attributes), (ftr.get('ID'), ftr.get('Parent')))
+        self.assertEqual(feature_links('ID=c%3B1;Parent=g1'), ('c;1', 'g1'))
+        self.assertEqual(feature_links('gene_id "g1"; transcript_id "t1";'), (None, None))
+
+    def test_record(self):
+        ftr = parse_gff_line('chr1\tRefSeq\tgene\t10\t99\t.\t+\t.\tID=g1;product=x\n')
+        other = parse_gff_line('chr1\tRefSeq\tCDS\t10\t99\t.\t+\t0\tID=c1;product=x\n')
+        self.assertIsInstance(ftr, GffRecord)
+        self.assertIs(ftr['contig'], other['contig'])
+        self.assertIs(ftr['attributes']['product'][0], other['attributes']['product'][0])
+        self.assertNotIn('Parent', ftr)
+        self.assertNotIn('keys', ftr)
+        self.assertIsNone(ftr.get('Parent'))
+        self.assertEqual(ftr.get('Parent', ''), '')
+        with self.assertRaises(KeyError):
+            ftr['Parent']
+        with self.assertRaises(KeyError):
+            ftr['note'] = 'x'
+        ftr['Parent'] = 'g0'
+        self.assertEqual(ftr['Parent'], 'g0')
+        self.assertEqual(repr(ftr), repr(dict(ftr.items())))
+        self.assertEqual(pickle.loads(pickle.dumps(ftr)), ftr)
+        copied = ftr.copy()
+        copied['type'] = 'mRNA'
+        self.assertEqual(ftr['type'], 'gene')
+        self.assertIs(copied['attributes'], ftr['attributes'])
+
+    def test_chunked(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'x.gff.gz')
+            with open('data/fasta_gff/RefSeq/Bacterial_Data/NC_021490.gff', 'rb') as f_in, \
+                    gzip.open(path, 'wb') as f_out:
+                f_out.write(f_in.read())
+            expected = list(read_gff(path))
+            self.assertTrue(expected)
+            for chunk_size in (1, 7, 4096):
+                self.assertEqual(list(read_gff(path, chunk_size)), expected)
+            self.assertEqual([line.rstrip('\n') for line in iter_gff_lines(path)],
+                             list(iter_gff_lines(path, 100)))
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_parents_first(self):
+        def ftr(feat_id, parent_id=None):
+            ftr = {'ID': feat_id}
+            if parent_id:
+                ftr['Parent'] = parent_id
+            return ftr
+
+        features = [ftr('g1'), ftr('m1', 'g1'), ftr('c1', 'm1'), ftr('c1', 'm1')]
+        self.assertIs(parents_first(features), features)
+
+        features = [ftr('c1', 'm1'), ftr('e1', 'm1'), ftr('c1', 'm1'), ftr('g2'),
+                    ftr('x', 'missing'), ftr('m1', 'g1'), ftr('m1.utr', 'm1'), ftr('g1'),
+                    ftr('m2', 'g2')]
+        self.assertEqual([(f['ID'], f.get('Parent')) for f in parents_first(features)],
+                         [('g2', None), ('x', 'missing'), ('g1', None), ('m1', 'g1'),
+                          ('c1', 'm1'), ('e1', 'm1'), ('c1', 'm1'), ('m1.utr', 'm1'),
+                          ('m2', 'g2')])
+
+        # parents on another contig are not waited for
+        features = [ftr('a'), ftr('m2', 'other_contig_gene'), ftr('c3', 'm3'), ftr('m3', 'a')]
+        self.assertEqual([f['ID'] for f in parents_first(features)], ['a', 'm2', 'm3', 'c3'])
+        features = features[:2]
+        self.assertIs(parents_first(features), features)
+        # a cycle is left last
+        features = [ftr('p', 'q'), ftr('g1'), ftr('q', 'p')]
+        self.assertEqual([f['ID'] for f in parents_first(features)], ['g1', 'p', 'q'])
+
+    def test_is_gtf(self):
+        line = 'chr1\tensembl\t{}\t1\t90\t.\t+\t.\t{}\n'.format
+        self.assertTrue(is_gtf_line(line('gene', 'gene_id "g1"; gene_name "x y";')))
+        self.assertTrue(is_gtf_line(line('transcript', ' gene_id "g1"; level 2;')))
+        self.assertTrue(is_gtf_line(line('exon', 'gene_id g1; transcript_id t1')))
+        self.assertFalse(is_gtf_line(line('gene', 'ID=g1;Name=x y')))
+        self.assertFalse(is_gtf_line(line('CDS', 'gene_id=g1;transcript_id=t1')))
+        self.assertFalse(is_gtf_line(line('CDS', 'gene_id "g1"; Parent=t1')))
+        self.assertFalse(is_gtf_line(line('region', '.')))
+        self.assertFalse(is_gtf_line('chr1\tensembl\tgene\t1\t90\n'))
+
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, 'genes.gtf')
+            with open(path, 'w') as f:
+                f.write('#!genome-build x\n\n' + line('gene', 'gene_id "g1";')
+                        + line('exon', 'gene_id "g1"; transcript_id "t1";'))
+            self.assertTrue(is_gtf_file(path))
+            self.assertTrue(is_gtf_file('data/rhodobacter.gtf', 64))
+            self.assertFalse(is_gtf_file('data/wigglesworthia/genome.gff3'))
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_gtf_hierarchy(self):
+        def gtf(feature_type, start, end, strand, gene_id, transcript_id=None):
+            attributes = f'gene_id "{gene_id}";'
+            if transcript_id is not None:
+                attributes += f' transcript_id "{transcript_id}";'
+            return parse_gff_line(
+                f"chr1\tsrc\t{feature_type}\t{start}\t{end}\t.\t{strand}\t0\t{attributes}")
+
+        features = [gtf('exon', 1, 50, '+', '', ''),
+                    gtf('5UTR', 100, 109, '+', 'g1', 't1'),
+                    gtf('CDS', 110, 199, '+', 'g1', 't1'),
+                    gtf('CDS', 300, 396, '+', 'g1', 't1'),
+                    gtf('stop_codon', 397, 399, '+', 'g1', 't1'),
+                    gtf('exon', 500, 600, '-', 'g2', 'g2'),
+                    gtf('UTR', 700, 720, '-', 'g3', 't3'),
+                    gtf('CDS', 603, 699, '-', 'g3', 't3'),
+                    gtf('stop_codon', 600, 602, '-', 'g3', 't3')]
+        self.assertEqual(
+            [(f['type'], f['start'], f['end'], f.get('ID'), f.get('Parent'))
+             for f in gtf_hierarchy(features)],
+            [('exon', 1, 50, None, None),
+             ('gene', 100, 399, 'g1', None),
+             ('mRNA', 100, 399, 't1', 'g1'),
+             ('five_prime_UTR', 100, 109, None, 't1'),
+             ('CDS', 110, 199, 't1', 't1'),
+             ('CDS', 300, 399, 't1', 't1'),
+             ('gene', 500, 600, 'g2', None),
+             ('transcript', 500, 600, 'g2.mRNA', 'g2'),
+             ('exon', 500, 600, None, 'g2.mRNA'),
+             ('gene', 600, 720, 'g3', None),
+             ('mRNA', 600, 720, 't3', 'g3'),
+             ('five_prime_UTR', 700, 720, None, 't3'),
+             ('CDS', 600, 699, 't3', 't3')])
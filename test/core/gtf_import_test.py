@@ -0,0 +1,103 @@
+import collections
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from GenomeFileUtil.core import FastaGFFToGenome as fasta_gff
+from GenomeFileUtil.core.FastaIndex import FastaIndex
+
+# a two exon CDS with its stop codon in a separate line, as in Ensembl and GENCODE GTFs
+CONTIG = "C" * 10 + "ATG" + "GCT" * 9 + "G" * 20 + "GCT" * 9 + "TAA" + "C" * 110
+GTF_LINES = [
+    ('gene', 11, 100, '+', '.', 'gene_id "g1"; gene_name "abc"; gene_biotype "protein_coding";'),
+    ('transcript', 11, 100, '+', '.', 'gene_id "g1"; transcript_id "t1"; gene_name "abc";'),
+    ('exon', 11, 40, '+', '.', 'gene_id "g1"; transcript_id "t1"; exon_number "1";'),
+    ('CDS', 11, 40, '+', '0', 'gene_id "g1"; transcript_id "t1"; protein_id "p1";'),
+    ('start_codon', 11, 13, '+', '0', 'gene_id "g1"; transcript_id "t1";'),
+    ('exon', 61, 100, '+', '.', 'gene_id "g1"; transcript_id "t1"; exon_number "2";'),
+    ('CDS', 61, 87, '+', '0', 'gene_id "g1"; transcript_id "t1"; protein_id "p1";'),
+    ('stop_codon', 88, 90, '+', '0', 'gene_id "g1"; transcript_id "t1";'),
+    ('three_prime_utr', 91, 100, '+', '.', 'gene_id "g1"; transcript_id "t1";'),
+    ('gene', 120, 180, '-', '.', 'gene_id "g2"; gene_biotype "lncRNA";'),
+    ('transcript', 120, 180, '-', '.', 'gene_id "g2"; transcript_id "t2";'),
+    ('exon', 120, 180, '-', '.', 'gene_id "g2"; transcript_id "t2"; exon_number "1";'),
+]
+
+
+class GtfImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.fasta = os.path.join(self.dir, 'genome.fa')
+        with open(self.fasta, 'w') as f:
+            f.write(f">chr1\n{CONTIG}\n")
+        self.gtf = os.path.join(self.dir, 'genes.gtf')
+        with open(self.gtf, 'w') as f:
+            f.write('#!genome-build test\n')
+            for feature_type, start, end, strand, phase, attributes in GTF_LINES:
+                f.write(f"chr1\tensembl\t{feature_type}\t{start}\t{end}\t.\t{strand}\t{phase}\t"
+                        f"{attributes}\n")
+        config = SimpleNamespace(callbackURL='https://callback', re_api_url=None,
+                                 sharedFolder=self.dir,
+                                 raw={'taxon-workspace-name': 'ReferenceTaxons'})
+        with mock.patch.object(fasta_gff, 'AssemblyUtil'), \
+                mock.patch.object(fasta_gff, 'DataFileUtil'), \
+                mock.patch.object(fasta_gff, 'GenomeInterface'):
+            self.importer = fasta_gff.FastaGFFToGenome(config)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def import_features(self):
+        """Run the feature stage of the import and sort the features into the genome lists"""
+        importer = self.importer
+        features_by_contig = importer._retrieve_gff_file(self.gtf)
+        fasta_index = FastaIndex.build(self.fasta)
+        try:
+            importer._transform_contigs(((c.record.name, c) for c in fasta_index),
+                                        features_by_contig)
+            importer._process_cdss()
+        finally:
+            fasta_index.close()
+        lists = collections.defaultdict(dict)
+        for feature in importer.feature_dict.values():
+            name, feature = importer._finish_feature(feature, {'chr1': len(CONTIG)})
+            lists[name][feature['id']] = feature
+        return lists
+
+    def test_gene_line_first(self):
+        lists = self.import_features()
+        self.assertTrue(self.importer.is_gtf)
+        self.assertEqual(list(lists['features']), ['g1'])
+        self.assertEqual(list(lists['mrnas']), ['t1'])
+        self.assertEqual(list(lists['cdss']), ['t1.CDS'])
+        self.assertEqual(list(lists['non_coding_features']), ['g2', 't2'])
+
+        gene, mrna, cds = lists['features']['g1'], lists['mrnas']['t1'], lists['cdss']['t1.CDS']
+        self.assertEqual(gene['location'], [['chr1', 11, '+', 90]])
+        self.assertEqual((gene['mrnas'], gene['cdss']), (['t1'], ['t1.CDS']))
+        self.assertEqual((mrna['parent_gene'], mrna['cds']), ('g1', 't1.CDS'))
+        self.assertEqual(mrna['location'], [['chr1', 11, '+', 30], ['chr1', 61, '+', 40]])
+        self.assertEqual((cds['parent_gene'], cds['parent_mrna']), ('g1', 't1'))
+        # the stop codon line is part of the CDS
+        self.assertEqual(cds['location'], [['chr1', 11, '+', 30], ['chr1', 61, '+', 30]])
+        self.assertEqual(cds['protein_translation'], 'M' + 'A' * 18)
+        self.assertNotIn('warnings', cds)
+        self.assertEqual(lists['non_coding_features']['t2']['parent_gene'], 'g2')
+
+    def test_transform_pool(self):
+        serial = self.import_features()
+        self.tearDown()
+        self.setUp()
+        self.importer.transform_workers = 2
+        # forked before the GTF is read, as by _gen_genome_json
+        self.importer._start_pools()
+        try:
+            self.assertIsNotNone(self.importer.transform_pool)
+            self.assertEqual(self.import_features(), serial)
+        finally:
+            self.importer._shutdown_pools()
+        self.assertIsNone(self.importer.transform_pool)
@@ -0,0 +1,96 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from GenomeFileUtil.core import GenomeInterface as GI
+
+CONFIG = SimpleNamespace(handleURL='https://handle', shockURL='https://shock', srvWizURL=None,
+                         token='token', authServiceUrl='https://auth', callbackURL='https://cb',
+                         re_api_url=None, raw={'taxon-workspace-name': 'ReferenceTaxons',
+                                               'scratch': '/tmp'})
+HANDLES = {'KBH_1': 'node1', 'KBH_2': 'node2'}
+OWNERS = {'node1': 'someone', 'node2': 'user'}
+
+
+def acl_response(url, **kwargs):
+    node = url.split('/node/')[1].split('/')[0]
+    return mock.Mock(ok=True, json=lambda: {'data': {'owner': {'username': OWNERS[node]}}})
+
+
+class HandleOwnershipTest(unittest.TestCase):
+
+    def setUp(self):
+        with mock.patch.object(GI, 'DataFileUtil'), mock.patch.object(GI, 'WsLargeDataIO'):
+            self.gi = GI.GenomeInterface(CONFIG)
+        self.gi.dfu.copy_shock_node.return_value = {'handle': {'hid': 'KBH_3'}}
+
+    @mock.patch.object(GI, 'HandleService')
+    @mock.patch.object(GI, '_SHOCK_SESSION')
+    def test_own_handles(self, session, handle_service):
+        hids_to_handles = handle_service.return_value.hids_to_handles
+        # returned out of order
+        hids_to_handles.return_value = [{'hid': 'KBH_2', 'id': 'node2'},
+                                        {'hid': 'KBH_1', 'id': 'node1'}]
+        session.get.side_effect = acl_response
+        genome = {'genbank_handle_ref': 'KBH_1', 'gff_handle_ref': 'KBH_2'}
+        with mock.patch.object(self.gi.auth_client, 'get_user', return_value='user') as get_user:
+            self.gi._own_handles(genome, ('genbank_handle_ref', 'gff_handle_ref'))
+            get_user.assert_called_once_with('token')
+
+        hids_to_handles.assert_called_once_with(['KBH_1', 'KBH_2'])
+        self.assertEqual(session.get.call_count, 2)
+        self.gi.dfu.copy_shock_node.assert_called_once_with({'shock_id': 'node1',
+                                                             'make_handle': True})
+        self.assertEqual(genome, {'genbank_handle_ref': 'KBH_3', 'gff_handle_ref': 'KBH_2'})
+
+    @mock.patch.object(GI, 'HandleService')
+    @mock.patch.object(GI, '_SHOCK_SESSION')
+    def test_shared_handle(self, session, handle_service):
+        hids_to_handles = handle_service.return_value.hids_to_handles
+        hids_to_handles.return_value = [{'hid': 'KBH_1', 'id': 'node1'}]
+        session.get.side_effect = acl_response
+        genome = {'genbank_handle_ref': 'KBH_1', 'gff_handle_ref': 'KBH_1'}
+        with mock.patch.object(self.gi.auth_client, 'get_user', return_value='user'):
+            self.gi._own_handles(genome, ('genbank_handle_ref', 'gff_handle_ref'))
+
+        hids_to_handles.assert_called_once_with(['KBH_1'])
+        self.assertEqual(session.get.call_count, 1)
+        self.gi.dfu.copy_shock_node.assert_called_once_with({'shock_id': 'node1',
+                                                             'make_handle': True})
+        self.assertEqual(genome, {'genbank_handle_ref': 'KBH_3', 'gff_handle_ref': 'KBH_3'})
+
+    @mock.patch.object(GI, 'HandleService')
+    @mock.patch.object(GI, '_SHOCK_SESSION')
+    def test_unresolved_handle(self, session, handle_service):
+        # only one of the handles is known to the handle service
+        handle_service.return_value.hids_to_handles.return_value = [
+            {'hid': 'KBH_2', 'id': 'node2'}]
+        genome = {'genbank_handle_ref': 'KBH_1', 'gff_handle_ref': 'KBH_2'}
+        with self.assertRaisesRegex(ValueError, 'Handle KBH_1 of genbank_handle_ref was not found'):
+            self.gi._own_handles(genome, ('genbank_handle_ref', 'gff_handle_ref'))
+        session.get.assert_not_called()
+        self.gi.dfu.copy_shock_node.assert_not_called()
+
+    @mock.patch.object(GI, 'HandleService')
+    @mock.patch.object(GI, '_SHOCK_SESSION')
+    def test_no_handles(self, session, handle_service):
+        genome = {'missing_genbank_handle_ref': 'hid'}
+        self.gi._own_handle(genome, 'genbank_handle_ref')
+        self.assertEqual(genome, {'missing_genbank_handle_ref': 'hid'})
+        handle_service.assert_not_called()
+        session.get.assert_not_called()
+
+    @mock.patch.object(GI, 'HandleService')
+    @mock.patch.object(GI, '_SHOCK_SESSION')
+    def test_acl_error(self, session, handle_service):
+        handle_service.return_value.hids_to_handles.return_value = [{'hid': 1, 'id': 'node1'}]
+        session.get.return_value = mock.Mock(ok=False, content='{"error": ["Unauthorized"]}')
+        with mock.patch.object(self.gi.auth_client, 'get_user', return_value='user'):
+            with self.assertRaisesRegex(ValueError, 'Error getting ACLs for Shock node node1'):
+                self.gi._own_handle({'genbank_handle_ref': 1}, 'genbank_handle_ref')
+        self.gi.dfu.copy_shock_node.assert_not_called()
+
+    def test_shared_auth_client(self):
+        with mock.patch.object(GI, 'DataFileUtil'), mock.patch.object(GI, 'WsLargeDataIO'):
+            other = GI.GenomeInterface(CONFIG)
+        self.assertIs(other.auth_client, self.gi.auth_client)
@@ -0,0 +1,62 @@
+import bz2
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from GenomeFileUtil.core.InputStaging import (
+    decompress_to, is_archive, link_or_copy, nonblank_lines, open_text, uncompressed_name
+)
+
+TEXT = "LOCUS       A\r\n\n  \nORIGIN\n//\n"
+
+
+class InputStagingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.staging = os.path.join(self.dir, 'staging')
+        os.makedirs(self.staging)
+        self.files = {}
+        for name, opener in (('a.gbff', open), ('b.gbff.gz', gzip.open),
+                             ('c.gbff.bz2', bz2.open)):
+            path = os.path.join(self.dir, name)
+            with opener(path, 'wt') as f:
+                f.write(TEXT)
+            self.files[name] = path
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_names(self):
+        self.assertEqual(uncompressed_name('/x/b.gbff.gz'), 'b.gbff')
+        self.assertEqual(uncompressed_name('c.gbff.bz2'), 'c.gbff')
+        self.assertEqual(uncompressed_name('a.gbff'), 'a.gbff')
+        self.assertTrue(is_archive('x.tar.gz'))
+        self.assertTrue(is_archive('x.ZIP'))
+        self.assertFalse(is_archive('b.gbff.gz'))
+
+    def test_open_text(self):
+        for path in self.files.values():
+            with open_text(path) as f:
+                self.assertEqual(f.read(), TEXT.replace('\r\n', '\n'))
+
+    def test_nonblank_lines(self):
+        lines = list(nonblank_lines(sorted(self.files.values())))
+        self.assertEqual(lines, ["LOCUS       A\n", "ORIGIN\n", "//\n"] * 3)
+
+    def test_link_or_copy(self):
+        staged = link_or_copy(self.files['a.gbff'], self.staging)
+        self.assertEqual(staged, os.path.join(self.staging, 'a.gbff'))
+        self.assertTrue(os.path.samefile(staged, self.files['a.gbff']))
+        # staging a file already in place is a no-op
+        self.assertEqual(link_or_copy(staged, self.staging), staged)
+
+    def test_decompress_to(self):
+        for name, path in self.files.items():
+            staged = decompress_to(path, self.staging)
+            self.assertEqual(os.path.basename(staged), uncompressed_name(name))
+            with open(staged, newline='') as f:
+                self.assertEqual(f.read(), TEXT.replace('\r\n', '\n') if name != 'a.gbff'
+                                 else TEXT)
@@ -0,0 +1,60 @@
+import copy
+import hashlib
+import unittest
+
+from GenomeFileUtil.core import Md5Stage as md5_stage_module
+from GenomeFileUtil.core.Md5Stage import Md5Stage, PendingMd5
+
+
+class Md5StageTest(unittest.TestCase):
+
+    def setUp(self):
+        self.batch_size = md5_stage_module.MD5_BATCH_SIZE
+        md5_stage_module.MD5_BATCH_SIZE = 7
+
+    def tearDown(self):
+        md5_stage_module.MD5_BATCH_SIZE = self.batch_size
+
+    def build_features(self, stage):
+        features = []
+        for i in range(50):
+            seq = ('ACGT' * i)[:i * 3]
+            feat = {'id': f'f{i}', 'md5': stage.add(seq.encode('ascii'))}
+            if i % 2:
+                feat['protein_md5'] = stage.add('M' + 'K' * i)
+            features.append(feat)
+        # importers shallow and deep copy features before the stage has finished
+        features.append(copy.copy(features[3]))
+        features.append(copy.deepcopy(features[4]))
+        return features
+
+    def expected(self, feat):
+        i = int(feat['id'][1:])
+        out = {'id': feat['id'],
+               'md5': hashlib.md5(('ACGT' * i)[:i * 3].encode()).hexdigest()}
+        if i % 2:
+            out['protein_md5'] = hashlib.md5(('M' + 'K' * i).encode()).hexdigest()
+        return out
+
+    def test_inline(self):
+        stage = Md5Stage()
+        features = self.build_features(stage)
+        stage.run()
+        stage.resolve(features)
+        self.assertEqual(features, [self.expected(f) for f in features])
+
+    def test_pooled(self):
+        stage = Md5Stage(workers=3)
+        features = self.build_features(stage)
+        self.assertIsInstance(features[0]['md5'], PendingMd5)
+        stage.run()
+        stage.resolve(features)
+        self.assertEqual(features, [self.expected(f) for f in features])
+
+    def test_map(self):
+        items = [b'A' * i for i in range(20)]
+        expected = [hashlib.md5(x).hexdigest() for x in items]
+        for workers in (1, 4):
+            stage = Md5Stage(workers)
+            self.assertEqual(stage.map(lambda x: hashlib.md5(x).hexdigest(), items), expected)
+            stage.run()
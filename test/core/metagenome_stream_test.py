@@ -0,0 +1,80 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from GenomeFileUtil.core import FastaGFFToGenome as fasta_gff
+
+CONTIG = "ATG" + "GCT" * 20 + "TAA" + "C" * 30
+# a gene whose CDS continues on the next contig
+CROSS_CONTIG = [('c1', 'gene', 'ID=g1'), ('c1', 'CDS', 'ID=g1.CDS;Parent=g1'),
+                ('c2', 'CDS', 'ID=g1.CDS;Parent=g1')]
+
+
+def write_gff(path, lines):
+    with open(path, 'w') as f:
+        for contig_id, feature_type, attributes in lines:
+            f.write(f"{contig_id}\tsrc\t{feature_type}\t1\t66\t.\t+\t0\t{attributes}\n")
+
+
+class MetagenomeStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.fasta = os.path.join(self.dir, 'metagenome.fa')
+        with open(self.fasta, 'w') as f:
+            f.write(f">c1\n{CONTIG}\n>c2\n{CONTIG}\n")
+        self.gff = os.path.join(self.dir, 'metagenome.gff')
+        config = SimpleNamespace(callbackURL='https://callback', re_api_url=None,
+                                 sharedFolder=self.dir,
+                                 raw={'taxon-workspace-name': 'ReferenceTaxons'})
+        with mock.patch.object(fasta_gff, 'AssemblyUtil'), \
+                mock.patch.object(fasta_gff, 'DataFileUtil'), \
+                mock.patch.object(fasta_gff, 'GenomeInterface'):
+            self.importer = fasta_gff.FastaGFFToGenome(config)
+        self.importer.is_metagenome = True
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_grouped_by_contig(self):
+        write_gff(self.gff, [('c1', 'CDS', 'ID=g1.CDS;Parent=g1'), ('c1', 'gene', 'ID=g1'),
+                             ('c2', 'gene', 'ID=g2'), ('c2', 'CDS', 'Parent=missing')])
+        self.assertTrue(self.importer._gff_grouped_by_contig(self.gff))
+        for lines in (CROSS_CONTIG,
+                      # the child comes before its parent on another contig
+                      [('c1', 'CDS', 'Parent=g2'), ('c2', 'gene', 'ID=g2')],
+                      [('c1', 'gene', 'ID=g1'), ('c2', 'gene', 'ID=g1')],
+                      [('c1', 'gene', 'ID=g1'), ('c2', 'gene', 'ID=g2'), ('c1', 'gene', 'ID=g3')]):
+            write_gff(self.gff, lines)
+            self.assertFalse(self.importer._gff_grouped_by_contig(self.gff))
+
+    def test_parent_on_other_contig(self):
+        write_gff(self.gff, CROSS_CONTIG)
+        importer = self.importer
+        uploaded = {}
+
+        def file_to_shock(params):
+            if params['file_path'].endswith('_features.json.gz'):
+                with gzip.open(params['file_path'], 'rt') as f:
+                    uploaded['features'] = json.load(f)
+            return {'handle': {'hid': 'KBH_1'}}
+
+        importer.dfu.file_to_shock.side_effect = file_to_shock
+        importer.au.save_assembly_from_fasta.return_value = '1/2/3'
+        importer.gi.determine_tier.return_value = ('User', ['User'])
+        params = importer._set_parsed_params({'genome_name': 'meta', 'workspace_name': 'ws'})
+        # the Biopython release installed may not have Seq.alphabet
+        with mock.patch.object(importer, '_sample_molecule_type', return_value='DNA'), \
+                mock.patch.object(fasta_gff, 'STREAM_BATCH_FEATURES', 1):
+            genome = importer._gen_genome_json(params, self.gff, self.fasta)
+
+        self.assertEqual(genome['num_features'], 2)
+        gene, cds = uploaded['features']
+        self.assertEqual((gene['id'], gene['cdss']), ('g1', ['g1.CDS']))
+        self.assertEqual(cds['parent_gene'], 'g1')
+        self.assertEqual(cds['location'], [['c1', 1, '+', 66], ['c2', 1, '+', 66]])
@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from GenomeFileUtil.core.OntologyClassifier import OntologyClassifier, ONTOLOGY_PREFIX_FILE
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data')
+
+
+class OntologyClassifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.classifier = OntologyClassifier(DATA_DIR, '1.0', 'now')
+
+    def test_classify(self):
+        refs = ['GeneID:944742', 'GO:0009523', 'PF13437', 'TIGR01843', 'COG0845',
+                'KO:K12542', 'PO:0000005', 'ECOCYC:EG11277', 'orphan']
+        ontology, db_xrefs = self.classifier.classify(refs)
+        events = {e['id']: i for i, e in enumerate(self.classifier.ontology_events)}
+        self.assertEqual(list(events), ['GO', 'PFAM', 'TIGRFAM', 'COG', 'KO', 'PO'])
+        self.assertEqual(ontology['GO'], {'GO:0009523': [events['GO']]})
+        self.assertEqual(ontology['PFAM'], {'PF13437': [events['PFAM']]})
+        self.assertEqual(ontology['KO'], {'KO:K12542': [events['KO']]})
+        self.assertEqual(db_xrefs, [('GeneID', '944742'), ('ECOCYC', 'EG11277'),
+                                    ('Unknown_Source', 'orphan')])
+        self.assertIn('GO:0009523', self.classifier.ontologies_present['GO'])
+        self.assertEqual(self.classifier.ontology_events[events['PO']]['ontology_ref'],
+                         'KBaseOntology/plant_ontology')
+
+    def test_no_events_without_terms(self):
+        self.classifier.classify(['GeneID:1', 'ASAP:ABE-0000006'])
+        self.assertEqual(self.classifier.ontology_events, [])
+        self.assertFalse(self.classifier.ontologies_present)
+
+    def test_event_reused(self):
+        self.classifier.classify(['GO:0000001'])
+        ontology, _ = self.classifier.classify(['GO:0000002'])
+        self.assertEqual(len(self.classifier.ontology_events), 1)
+        self.assertEqual(ontology['GO'], {'GO:0000002': [0]})
+
+    def test_merge(self):
+        self.classifier.classify(['PF00001'])
+        worker = OntologyClassifier(DATA_DIR, '1.0', 'now')
+        worker.reset()
+        worker.classify(['GO:0000001', 'PF00002'])
+        index_map = self.classifier.merge(worker.ontology_events, worker.ontologies_present)
+        self.assertEqual(index_map, [1, 0])
+        self.assertEqual([e['id'] for e in self.classifier.ontology_events], ['PFAM', 'GO'])
+        self.assertEqual(list(self.classifier.ontologies_present['PFAM']),
+                         ['PF00001', 'PF00002'])
+
+    def test_prefix_from_config(self):
+        data_dir = tempfile.mkdtemp()
+        try:
+            for name in os.listdir(DATA_DIR):
+                if name.endswith('.json'):
+                    shutil.copy(os.path.join(DATA_DIR, name), data_dir)
+            with open(os.path.join(data_dir, ONTOLOGY_PREFIX_FILE)) as f:
+                config = json.load(f)
+            config['prefixes']['CATH:'] = 'CATH'
+            with open(os.path.join(data_dir, ONTOLOGY_PREFIX_FILE), 'w') as f:
+                json.dump(config, f)
+            classifier = OntologyClassifier(data_dir, '1.0', 'now')
+            ontology, db_xrefs = classifier.classify(['CATH:1.10.8.10', 'GeneID:1'])
+            self.assertEqual(list(ontology), ['CATH'])
+            self.assertEqual(classifier.ontology_events[0]['ontology_ref'],
+                             'KBaseOntology/cath_ontology')
+        finally:
+            shutil.rmtree(data_dir)
+
+    def test_unsupported_ontology(self):
+        with self.assertRaisesRegex(ValueError, "FOO is not a supported ontology"):
+            self.classifier.event_index('FOO')
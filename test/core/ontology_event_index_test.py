@@ -0,0 +1,45 @@
+import copy
+import unittest
+
+from GenomeFileUtil.core.GenomeUtils import OntologyEventIndex, hashable_key
+
+EVENTS = [
+    {'id': 'SSO', 'method': 'RAST', 'ontology_ref': '6/1/1'},
+    {'id': 'GO', 'method': 'RAST', 'ontology_ref': '6/2/1', 'eco': ['ECO:1', 'ECO:2']},
+    {'id': 'SSO', 'method': 'RAST', 'ontology_ref': '6/1/1', 'method_version': 1},
+]
+
+
+def list_scan(ontology_events, ev):
+    """De-duplication as _update_genome used to do it"""
+    if ev not in ontology_events:
+        ontology_events.append(ev)
+    return ontology_events.index(ev)
+
+
+class OntologyEventIndexTest(unittest.TestCase):
+
+    def test_hashable_key(self):
+        self.assertEqual(hashable_key({'a': [1, {'b': 2}], 'c': 'x'}),
+                         hashable_key({'c': 'x', 'a': [1.0, {'b': 2}]}))
+        self.assertNotEqual(hashable_key({'a': [1, 2]}), hashable_key({'a': [2, 1]}))
+        self.assertNotEqual(hashable_key({'a': [1]}), hashable_key({'a': (1,)}))
+        self.assertNotEqual(hashable_key({'a': 1}), hashable_key({'a': '1'}))
+
+    def test_same_as_list_scans(self):
+        existing = [EVENTS[2], {'id': 'PO'}, copy.deepcopy(EVENTS[2])]
+        evidence = [EVENTS[1], EVENTS[0], EVENTS[2], EVENTS[1], {'id': 'PO'},
+                    dict(EVENTS[0], method_version=1.0), EVENTS[0]]
+        expected_events = copy.deepcopy(existing)
+        expected = [list_scan(expected_events, copy.deepcopy(ev)) for ev in evidence]
+
+        index = OntologyEventIndex(copy.deepcopy(existing))
+        self.assertEqual([index.index(copy.deepcopy(ev)) for ev in evidence], expected)
+        self.assertEqual(expected, [3, 4, 0, 3, 1, 0, 4])
+        self.assertEqual(index.events, expected_events)
+
+    def test_empty(self):
+        index = OntologyEventIndex()
+        self.assertEqual(index.index(EVENTS[0]), 0)
+        self.assertEqual(index.index(dict(EVENTS[0])), 0)
+        self.assertEqual(index.events, [EVENTS[0]])
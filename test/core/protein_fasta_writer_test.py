@@ -0,0 +1,40 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from GenomeFileUtil.core.ProteinFastaWriter import ProteinFastaWriter
+
+
+class ProteinFastaWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'protein.fasta')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def test_records(self):
+        writer = ProteinFastaWriter(self.path)
+        writer.add('p1', 'c1', 'MAN')
+        writer.add('p2', 'c2', 'MWS')
+        self.assertEqual(writer.close(), self.path)
+        self.assertEqual(self.read(), ">p1 cds_ids:c1\nMAN\n>p2 cds_ids:c2\nMWS\n")
+        self.assertEqual(os.listdir(self.dir), ['protein.fasta'])
+
+    def test_shared_protein_id(self):
+        writer = ProteinFastaWriter(self.path)
+        writer.add('', 'c1', 'MAN')
+        writer.add('p2', 'c2', 'MWS')
+        writer.add('', 'c3', 'MKK')
+        writer.add('p2', 'c4', 'MWS')
+        writer.add('', 'c5', 'MAN')
+        writer.close()
+        self.assertEqual(self.read(), "> cds_ids:c1|c3|c5\nMAN\n>p2 cds_ids:c2|c4\nMWS\n")
+        self.assertEqual(len(writer), 2)
+        self.assertEqual(os.listdir(self.dir), ['protein.fasta'])
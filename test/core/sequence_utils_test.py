@@ -0,0 +1,103 @@
+import hashlib
+import random
+import unittest
+
+from Bio.Data.CodonTable import TranslationError, ambiguous_generic_by_id
+from Bio.Seq import Seq, translate
+
+from GenomeFileUtil.core import SequenceUtils
+from GenomeFileUtil.core.SequenceUtils import (
+    extract_sequence, iter_translate_cdss, sequence_md5, translate_cds, translate_cdss,
+    translation_pool
+)
+
+
+def bio_translate(seq, table):
+    try:
+        return translate(seq, table, cds=True)
+    except TranslationError as e:
+        # newer Biopython releases name the codon in this message
+        if str(e).startswith("Extra in frame stop codon"):
+            return "Extra in frame stop codon found."
+        return str(e)
+
+
+class TranslationTest(unittest.TestCase):
+
+    def random_cdss(self, table, count, seed=5):
+        rand = random.Random(seed)
+        starts = ambiguous_generic_by_id[table].start_codons
+        stops = ambiguous_generic_by_id[table].stop_codons
+        seqs = ['', 'AT', 'ATGTAA']
+        for _ in range(count):
+            letters = 'ACGT' if rand.random() < 0.7 else 'ACGTUNRYKMSWBDHVX-acgt'
+            body = ''.join(rand.choice(letters) for _ in range(rand.randint(0, 40) * 3))
+            if rand.random() < 0.1:
+                body += 'A'
+            start = rand.choice(starts) if rand.random() < 0.9 else 'CCC'
+            stop = rand.choice(stops) if rand.random() < 0.9 else 'GGG'
+            seqs.append(start + body + stop)
+        return seqs
+
+    def test_matches_biopython(self):
+        for table in ambiguous_generic_by_id:
+            seqs = self.random_cdss(table, 200)
+            for seq, result in zip(seqs, translate_cdss(seqs, table)):
+                if isinstance(result, TranslationError):
+                    result = str(result)
+                self.assertEqual(result, bio_translate(seq, table), f"{table}: {seq}")
+
+    def test_small_batches(self):
+        seqs = self.random_cdss(11, 300, seed=9)
+        expected = [str(r) for r in translate_cdss(seqs, 11)]
+        batch_size = SequenceUtils.TRANSLATION_BATCH_SIZE
+        SequenceUtils.TRANSLATION_BATCH_SIZE = 50
+        try:
+            self.assertEqual([str(r) for r in translate_cdss(seqs, 11)], expected)
+        finally:
+            SequenceUtils.TRANSLATION_BATCH_SIZE = batch_size
+
+    def test_pooled(self):
+        seqs = self.random_cdss(11, 300, seed=11)
+        expected = [str(r) for r in translate_cdss(seqs, 11)]
+        for workers, chunk_size in ((1, 7), (3, 7), (3, 1000)):
+            results = iter_translate_cdss(iter(seqs), 11, workers, chunk_size)
+            self.assertEqual([str(r) for r in results], expected)
+        self.assertEqual(list(iter_translate_cdss([], 11, 3, 7)), [])
+        with translation_pool(3) as pool:
+            # every worker is forked before the pool is returned
+            self.assertEqual(len(pool._processes), 3)
+            for _ in range(2):
+                results = iter_translate_cdss(iter(seqs), 11, 3, 7, pool=pool)
+                self.assertEqual([str(r) for r in results], expected)
+        self.assertIsNone(translation_pool(1))
+
+    def test_translate_cds(self):
+        self.assertEqual(translate_cds('ttgGCNaaytgA', '11'), 'MAN')
+        self.assertEqual(translate_cds('ATGTGAAGTTAA', 4), 'MWS')
+        with self.assertRaisesRegex(TranslationError, "Extra in frame stop codon"):
+            translate_cds('ATGTGAAGTTAA', 11)
+        with self.assertRaisesRegex(TranslationError, "Codon 'A-T' is invalid"):
+            translate_cds('ATGA-TTAA', 11)
+        with self.assertRaisesRegex(TranslationError, "not a multiple of three"):
+            translate_cds('ATGATAA', 11)
+
+
+class ExtractionTest(unittest.TestCase):
+
+    def test_matches_bio_seq(self):
+        rand = random.Random(1)
+        seq = Seq(''.join(rand.choice('ACGTNRYKMSWBDHVacgtn') for _ in range(500)))
+        contig = str(seq).upper().encode('ascii')
+        for _ in range(200):
+            start = rand.randint(0, 499)
+            end = rand.randint(start, 520)
+            expected = seq[start:end].upper()
+            self.assertEqual(extract_sequence(contig, start, end), str(expected).encode())
+            self.assertEqual(extract_sequence(memoryview(contig), start, end, True),
+                             str(expected.reverse_complement()).encode())
+
+    def test_md5(self):
+        self.assertEqual(sequence_md5(b'ACGT'), hashlib.md5(b'ACGT').hexdigest())
+        self.assertEqual(sequence_md5('MKV'), hashlib.md5(b'MKV').hexdigest())
+        self.assertEqual(sequence_md5(memoryview(b'ACGT')[1:]), hashlib.md5(b'CGT').hexdigest())
@@ -0,0 +1,73 @@
+import threading
+import time
+import unittest
+
+from GenomeFileUtil.core.StageScheduler import StageScheduler
+
+
+class StageSchedulerTest(unittest.TestCase):
+
+    def test_dependencies(self):
+        stages = StageScheduler()
+        stages.add('a', lambda: 2)
+        stages.add('b', lambda: 3)
+        stages.add('product', lambda a, b: a * b, ('a', 'b'))
+        stages.add('minus', lambda b, product: product - b, ('b', 'product'), local=True)
+        with self.assertLogs(level='INFO') as logs:
+            results = stages.run()
+        self.assertEqual(results, {'a': 2, 'b': 3, 'product': 6, 'minus': 3})
+        self.assertEqual(stages.critical_path()[-2:], ['product', 'minus'])
+        self.assertIn('critical path', logs.output[-1])
+        with self.assertRaisesRegex(ValueError, 'unknown stage'):
+            stages.add('c', lambda x: x, ('x',))
+        with self.assertRaisesRegex(ValueError, 'already added'):
+            stages.add('a', lambda: 1)
+
+    def test_overlap(self):
+        main_thread = threading.current_thread()
+        stages = StageScheduler()
+        stages.add('remote', lambda: time.sleep(0.3) or threading.current_thread())
+        stages.add('local', lambda: time.sleep(0.3) or threading.current_thread(), local=True)
+        stages.add('both', lambda remote, local: (remote, local), ('remote', 'local'))
+        start = time.time()
+        remote, local = stages.run()['both']
+        self.assertLess(time.time() - start, 0.55)
+        self.assertIsNot(remote, main_thread)
+        self.assertIs(local, main_thread)
+        self.assertEqual(len(stages.critical_path()), 2)
+
+    def test_error(self):
+        ran = []
+
+        def fail():
+            raise ValueError('bad GFF')
+
+        stages = StageScheduler()
+        stages.add('slow', lambda: time.sleep(0.2) or ran.append('slow'))
+        stages.add('features', fail, local=True)
+        stages.add('genome', lambda *_: ran.append('genome'), ('slow', 'features'))
+        with self.assertRaisesRegex(ValueError, 'bad GFF'):
+            stages.run()
+        self.assertEqual(ran, ['slow'])
+
+    def test_error_cancels_and_reports(self):
+        ran = []
+
+        def fail():
+            raise ValueError('bad GFF')
+
+        stages = StageScheduler(max_workers=1)
+        stages.add('upload', lambda: time.sleep(0.2) or ran.append('upload') or 'hid 1',
+                   side_effects=True)
+        # queued behind the upload when the features fail
+        stages.add('queued', lambda: ran.append('queued'), side_effects=True)
+        stages.add('features', fail, local=True)
+        stages.add('genome', lambda *_: ran.append('genome'), ('upload', 'features'))
+        with self.assertLogs(level='ERROR') as logs:
+            with self.assertRaisesRegex(ValueError, 'bad GFF'):
+                stages.run()
+        self.assertEqual(ran, ['upload'])
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('not run after a failure: queued, genome', logs.output[0])
+        self.assertIn("upload finished before the failure and was not undone, result: 'hid 1'",
+                      logs.output[1])